@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import subprocess
+import threading
+import time
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+from .config import ANALYSIS_CACHE_MAX_ENTRIES, ANALYSIS_CACHE_PATH
+
+
+def git_blob_sha(data: bytes) -> str:
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def _git(args: list[str], cwd: Path) -> bytes | None:
+    proc = subprocess.run(["git", *args], cwd=str(cwd), capture_output=True, check=False)
+    if proc.returncode != 0:
+        return None
+    return proc.stdout
+
+
+def worktree_blob_shas(repo_path: Path, rels: Iterable[str]) -> dict[str, str]:
+    """Map each path to the git blob SHA of its working-tree content.
+
+    Clean tracked files take the SHA from the git index without being read; modified and
+    untracked files (or every file outside a git checkout) are hashed the way git would.
+    """
+    index_shas: dict[str, str] = {}
+    dirty: set[str] = set()
+    staged = _git(["ls-files", "-s", "-z"], repo_path)
+    modified = _git(["diff", "--name-only", "-z"], repo_path)
+    if staged is not None and modified is not None:
+        for entry in staged.split(b"\0"):
+            if not entry:
+                continue
+            meta, _, path = entry.partition(b"\t")
+            index_shas[os.fsdecode(path)] = meta.split(b" ")[1].decode("ascii")
+        dirty = {os.fsdecode(path) for path in modified.split(b"\0") if path}
+
+    shas: dict[str, str] = {}
+    for rel in rels:
+        sha = index_shas.get(rel)
+        if sha is None or rel in dirty:
+            try:
+                sha = git_blob_sha((repo_path / rel).read_bytes())
+            except OSError:
+                continue
+        shas[rel] = sha
+    return shas
+
+
+class AnalysisCache:
+    """Per-file analysis results keyed by (git blob SHA, analyzer version) with LRU eviction."""
+
+    def __init__(self, path: Path, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS file_analysis (
+                blob_sha TEXT NOT NULL,
+                version TEXT NOT NULL,
+                result_json TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (blob_sha, version)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_file_analysis_last_used ON file_analysis(last_used)")
+        self._conn.commit()
+        self._entries = int(self._conn.execute("SELECT COUNT(*) FROM file_analysis").fetchone()[0])
+
+    def get_many(self, blob_shas: list[str], version: str) -> dict[str, dict[str, Any]]:
+        found: dict[str, dict[str, Any]] = {}
+        unique = list(dict.fromkeys(blob_shas))
+        with self._lock:
+            for i in range(0, len(unique), 500):
+                part = unique[i : i + 500]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT blob_sha, result_json FROM file_analysis WHERE version=? AND blob_sha IN ({marks})",
+                    (version, *part),
+                ).fetchall()
+                for blob_sha, result_json in rows:
+                    found[blob_sha] = json.loads(result_json)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE file_analysis SET last_used=? WHERE blob_sha=? AND version=?",
+                    [(now, blob_sha, version) for blob_sha in found],
+                )
+                self._conn.commit()
+            hits = sum(1 for blob_sha in blob_shas if blob_sha in found)
+            self.hits += hits
+            self.misses += len(blob_shas) - hits
+        return found
+
+    def put_many(self, results: dict[str, dict[str, Any]], version: str) -> None:
+        now = time.time()
+        rows = [(blob_sha, version, json.dumps(result), now) for blob_sha, result in results.items()]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO file_analysis (blob_sha, version, result_json, last_used) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._entries += self._conn.total_changes - before
+            excess = self._entries - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM file_analysis WHERE rowid IN "
+                    "(SELECT rowid FROM file_analysis ORDER BY last_used ASC LIMIT ?)",
+                    (excess,),
+                )
+                self._entries -= excess
+                self.evictions += excess
+            self._conn.commit()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": self._entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_analysis_cache: AnalysisCache | None = None
+_analysis_cache_lock = threading.Lock()
+
+
+def get_analysis_cache() -> AnalysisCache | None:
+    global _analysis_cache
+    if ANALYSIS_CACHE_MAX_ENTRIES <= 0:
+        return None
+    with _analysis_cache_lock:
+        if _analysis_cache is None:
+            _analysis_cache = AnalysisCache(ANALYSIS_CACHE_PATH, ANALYSIS_CACHE_MAX_ENTRIES)
+        return _analysis_cache
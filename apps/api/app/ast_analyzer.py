@@ -1,18 +1,75 @@
 from __future__ import annotations
 
 import ast
-import json
-from collections import Counter, defaultdict
+import hashlib
+import heapq
+import multiprocessing
+import os
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
 
-from .config import ARTIFACTS_DIR
+from .analysis_cache import get_analysis_cache, worktree_blob_shas
+from .churn import file_churn, is_shallow
+from .config import (
+    ANALYSIS_PARALLEL_MIN_FILES,
+    ANALYSIS_WORKERS,
+    ARTIFACTS_DIR,
+    CHURN_WINDOW_DAYS,
+    GRAPH_ARTIFACT_FORMAT,
+)
+from .function_metrics import FunctionRow, FunctionTable
+from .graph_artifacts import GraphArtifactWriter
+from .git_objects import GitObjectReader
+from .repo_files import list_commit_files, list_repo_files
+from .symbol_index import ReferenceRow, SymbolIndex, SymbolRow
+from .ts_reparse import get_parse_cache
+
+# Bump whenever per-file results change, so cached analyses are not reused.
+ANALYZER_VERSION = "5"
+ANALYZED_EXTENSIONS = {".py", ".ts", ".tsx", ".js", ".jsx"}
+TS_LANGUAGE_BY_EXT = {".js": "javascript", ".jsx": "javascript", ".ts": "typescript", ".tsx": "typescript"}
+
+_local = threading.local()
+_queries: dict[str, object] = {}
+_queries_lock = threading.Lock()
+_ts_memo: OrderedDict[bytes, _TsMetrics] = OrderedDict()
+_ts_memo_lock = threading.Lock()
+_worker_reader: GitObjectReader | None = None
 
 try:
-    from tree_sitter_languages import get_parser
+    from tree_sitter_languages import get_language, get_parser
 except ImportError:  # pragma: no cover - optional at runtime
+    get_language = None
     get_parser = None
 
 
+@dataclass
+class _FunctionFrame:
+    name: str
+    line: int
+    loc: int
+    params: int
+    complexity: int = 1
+    depth: int = 0
+    max_depth: int = 0
+
+
+def _bound_names(target: ast.expr) -> list[str]:
+    """Names an assignment binds: bare names, also inside tuple/list unpacking. Subscript and
+    attribute targets (`CONFIG[key] = 1`, `os.environ["X"] = "1"`) bind none."""
+    if isinstance(target, ast.Name):
+        return [target.id]
+    if isinstance(target, ast.Starred):
+        return _bound_names(target.value)
+    if isinstance(target, (ast.Tuple, ast.List)):
+        return [name for element in target.elts for name in _bound_names(element)]
+    return []
+
+
 class _PyFileVisitor(ast.NodeVisitor):
     def __init__(self) -> None:
         self.function_count = 0
@@ -20,17 +77,85 @@ class _PyFileVisitor(ast.NodeVisitor):
         self.imports: list[str] = []
         self.calls: list[str] = []
         self.complexity = 1
-
-    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        self.functions: list[FunctionRow] = []
+        self.symbols: list[SymbolRow] = []
+        self.references: list[ReferenceRow] = []
+        self._scope: list[str] = []
+        self._class_depths: list[int] = []
+        self._frames: list[_FunctionFrame] = []
+
+    def _define(self, node: ast.AST, name: str, kind: str) -> None:
+        scope = ".".join(self._scope)
+        qualname = f"{scope}.{name}" if scope else name
+        self.symbols.append((name, qualname, kind, node.lineno, node.end_lineno or node.lineno, scope))
+
+    def _in_class_body(self) -> bool:
+        return bool(self._class_depths) and self._class_depths[-1] == len(self._scope)
+
+    def _visit_function(self, node: ast.FunctionDef | ast.AsyncFunctionDef) -> None:
         self.function_count += 1
+        args = node.args
+        params = len(args.posonlyargs) + len(args.args) + len(args.kwonlyargs)
+        params += (args.vararg is not None) + (args.kwarg is not None)
+        self._define(node, node.name, "method" if self._in_class_body() else "function")
+        frame = _FunctionFrame(
+            name=".".join([*self._scope, node.name]),
+            line=node.lineno,
+            loc=(node.end_lineno or node.lineno) - node.lineno + 1,
+            params=params,
+        )
+        # Nested functions are ranked on their own and do not add to their parent.
+        self._frames.append(frame)
+        self._scope.append(node.name)
         self.generic_visit(node)
+        self._scope.pop()
+        self._frames.pop()
+        self.functions.append(
+            (frame.name, frame.line, frame.complexity, frame.loc, frame.max_depth, frame.params)
+        )
+
+    def _branch(self, weight: int) -> None:
+        self.complexity += weight
+        if self._frames:
+            self._frames[-1].complexity += weight
+
+    def _visit_block(self, node: ast.AST) -> None:
+        frame = self._frames[-1] if self._frames else None
+        if frame:
+            frame.depth += 1
+            frame.max_depth = max(frame.max_depth, frame.depth)
+        self.generic_visit(node)
+        if frame:
+            frame.depth -= 1
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        self._visit_function(node)
 
     def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef) -> None:
-        self.function_count += 1
-        self.generic_visit(node)
+        self._visit_function(node)
 
     def visit_ClassDef(self, node: ast.ClassDef) -> None:
         self.class_count += 1
+        self._define(node, node.name, "class")
+        self._scope.append(node.name)
+        self._class_depths.append(len(self._scope))
+        self.generic_visit(node)
+        self._class_depths.pop()
+        self._scope.pop()
+
+    def _define_targets(self, node: ast.Assign | ast.AnnAssign, targets: list[ast.expr]) -> None:
+        # Module and class attributes are definitions; function locals are not.
+        if not self._frames:
+            for target in targets:
+                for name in _bound_names(target):
+                    self._define(node, name, "variable")
+
+    def visit_Assign(self, node: ast.Assign) -> None:
+        self._define_targets(node, node.targets)
+        self.generic_visit(node)
+
+    def visit_AnnAssign(self, node: ast.AnnAssign) -> None:
+        self._define_targets(node, [node.target])
         self.generic_visit(node)
 
     def visit_Import(self, node: ast.Import) -> None:
@@ -47,30 +172,37 @@ class _PyFileVisitor(ast.NodeVisitor):
         name = _call_name(node)
         if name:
             self.calls.append(name)
+            self.references.append((name, node.lineno, node.col_offset + 1, ".".join(self._scope)))
         self.generic_visit(node)
 
     def visit_If(self, node: ast.If) -> None:
-        self.complexity += 1
-        self.generic_visit(node)
+        self._branch(1)
+        self._visit_block(node)
 
     def visit_For(self, node: ast.For) -> None:
-        self.complexity += 1
-        self.generic_visit(node)
+        self._branch(1)
+        self._visit_block(node)
 
     def visit_AsyncFor(self, node: ast.AsyncFor) -> None:
-        self.complexity += 1
-        self.generic_visit(node)
+        self._branch(1)
+        self._visit_block(node)
 
     def visit_While(self, node: ast.While) -> None:
-        self.complexity += 1
-        self.generic_visit(node)
+        self._branch(1)
+        self._visit_block(node)
 
     def visit_Try(self, node: ast.Try) -> None:
-        self.complexity += len(node.handlers) or 1
-        self.generic_visit(node)
+        self._branch(len(node.handlers) or 1)
+        self._visit_block(node)
+
+    def visit_With(self, node: ast.With) -> None:
+        self._visit_block(node)
+
+    def visit_AsyncWith(self, node: ast.AsyncWith) -> None:
+        self._visit_block(node)
 
     def visit_BoolOp(self, node: ast.BoolOp) -> None:
-        self.complexity += max(1, len(node.values) - 1)
+        self._branch(max(1, len(node.values) - 1))
         self.generic_visit(node)
 
 
@@ -82,54 +214,116 @@ def _call_name(node: ast.Call) -> str | None:
     return None
 
 
-def _iter_code_files(repo_path: Path) -> list[Path]:
-    ignore_dirs = {".git", "node_modules", ".next", ".venv", "venv", "__pycache__"}
-    files: list[Path] = []
-    for path in repo_path.rglob("*"):
-        if any(part in ignore_dirs for part in path.parts):
+TS_BRANCH_TYPES = (
+    "if_statement",
+    "for_statement",
+    "for_in_statement",
+    "while_statement",
+    "switch_case",
+    "catch_clause",
+    "ternary_expression",
+)
+TS_CALL_TYPES = ("call_expression", "new_expression")
+TS_METRICS_MEMO_SIZE = 50_000
+# Re-exports (`export { x } from "./y"`) are dependencies too; plain exports are not.
+TS_QUERY_PATTERNS = (
+    *(f"({node_type}) @branch" for node_type in TS_BRANCH_TYPES),
+    *(f"({node_type}) @{node_type}" for node_type in TS_CALL_TYPES),
+    "(import_statement) @import",
+    "(export_statement source: (_)) @import",
+)
+
+
+def _iter_ts_nodes(root) -> Iterator:
+    """Depth-first walk with a tree cursor, yielding nodes without materializing the tree."""
+    cursor = root.walk()
+    while True:
+        yield cursor.node
+        if cursor.goto_first_child() or cursor.goto_next_sibling():
             continue
-        if path.is_file() and path.suffix in {".py", ".ts", ".tsx", ".js", ".jsx"}:
-            files.append(path)
-    return files
-
+        while cursor.goto_parent():
+            if cursor.goto_next_sibling():
+                break
+        else:
+            return
+
+
+def _ts_captures(node, query) -> Iterator[tuple[object, str]]:
+    captures = query.captures(node)
+    # py-tree-sitter returns (node, name) pairs up to 0.22 and {name: [nodes]} from 0.23.
+    if isinstance(captures, dict):
+        return ((node, name) for name, nodes in captures.items() for node in nodes)
+    return iter(captures)
+
+
+@dataclass
+class _TsMetrics:
+    branches: int
+    calls: Counter[str]
+    imports: list[str]
+
+
+def _ts_node_metrics(node, source: bytes, query) -> _TsMetrics:
+    """Count branches and calls and collect import statements under `node`.
+
+    With a compiled query only matching nodes are materialized; otherwise a cursor walk
+    visits every node once. Both keep memory flat on multi-megabyte generated files.
+    """
+    import_nodes = []
+    metrics = _TsMetrics(0, Counter(), [])
+    if query is not None:
+        for match, name in _ts_captures(node, query):
+            if name == "branch":
+                metrics.branches += 1
+            elif name == "import":
+                import_nodes.append(match)
+            else:
+                metrics.calls[name] += 1
+    else:
+        branch_types = set(TS_BRANCH_TYPES)
+        for match in _iter_ts_nodes(node):
+            node_type = match.type
+            if node_type in branch_types:
+                metrics.branches += 1
+            elif node_type in TS_CALL_TYPES:
+                metrics.calls[node_type] += 1
+            elif node_type == "import_statement" or (
+                node_type == "export_statement" and match.child_by_field_name("source") is not None
+            ):
+                import_nodes.append(match)
+
+    import_nodes.sort(key=lambda item: item.start_byte)
+    metrics.imports = [
+        source[item.start_byte : item.end_byte].decode("utf-8", errors="ignore").strip() for item in import_nodes
+    ]
+    return metrics
 
-def _iter_ts_nodes(root) -> list:
-    stack = [root]
-    out = []
-    while stack:
-        node = stack.pop()
-        out.append(node)
-        stack.extend(reversed(node.children))
-    return out
 
+def _analyze_ts_js(tree, source: bytes, call_counter: Counter[str], query=None) -> tuple[list[str], int]:
+    """Sum the metrics of each top-level statement.
 
-def _analyze_ts_js(file_path: Path, parser, call_counter: Counter[str]) -> tuple[list[str], int]:
-    source = file_path.read_bytes()
-    tree = parser.parse(source)
+    Statement metrics are memoized by content, so after an incremental reparse only the
+    statements a commit touched are counted again.
+    """
     imports: list[str] = []
     complexity = 1
-    interesting_types = {
-        "if_statement",
-        "for_statement",
-        "for_in_statement",
-        "while_statement",
-        "switch_case",
-        "catch_clause",
-        "ternary_expression",
-        "logical_expression",
-    }
-    call_like = {"call_expression", "new_expression"}
-
-    for node in _iter_ts_nodes(tree.root_node):
-        node_type = node.type
-        if node_type in {"import_statement", "import_clause", "export_statement"}:
-            snippet = source[node.start_byte : node.end_byte].decode("utf-8", errors="ignore")
-            imports.append(snippet.strip())
-        if node_type in interesting_types:
-            complexity += 1
-        if node_type in call_like:
-            call_counter.update([node_type])
-
+    for child in tree.root_node.children:
+        digest = hashlib.blake2b(child.type.encode("ascii"), digest_size=16)
+        digest.update(source[child.start_byte : child.end_byte])
+        key = digest.digest()
+        with _ts_memo_lock:
+            metrics = _ts_memo.get(key)
+            if metrics is not None:
+                _ts_memo.move_to_end(key)
+        if metrics is None:
+            metrics = _ts_node_metrics(child, source, query)
+            with _ts_memo_lock:
+                _ts_memo[key] = metrics
+                while len(_ts_memo) > TS_METRICS_MEMO_SIZE:
+                    _ts_memo.popitem(last=False)
+        complexity += metrics.branches
+        call_counter.update(metrics.calls)
+        imports.extend(metrics.imports)
     return imports, complexity
 
 
@@ -144,91 +338,301 @@ def _safe_get_parser(language: str):
         return None
 
 
-def analyze_repository(repo_path: str, analysis_id: str) -> dict[str, object]:
+def _parser_for(suffix: str):
+    """Return this thread's parser for a JS/TS suffix; each process and thread builds its own."""
+    language = TS_LANGUAGE_BY_EXT.get(suffix)
+    if not language:
+        return None
+    parsers = _local.__dict__.setdefault("parsers", {})
+    if language not in parsers:
+        parsers[language] = _safe_get_parser(language)
+    return parsers[language]
+
+
+def _compile_query(language: str):
+    if not get_language:
+        return None
+    try:
+        ts_language = get_language(language)
+    except Exception:
+        return None
+    # Grammars differ slightly, so node types unknown to this one are dropped, not fatal.
+    patterns = []
+    for pattern in TS_QUERY_PATTERNS:
+        try:
+            ts_language.query(pattern)
+        except Exception:
+            continue
+        patterns.append(pattern)
+    return ts_language.query("\n".join(patterns)) if patterns else None
+
+
+def _query_for(suffix: str):
+    """Return the compiled analysis query for a JS/TS suffix; queries are immutable and shared."""
+    language = TS_LANGUAGE_BY_EXT.get(suffix)
+    if not language:
+        return None
+    with _queries_lock:
+        if language not in _queries:
+            _queries[language] = _compile_query(language)
+        return _queries[language]
+
+
+@dataclass
+class FileAnalysis:
+    rel: str
+    score: int
+    language: str | None = None
+    imports: list[str] = field(default_factory=list)
+    calls: Counter[str] = field(default_factory=Counter)
+    functions: list[FunctionRow] = field(default_factory=list)
+    symbols: list[SymbolRow] = field(default_factory=list)
+    references: list[ReferenceRow] = field(default_factory=list)
+
+
+def _result_to_cache(result: FileAnalysis) -> dict[str, object]:
+    return {
+        "score": result.score,
+        "language": result.language,
+        "imports": result.imports,
+        "calls": list(result.calls.items()),
+        "functions": result.functions,
+        "symbols": result.symbols,
+        "references": result.references,
+    }
+
+
+def _result_from_cache(rel: str, data: dict) -> FileAnalysis:
+    return FileAnalysis(
+        rel,
+        data["score"],
+        data["language"],
+        data["imports"],
+        Counter(dict(data["calls"])),
+        [tuple(row) for row in data["functions"]],
+        [tuple(row) for row in data["symbols"]],
+        [tuple(row) for row in data["references"]],
+    )
+
+
+def parse_source(rel: str, source: bytes, repo_path: str | Path | None = None):
+    """Parse a file for every consumer at once: an `ast.Module` for Python, a tree-sitter
+    tree for JS/TS, or None when there is no parser or the source does not parse.
+
+    With `repo_path`, JS/TS trees of large files are kept so the next revision of the same
+    file is parsed incrementally from its diff.
+    """
+    suffix = Path(rel).suffix
+    if suffix == ".py":
+        try:
+            return ast.parse(source.decode("utf-8"))
+        except (SyntaxError, UnicodeDecodeError, ValueError):
+            return None
+    parser = _parser_for(suffix)
+    if not parser:
+        return None
+    if repo_path is None:
+        return parser.parse(source)
+    return get_parse_cache().parse(parser, source, repo_path, rel)
+
+
+def analyze_parsed(rel: str, source: bytes, tree) -> FileAnalysis:
+    if isinstance(tree, ast.Module):
+        visitor = _PyFileVisitor()
+        visitor.visit(tree)
+        score = visitor.complexity + visitor.function_count + visitor.class_count
+        return FileAnalysis(
+            rel,
+            score,
+            "python",
+            visitor.imports,
+            Counter(visitor.calls),
+            visitor.functions,
+            visitor.symbols,
+            visitor.references,
+        )
+
+    if tree is not None:
+        calls: Counter[str] = Counter()
+        imports, complexity = _analyze_ts_js(tree, source, calls, _query_for(Path(rel).suffix))
+        return FileAnalysis(rel, complexity, "javascript", imports, calls)
+
+    return FileAnalysis(rel, 1)
+
+
+def _analyze_source(rel: str, source: bytes, repo_path: Path | None = None) -> FileAnalysis:
+    return analyze_parsed(rel, source, parse_source(rel, source, repo_path))
+
+
+def _init_worker(blob_repo: str | None) -> None:
+    global _worker_reader
+    if blob_repo:
+        _worker_reader = GitObjectReader(blob_repo)
+
+
+def _analyze_file_task(item: tuple[str, str]) -> FileAnalysis:
+    rel, location = item
+    source = _worker_reader.read(location) if _worker_reader else Path(location).read_bytes()
+    return _analyze_source(rel, source)
+
+
+def _analyze_files(
+    items: list[tuple[str, str]],
+    workers: int,
+    repo_root: Path,
+    from_objects: bool = False,
+) -> list[FileAnalysis]:
+    """Analyze (rel, location) items in input order, fanning out over a process pool for large repos.
+
+    A location is a file path, or with `from_objects` a blob SHA read from the object database.
+    Serial runs, the common case for the few files a commit touches, reuse the parse cache.
+    """
+    blob_repo = repo_root if from_objects else None
+    if workers <= 1 or len(items) < max(ANALYSIS_PARALLEL_MIN_FILES, 2):
+        if blob_repo is None:
+            return [_analyze_source(rel, Path(location).read_bytes(), repo_root) for rel, location in items]
+        with GitObjectReader(blob_repo) as reader:
+            return [_analyze_source(rel, reader.read(location), repo_root) for rel, location in items]
+    chunksize = max(1, len(items) // (workers * 4))
+    # spawn avoids forking the API's threads (and their locks) into the workers.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(str(blob_repo) if blob_repo else None,),
+    ) as pool:
+        return list(pool.map(_analyze_file_task, items, chunksize=chunksize))
+
+
+def analyze_repository(
+    repo_path: str,
+    analysis_id: str,
+    workers: int | None = None,
+    commit_sha: str | None = None,
+    scoring: str = "complexity",
+    churn_window_days: int | None = None,
+    repo_id: str | None = None,
+) -> dict[str, object]:
+    """Analyze the working tree, or `commit_sha` read straight from the object database.
+
+    With `repo_id`, an analysis of the working tree also refreshes the repo's symbol table
+    (files whose blob SHA is unchanged are skipped); historical commits never touch it.
+
+    `scoring="churn"` ranks file hotspots by complexity times the number of commits that
+    touched the file in the last `churn_window_days` (CHURN_WINDOW_DAYS by default, 0 for
+    all history); it raises ChurnError when the repo history cannot be read.
+    """
     repo_root = Path(repo_path)
-    code_files = _iter_code_files(repo_root)
+    if workers is None:
+        workers = ANALYSIS_WORKERS or os.cpu_count() or 1
 
     py_nodes = 0
     ts_nodes = 0
     dependency_edges: dict[str, set[str]] = defaultdict(set)
     file_scores: list[tuple[str, int]] = []
+    file_functions: list[tuple[str, list[FunctionRow]]] = []
     call_counter: Counter[str] = Counter()
-    js_parser = _safe_get_parser("javascript")
-    ts_parser = _safe_get_parser("typescript")
-
-    for file_path in code_files:
-        rel = file_path.relative_to(repo_root).as_posix()
-        if file_path.suffix == ".py":
-            try:
-                tree = ast.parse(file_path.read_text(encoding="utf-8"))
-            except (SyntaxError, UnicodeDecodeError):
-                file_scores.append((rel, 1))
-                continue
-
-            visitor = _PyFileVisitor()
-            visitor.visit(tree)
-            py_nodes += 1
-            for dep in visitor.imports:
-                dependency_edges[rel].add(dep)
-            call_counter.update(visitor.calls)
-            score = visitor.complexity + visitor.function_count + visitor.class_count
-            file_scores.append((rel, score))
-            continue
 
-        if file_path.suffix in {".js", ".jsx"} and js_parser:
-            try:
-                imports, complexity = _analyze_ts_js(file_path, js_parser, call_counter)
-            except UnicodeDecodeError:
-                file_scores.append((rel, 1))
-                continue
-            ts_nodes += 1
-            for dep in imports:
-                dependency_edges[rel].add(dep)
-            file_scores.append((rel, complexity))
-            continue
-
-        if file_path.suffix in {".ts", ".tsx"} and ts_parser:
-            try:
-                imports, complexity = _analyze_ts_js(file_path, ts_parser, call_counter)
-            except UnicodeDecodeError:
-                file_scores.append((rel, 1))
+    cache = get_analysis_cache()
+    if commit_sha:
+        entries = list_commit_files(repo_root, commit_sha, ANALYZED_EXTENSIONS)
+        code_files = [(entry.rel, entry.blob_sha) for entry in entries]
+        blob_shas = {entry.rel: entry.blob_sha for entry in entries}
+    else:
+        repo_files = list_repo_files(repo_root, ANALYZED_EXTENSIONS)
+        code_files = [(repo_file.rel, str(repo_file.path)) for repo_file in repo_files]
+        blob_shas = worktree_blob_shas(repo_root, [rel for rel, _ in code_files]) if cache else {}
+    cached = cache.get_many(list(blob_shas.values()), ANALYZER_VERSION) if cache else {}
+    pending = [(rel, location) for rel, location in code_files if blob_shas.get(rel) not in cached]
+    computed = {
+        result.rel: result
+        for result in _analyze_files(pending, workers, repo_root, from_objects=bool(commit_sha))
+    }
+    if cache:
+        # Fallback results (no parser available) are cheap and must not outlive the fallback.
+        cache.put_many(
+            {
+                blob_shas[result.rel]: _result_to_cache(result)
+                for result in computed.values()
+                if result.language and result.rel in blob_shas
+            },
+            ANALYZER_VERSION,
+        )
+
+    symbols = SymbolIndex(repo_id) if repo_id and not commit_sha else None
+    try:
+        for rel, _ in code_files:
+            result = computed.get(rel) or _result_from_cache(rel, cached[blob_shas[rel]])
+            file_scores.append((result.rel, result.score))
+            file_functions.append((result.rel, result.functions))
+            if symbols is not None:
+                symbols.replace_file(result.rel, blob_shas.get(result.rel), result.symbols, result.references)
+            if result.language is None:
                 continue
-            ts_nodes += 1
-            for dep in imports:
-                dependency_edges[rel].add(dep)
-            file_scores.append((rel, complexity))
-            continue
-
-        file_scores.append((rel, 1))
-
-    hotspots = [
-        {"file": file_name, "reason": f"high structural complexity score={score}"}
-        for file_name, score in sorted(file_scores, key=lambda item: item[1], reverse=True)[:5]
-    ]
+            if result.language == "python":
+                py_nodes += 1
+            else:
+                ts_nodes += 1
+            for dep in result.imports:
+                dependency_edges[result.rel].add(dep)
+            call_counter.update(result.calls)
+        if symbols is not None:
+            symbols.retain({rel for rel, _ in code_files})
+            symbols.commit()
+    finally:
+        if symbols is not None:
+            symbols.close()
+
+    if scoring == "churn":
+        window_days = CHURN_WINDOW_DAYS if churn_window_days is None else churn_window_days
+        churn = file_churn(repo_root, commit_sha or "HEAD", window_days)
+        ranked = [(rel, score * churn[rel].commits if rel in churn else 0) for rel, score in file_scores]
+        hotspots = [
+            {
+                "file": file_name,
+                "reason": (
+                    f"churn x complexity score={score} "
+                    f"({churn[file_name].commits} commits, +{churn[file_name].added}/-{churn[file_name].removed} lines, "
+                    f"{churn[file_name].authors} authors)"
+                ),
+            }
+            for file_name, score in heapq.nlargest(5, ranked, key=lambda item: item[1])
+            if score > 0
+        ]
+        window = f"the last {window_days} days" if window_days > 0 else "all history"
+        scoring_note = f"Hotspots weighted by churn over {window}"
+        scoring_note += " (shallow clone: history is truncated). " if is_shallow(repo_root) else ". "
+    else:
+        hotspots = [
+            {"file": file_name, "reason": f"high structural complexity score={score}"}
+            for file_name, score in heapq.nlargest(5, file_scores, key=lambda item: item[1])
+        ]
+        scoring_note = ""
+    functions = FunctionTable.build(file_functions)
 
     top_calls = ", ".join(name for name, _ in call_counter.most_common(5)) or "n/a"
     summary = (
         f"Scanned {len(code_files)} code files; parsed {py_nodes} Python and {ts_nodes} JS/TS files via AST. "
-        f"Top recurring calls: {top_calls}."
+        f"Top recurring calls: {top_calls}. Measured {len(functions)} Python functions. "
+        f"{scoring_note}"
+        f"Served {len(code_files) - len(pending)} of {len(code_files)} files from the analysis cache."
     )
 
-    graph_payload = {
-        "nodes": sorted({*dependency_edges.keys()}),
-        "edges": [
-            {"from": src, "to": dep}
-            for src, deps in dependency_edges.items()
-            for dep in sorted(deps)
-        ],
-    }
-
-    graph_dir = ARTIFACTS_DIR / analysis_id
-    graph_dir.mkdir(parents=True, exist_ok=True)
-    graph_path = graph_dir / "graph.json"
-    graph_path.write_text(json.dumps(graph_payload, indent=2), encoding="utf-8")
+    # Edges stream straight into the artifact instead of an intermediate dict.
+    write_json = GRAPH_ARTIFACT_FORMAT == "json"
+    writer = GraphArtifactWriter(ARTIFACTS_DIR / analysis_id, sorted(dependency_edges), {}, write_json)
+    for src, deps in dependency_edges.items():
+        for dep in sorted(deps):
+            writer.add_edge(src, dep)
+    writer.close({"edge_count": len(writer), "node_count": writer.node_count})
 
     return {
         "status": "completed",
         "summary": summary,
         "hotspots": hotspots,
-        "module_graph_url": f"/artifacts/{analysis_id}/graph.json",
+        "module_graph_url": (
+            f"/artifacts/{analysis_id}/graph.json" if write_json else f"/analysis/{analysis_id}/edges"
+        ),
+        "functions": functions,
     }
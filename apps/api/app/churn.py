@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import subprocess
+import threading
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .config import CHURN_DB_PATH
+
+_LOG_FORMAT = "--format=%x1e%H%x1f%ct%x1f%aE"
+_READ_SIZE = 1 << 16
+_INSERT_BATCH = 1000
+
+
+class ChurnError(RuntimeError):
+    pass
+
+
+@dataclass
+class FileChurn:
+    commits: int
+    added: int
+    removed: int
+    authors: int
+
+
+@dataclass
+class _Commit:
+    sha: str
+    timestamp: int
+    author: str
+    changes: list[tuple[str, int, int]] = field(default_factory=list)
+
+
+def _git(args: list[str], cwd: Path) -> str | None:
+    proc = subprocess.run(["git", *args], cwd=str(cwd), capture_output=True, text=True, check=False)
+    if proc.returncode != 0:
+        return None
+    return proc.stdout.strip()
+
+
+def _connect() -> sqlite3.Connection:
+    CHURN_DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(CHURN_DB_PATH, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS churn_state (
+            repo TEXT PRIMARY KEY,
+            last_sha TEXT NOT NULL,
+            covered_since INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS churn_commits (
+            repo TEXT NOT NULL,
+            sha TEXT NOT NULL,
+            ts INTEGER NOT NULL,
+            author TEXT NOT NULL,
+            PRIMARY KEY (repo, sha)
+        );
+        CREATE TABLE IF NOT EXISTS churn_changes (
+            repo TEXT NOT NULL,
+            sha TEXT NOT NULL,
+            path TEXT NOT NULL,
+            added INTEGER NOT NULL,
+            removed INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_churn_commits_ts ON churn_commits(repo, ts);
+        CREATE INDEX IF NOT EXISTS idx_churn_changes_sha ON churn_changes(repo, sha);
+        """
+    )
+    return conn
+
+
+def iter_log(repo_path: Path, rev_range: str, since: int = 0) -> Iterator[_Commit]:
+    """Stream commits with their numstat from one `git log --numstat -z` process, newest first."""
+    args = ["git", "log", "-z", "--numstat", "--no-renames", _LOG_FORMAT]
+    if since:
+        args.append(f"--since=@{since}")
+    proc = subprocess.Popen(
+        [*args, rev_range],
+        cwd=str(repo_path),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    assert proc.stdout is not None
+    current: _Commit | None = None
+    pending = b""
+    try:
+        for block in iter(lambda: proc.stdout.read(_READ_SIZE), b""):
+            pending += block
+            *tokens, pending = pending.split(b"\0")
+            for token in tokens:
+                if token.startswith(b"\x1e"):
+                    if current:
+                        yield current
+                    sha, timestamp, author = token[1:].decode("utf-8", errors="replace").split("\x1f")
+                    current = _Commit(sha, int(timestamp), author.lower())
+                    continue
+                added, removed, path = token.lstrip(b"\n").split(b"\t", 2)
+                if current and path:
+                    # Binary files report "-" for both counts.
+                    current.changes.append(
+                        (os.fsdecode(path), int(added) if added != b"-" else 0, int(removed) if removed != b"-" else 0)
+                    )
+        if current:
+            yield current
+    finally:
+        proc.stdout.close()
+        if proc.wait() != 0 and current is None:
+            raise ChurnError(f"git log failed for {rev_range}")
+
+
+class ChurnTable:
+    """Per-commit numstat rows of one repo, cached in SQLite and extended from the last seen commit.
+
+    Rows are kept per commit rather than aggregated, so any window inside the covered range
+    can be answered with one query as the window slides forward.
+    """
+
+    def __init__(self, repo_path: str | Path) -> None:
+        self.repo_path = Path(repo_path)
+        self.repo = str(self.repo_path.resolve())
+        self._lock = threading.Lock()
+        self._conn = _connect()
+
+    def _state(self) -> tuple[str, int] | None:
+        row = self._conn.execute(
+            "SELECT last_sha, covered_since FROM churn_state WHERE repo=?", (self.repo,)
+        ).fetchone()
+        return (row[0], int(row[1])) if row else None
+
+    def _reset(self) -> None:
+        for table in ("churn_state", "churn_commits", "churn_changes"):
+            self._conn.execute(f"DELETE FROM {table} WHERE repo=?", (self.repo,))
+
+    def update(self, head_sha: str, since: int = 0) -> int:
+        """Bring the table up to `head_sha` with history from `since` (0 = all); returns new commits."""
+        with self._lock:
+            state = self._state()
+            rev_range = head_sha
+            if state:
+                last_sha, covered_since = state
+                if last_sha == head_sha and covered_since <= since:
+                    return 0
+                is_ancestor = _git(["merge-base", "--is-ancestor", last_sha, head_sha], self.repo_path) is not None
+                if covered_since <= since and is_ancestor:
+                    rev_range = f"{last_sha}..{head_sha}"
+                    since = covered_since
+                else:
+                    # Rewritten history or a wider window than cached: start over.
+                    self._reset()
+            added = 0
+            commits: list[tuple[str, str, int, str]] = []
+            changes: list[tuple[str, str, str, int, int]] = []
+            for commit in iter_log(self.repo_path, rev_range, since):
+                commits.append((self.repo, commit.sha, commit.timestamp, commit.author))
+                changes.extend((self.repo, commit.sha, path, plus, minus) for path, plus, minus in commit.changes)
+                if len(commits) >= _INSERT_BATCH:
+                    added += self._insert(commits, changes)
+            added += self._insert(commits, changes)
+            self._conn.execute(
+                "INSERT INTO churn_state (repo, last_sha, covered_since) VALUES (?, ?, ?) "
+                "ON CONFLICT(repo) DO UPDATE SET last_sha=excluded.last_sha, covered_since=excluded.covered_since",
+                (self.repo, head_sha, since),
+            )
+            self._conn.commit()
+            return added
+
+    def _insert(self, commits: list[tuple], changes: list[tuple]) -> int:
+        self._conn.executemany("INSERT OR IGNORE INTO churn_commits VALUES (?, ?, ?, ?)", commits)
+        self._conn.executemany("INSERT INTO churn_changes VALUES (?, ?, ?, ?, ?)", changes)
+        count = len(commits)
+        commits.clear()
+        changes.clear()
+        return count
+
+    def stats(self, since: int = 0, until: int | None = None) -> dict[str, FileChurn]:
+        """Aggregate commits, added/removed lines and distinct authors per path over [since, until]."""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT ch.path, COUNT(DISTINCT c.sha), SUM(ch.added), SUM(ch.removed), COUNT(DISTINCT c.author)
+                FROM churn_changes ch
+                JOIN churn_commits c ON c.repo = ch.repo AND c.sha = ch.sha
+                WHERE ch.repo = ? AND c.ts >= ? AND c.ts <= ?
+                GROUP BY ch.path
+                """,
+                (self.repo, since, until if until is not None else 2**62),
+            ).fetchall()
+        return {path: FileChurn(commits, added, removed, authors) for path, commits, added, removed, authors in rows}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def commit_timestamp(repo_path: str | Path, rev: str) -> int | None:
+    out = _git(["log", "-1", "--format=%ct", rev], Path(repo_path))
+    return int(out) if out else None
+
+
+def is_shallow(repo_path: str | Path) -> bool:
+    return _git(["rev-parse", "--is-shallow-repository"], Path(repo_path)) == "true"
+
+
+def file_churn(repo_path: str | Path, rev: str, window_days: int) -> dict[str, FileChurn]:
+    """Churn per path over the `window_days` before `rev` (0 = whole history), from the cached table."""
+    head_sha = _git(["rev-parse", "--verify", "--quiet", f"{rev}^{{commit}}"], Path(repo_path))
+    if not head_sha:
+        raise ChurnError(f"commit {rev} not found in repository")
+    until = commit_timestamp(repo_path, head_sha) or 0
+    since = max(0, until - window_days * 86400) if window_days > 0 else 0
+    table = ChurnTable(repo_path)
+    try:
+        table.update(head_sha, since)
+        return table.stats(since, until)
+    finally:
+        table.close()
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path, PurePosixPath
+
+from .analysis_cache import AnalysisCache, get_analysis_cache, git_blob_sha
+from .ast_analyzer import (
+    ANALYZED_EXTENSIONS,
+    ANALYZER_VERSION,
+    FileAnalysis,
+    _result_from_cache,
+    _result_to_cache,
+    analyze_parsed,
+    parse_source,
+)
+from .repo_files import list_repo_files
+
+SCAN_BATCH_SIZE = 256
+
+
+@dataclass(eq=False)
+class ScannedFile:
+    """One code file read once; its text and syntax tree are shared by every consumer."""
+
+    rel: str
+    source: bytes
+    blob_sha: str
+    analysis: FileAnalysis | None = None
+    repo_path: str | None = None
+
+    @property
+    def suffix(self) -> str:
+        return PurePosixPath(self.rel).suffix
+
+    @cached_property
+    def text(self) -> str | None:
+        try:
+            return self.source.decode("utf-8")
+        except UnicodeDecodeError:
+            return None
+
+    @cached_property
+    def syntax_tree(self):
+        return parse_source(self.rel, self.source, self.repo_path)
+
+
+def _analyze_batch(files: list[ScannedFile], cache: AnalysisCache | None) -> None:
+    analyzable = [item for item in files if item.suffix in ANALYZED_EXTENSIONS]
+    cached = cache.get_many([item.blob_sha for item in analyzable], ANALYZER_VERSION) if cache else {}
+    fresh: dict[str, dict[str, object]] = {}
+    for item in analyzable:
+        if item.blob_sha in cached:
+            item.analysis = _result_from_cache(item.rel, cached[item.blob_sha])
+            continue
+        item.analysis = analyze_parsed(item.rel, item.source, item.syntax_tree)
+        if item.analysis.language:
+            fresh[item.blob_sha] = _result_to_cache(item.analysis)
+    if cache and fresh:
+        cache.put_many(fresh, ANALYZER_VERSION)
+
+
+def scan_repository(
+    repo_path: str | Path,
+    rels: Iterable[str] | None = None,
+    analyze: bool = True,
+) -> Iterator[ScannedFile]:
+    """Read each code file once, in listing order, and analyze it from the same buffer.
+
+    Analysis results go through the analysis cache, so running `analyze_repository` on a
+    tree that was just scanned (e.g. by the indexer) reads no files at all. Files that
+    disappear between listing and reading are skipped.
+    """
+    root = Path(repo_path)
+    if rels is None:
+        rels = [repo_file.rel for repo_file in list_repo_files(root)]
+    cache = get_analysis_cache() if analyze else None
+    batch: list[ScannedFile] = []
+    for rel in rels:
+        try:
+            source = (root / rel).read_bytes()
+        except OSError:
+            continue
+        batch.append(ScannedFile(rel, source, git_blob_sha(source), repo_path=str(root)))
+        if len(batch) >= SCAN_BATCH_SIZE:
+            if analyze:
+                _analyze_batch(batch, cache)
+            yield from batch
+            batch = []
+    if analyze:
+        _analyze_batch(batch, cache)
+    yield from batch
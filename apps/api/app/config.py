@@ -11,15 +11,55 @@ ARTIFACTS_DIR = DATA_DIR / "artifacts"
 LOG_DIR = DATA_DIR / "logs"
 BACKUP_DIR = DATA_DIR / "backups"
 DB_PATH = Path(os.getenv("CODEBASE_AGENT_DB_PATH", DATA_DIR / "agent.sqlite3"))
+INDEX_DB_PATH = Path(os.getenv("CODEBASE_AGENT_INDEX_DB_PATH", DATA_DIR / "index.sqlite3"))
+REPO_WALK_MODE = os.getenv("REPO_WALK_MODE", "auto")
+REPO_FILE_MAX_BYTES = int(os.getenv("REPO_FILE_MAX_BYTES", "1000000"))
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "0"))
+ANALYSIS_PARALLEL_MIN_FILES = int(os.getenv("ANALYSIS_PARALLEL_MIN_FILES", "200"))
+ANALYSIS_CACHE_PATH = Path(os.getenv("ANALYSIS_CACHE_PATH", DATA_DIR / "analysis_cache.sqlite3"))
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "200000"))
+ANALYSIS_TREE_CACHE_FILES = int(os.getenv("ANALYSIS_TREE_CACHE_FILES", "64"))
+CHURN_DB_PATH = Path(os.getenv("CHURN_DB_PATH", DATA_DIR / "churn.sqlite3"))
+CHURN_WINDOW_DAYS = int(os.getenv("CHURN_WINDOW_DAYS", "365"))
+SYMBOL_DB_PATH = Path(os.getenv("SYMBOL_DB_PATH", DATA_DIR / "symbols.sqlite3"))
+INGEST_HISTORY_DEPTH = int(os.getenv("INGEST_HISTORY_DEPTH", "1"))
+GRAPH_ARTIFACT_FORMAT = os.getenv("GRAPH_ARTIFACT_FORMAT", "npz")
+GRAPH_HISTORY_LIMIT = int(os.getenv("GRAPH_HISTORY_LIMIT", "20"))
+INDEX_BATCH_SIZE = int(os.getenv("INDEX_BATCH_SIZE", "256"))
+INDEX_QUEUE_SIZE = int(os.getenv("INDEX_QUEUE_SIZE", "1024"))
+CHUNK_STRATEGY = os.getenv("CHUNK_STRATEGY", "syntax")
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "512"))
+CHUNK_OVERLAP_LINES = int(os.getenv("CHUNK_OVERLAP_LINES", "2"))
 
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_CHAT_MODEL = os.getenv("OLLAMA_CHAT_MODEL", "llama3.1:70b")
 OLLAMA_CODE_MODEL = os.getenv("OLLAMA_CODE_MODEL", "deepseek-coder-v2:32b")
 OLLAMA_EMBED_MODEL = os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text")
 OLLAMA_FALLBACK_MODEL = os.getenv("OLLAMA_FALLBACK_MODEL", "qwen2.5:72b")
+OLLAMA_EMBED_BATCH_SIZE = int(os.getenv("OLLAMA_EMBED_BATCH_SIZE", "64"))
+OLLAMA_EMBED_CONCURRENCY = int(os.getenv("OLLAMA_EMBED_CONCURRENCY", "4"))
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "60"))
+EMBED_CACHE_PATH = Path(os.getenv("EMBED_CACHE_PATH", DATA_DIR / "embed_cache.sqlite3"))
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "500000"))
+GITHUB_API_TIMEOUT = float(os.getenv("GITHUB_API_TIMEOUT", "20"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+HTTP_POOL_HOSTS = int(os.getenv("HTTP_POOL_HOSTS", "10"))
 
 VECTOR_STORE = os.getenv("VECTOR_STORE", "chroma")
 VECTOR_STORE_DIR = Path(os.getenv("VECTOR_STORE_DIR", DATA_DIR / "vectorstore"))
+VECTOR_STORE_DTYPE = os.getenv("VECTOR_STORE_DTYPE", "float32")
+VECTOR_STORE_QUANTIZATION = os.getenv("VECTOR_STORE_QUANTIZATION", "none")
+VECTOR_STORE_RERANK_FACTOR = int(os.getenv("VECTOR_STORE_RERANK_FACTOR", "4"))
+CHROMA_WARMUP_COLLECTIONS = int(os.getenv("CHROMA_WARMUP_COLLECTIONS", "16"))
+LEXICAL_INDEX_DIR = Path(os.getenv("LEXICAL_INDEX_DIR", DATA_DIR / "lexical"))
+CHAT_RETRIEVAL_MODE = os.getenv("CHAT_RETRIEVAL_MODE", "hybrid")
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "20"))
+RETRIEVAL_RRF_K = int(os.getenv("RETRIEVAL_RRF_K", "60"))
+CODE_SEARCH_DIR = Path(os.getenv("CODE_SEARCH_DIR", DATA_DIR / "code_search"))
+CODE_SEARCH_MAX_REGEX_CHARS = int(os.getenv("CODE_SEARCH_MAX_REGEX_CHARS", "256"))
+CODE_SEARCH_MAX_SCAN_BYTES = int(os.getenv("CODE_SEARCH_MAX_SCAN_BYTES", str(128 * 1024 * 1024)))
+RETRIEVAL_SYMBOL_LIMIT = int(os.getenv("RETRIEVAL_SYMBOL_LIMIT", "3"))
 
 REPOS_DIR.mkdir(parents=True, exist_ok=True)
 ARTIFACTS_DIR.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import heapq
+from collections.abc import Iterable
+
+import numpy as np
+
+FUNCTION_METRICS = ("complexity", "loc", "nesting", "params")
+FUNCTION_DTYPE = np.dtype(
+    [
+        ("file", np.int32),
+        ("line", np.int32),
+        ("complexity", np.int32),
+        ("loc", np.int32),
+        ("nesting", np.int16),
+        ("params", np.int16),
+    ]
+)
+
+# (qualified name, line, complexity, loc, nesting, params) as produced by the analyzer.
+FunctionRow = tuple[str, int, int, int, int, int]
+
+
+class FunctionTable:
+    """Per-function metrics of one analysis in columnar form.
+
+    Numbers live in one structured array (16 bytes per function); file paths are interned
+    and referenced by index, and names sit in a parallel list.
+    """
+
+    def __init__(self, files: list[str], names: list[str], rows: np.ndarray) -> None:
+        self.files = files
+        self.names = names
+        self.rows = rows
+
+    @classmethod
+    def build(cls, per_file: Iterable[tuple[str, list[FunctionRow]]]) -> FunctionTable:
+        files: list[str] = []
+        names: list[str] = []
+        records: list[tuple[int, int, int, int, int, int]] = []
+        for rel, functions in per_file:
+            if not functions:
+                continue
+            file_idx = len(files)
+            files.append(rel)
+            for name, line, complexity, loc, nesting, params in functions:
+                names.append(name)
+                records.append((file_idx, line, complexity, loc, nesting, params))
+        return cls(files, names, np.array(records, dtype=FUNCTION_DTYPE))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def top(self, limit: int, offset: int = 0, metric: str = "complexity") -> list[dict[str, object]]:
+        """Return rows `offset` to `offset + limit` of the ranking by `metric`, largest first.
+
+        Ties fall back to LOC (or complexity when ranking by LOC), then to analysis order.
+        A bounded heap keeps this O(n log k) instead of sorting every function.
+        """
+        if metric not in FUNCTION_METRICS:
+            raise ValueError(f"unknown function metric: {metric}")
+        wanted = offset + limit
+        if wanted <= 0 or not len(self):
+            return []
+        tiebreak = "complexity" if metric == "loc" else "loc"
+        keys = ((self.rows[metric].astype(np.int64) << 32) | self.rows[tiebreak].astype(np.int64)).tolist()
+        ranked = heapq.nlargest(wanted, range(len(keys)), key=keys.__getitem__)
+        return [self.row(idx) for idx in ranked[offset:]]
+
+    def row(self, idx: int) -> dict[str, object]:
+        row = self.rows[idx]
+        return {
+            "file": self.files[int(row["file"])],
+            "name": self.names[idx],
+            "line": int(row["line"]),
+            "complexity": int(row["complexity"]),
+            "loc": int(row["loc"]),
+            "nesting": int(row["nesting"]),
+            "params": int(row["params"]),
+        }
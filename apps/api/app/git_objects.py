@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+
+class GitObjectError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class TreeEntry:
+    rel: str
+    blob_sha: str
+    size: int
+
+
+def _run_git(args: list[str], cwd: Path) -> bytes:
+    proc = subprocess.run(["git", *args], cwd=str(cwd), capture_output=True, check=False)
+    if proc.returncode != 0:
+        message = proc.stderr.decode("utf-8", errors="replace").strip()
+        raise GitObjectError(message or "git command failed")
+    return proc.stdout
+
+
+def resolve_commit(repo_path: str | Path, rev: str) -> str:
+    try:
+        out = _run_git(["rev-parse", "--verify", "--quiet", f"{rev}^{{commit}}"], Path(repo_path))
+    except GitObjectError as exc:
+        raise GitObjectError(f"commit {rev} not found in repository") from exc
+    return out.decode("ascii").strip()
+
+
+def list_tree(repo_path: str | Path, commit_sha: str) -> list[TreeEntry]:
+    """List the regular files of a commit with their blob SHAs and sizes, sorted by path."""
+    out = _run_git(["ls-tree", "-r", "-z", "--long", commit_sha], Path(repo_path))
+    entries: list[TreeEntry] = []
+    for record in out.split(b"\0"):
+        if not record:
+            continue
+        meta, _, path = record.partition(b"\t")
+        mode, object_type, blob_sha, size = meta.split()
+        # Skips symlinks (120000) and submodules (160000).
+        if object_type != b"blob" or mode not in {b"100644", b"100755"}:
+            continue
+        entries.append(TreeEntry(os.fsdecode(path), blob_sha.decode("ascii"), int(size)))
+    entries.sort(key=lambda entry: entry.rel)
+    return entries
+
+
+class GitObjectReader:
+    """Reads objects through one long-lived `git cat-file --batch` process.
+
+    Reading from the object database never touches the working tree, so reads can run
+    while another request checks out or commits in the same repo.
+    """
+
+    def __init__(self, repo_path: str | Path) -> None:
+        self._lock = threading.Lock()
+        self._proc = subprocess.Popen(
+            ["git", "cat-file", "--batch"],
+            cwd=str(repo_path),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def read(self, object_name: str) -> bytes:
+        with self._lock:
+            stdin = self._proc.stdin
+            stdout = self._proc.stdout
+            if stdin is None or stdout is None or self._proc.poll() is not None:
+                raise GitObjectError("git cat-file process is not running")
+            stdin.write(object_name.encode("utf-8") + b"\n")
+            stdin.flush()
+            header = stdout.readline()
+            parts = header.split()
+            if len(parts) != 3:
+                raise GitObjectError(f"cannot read {object_name}: {header.decode('utf-8', errors='replace').strip()}")
+            data = stdout.read(int(parts[2]))
+            stdout.read(1)
+            return data
+
+    def close(self) -> None:
+        with self._lock:
+            if self._proc.poll() is None:
+                if self._proc.stdin:
+                    self._proc.stdin.close()
+                try:
+                    self._proc.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    self._proc.kill()
+            if self._proc.stdout:
+                self._proc.stdout.close()
+
+    def __enter__(self) -> GitObjectReader:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
@@ -7,7 +7,9 @@ from dataclasses import dataclass
 from pathlib import Path
 
 import jwt
-import requests
+
+from .config import GITHUB_API_TIMEOUT
+from .http_pool import get_http_client
 
 
 class GithubAppError(RuntimeError):
@@ -54,7 +56,7 @@ def _request_installation_token(config: GithubAppConfig) -> str:
         "Accept": "application/vnd.github+json",
         "X-GitHub-Api-Version": "2022-11-28",
     }
-    resp = requests.post(url, headers=headers, timeout=20)
+    resp = get_http_client("github", GITHUB_API_TIMEOUT).post(url, headers=headers)
     if resp.status_code >= 400:
         raise GithubAppError(f"Failed to create installation token: {resp.status_code} {resp.text}")
     return resp.json()["token"]
@@ -77,7 +79,7 @@ def _api_request(
         "Accept": "application/vnd.github+json",
         "X-GitHub-Api-Version": "2022-11-28",
     }
-    resp = requests.request(method, url, headers=headers, json=payload, timeout=20)
+    resp = get_http_client("github", GITHUB_API_TIMEOUT).request(method, url, headers=headers, json=payload)
     if allow_statuses and resp.status_code in allow_statuses:
         return {"status_code": resp.status_code, "raw": resp.text}
     if resp.status_code >= 400:
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import IO, Any, Iterator
+
+import numpy as np
+
+EDGE_KINDS = ("", "import", "external")
+_ARTIFACT_CACHE_SIZE = 8
+
+
+def pack_strings(values: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """Concatenate strings into one UTF-8 byte array plus int64 offsets (n + 1 entries)."""
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(item) for item in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def unpack_strings(blob: np.ndarray, offsets: np.ndarray) -> list[str]:
+    data = blob.tobytes()
+    bounds = offsets.tolist()
+    return [data[bounds[idx] : bounds[idx + 1]].decode("utf-8") for idx in range(len(bounds) - 1)]
+
+
+def save_npz(path: Path, **arrays: np.ndarray) -> None:
+    """Write arrays to `path` through a temp file, so readers never see a partial artifact."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with tmp_path.open("wb") as handle:
+        np.savez(handle, **arrays)
+    os.replace(tmp_path, path)
+
+
+class GraphArtifactWriter:
+    """Streams a graph to `edges.npz` (and, opt-in, `graph.json`) without building it in memory.
+
+    Node and target names are interned into one string table with the nodes first, and edges
+    are appended to int32 arrays as they arrive. The JSON variant is written edge by edge
+    to a temp file in the same pass.
+    """
+
+    def __init__(self, directory: Path, nodes: list[str], meta: dict[str, Any], write_json: bool = False) -> None:
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.node_count = len(nodes)
+        self.meta = dict(meta)
+        self._ids: dict[str, int] = {name: idx for idx, name in enumerate(nodes)}
+        self._strings = list(nodes)
+        self._src = array("i")
+        self._dst = array("i")
+        self._spec = array("i")
+        self._kind = array("b")
+        self._json: IO[str] | None = None
+        if write_json:
+            self._json = (directory / "graph.json.tmp").open("w", encoding="utf-8")
+            header = json.dumps({**self.meta, "nodes": nodes})
+            self._json.write(header[:-1] + ', "edges": [')
+
+    def _intern(self, value: str) -> int:
+        idx = self._ids.get(value)
+        if idx is None:
+            idx = self._ids[value] = len(self._strings)
+            self._strings.append(value)
+        return idx
+
+    def add_edge(self, src: str, dst: str, kind: str = "", spec: str | None = None) -> None:
+        if self._json is not None:
+            edge = {"from": src, "to": dst}
+            if kind:
+                edge["type"] = kind
+            if spec is not None:
+                edge["spec"] = spec
+            self._json.write(("\n" if not self._src else ",\n") + json.dumps(edge))
+        self._src.append(self._intern(src))
+        self._dst.append(self._intern(dst))
+        self._spec.append(self._intern(spec) if spec is not None else -1)
+        self._kind.append(EDGE_KINDS.index(kind))
+
+    def __len__(self) -> int:
+        return len(self._src)
+
+    def edge_arrays(self, kind: str | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """(src, dst) node ids of the edges written so far, optionally of one kind only."""
+        src = np.array(self._src, dtype=np.int32)
+        dst = np.array(self._dst, dtype=np.int32)
+        if kind is None:
+            return src, dst
+        mask = np.array(self._kind, dtype=np.int8) == EDGE_KINDS.index(kind)
+        return src[mask], dst[mask]
+
+    def close(self, stats: dict[str, Any]) -> None:
+        self.meta["stats"] = stats
+        names, name_offsets = pack_strings(self._strings)
+        save_npz(
+            self.directory / "edges.npz",
+            meta=np.frombuffer(json.dumps(self.meta).encode("utf-8"), dtype=np.uint8),
+            node_count=np.array(self.node_count, dtype=np.int64),
+            names=names,
+            name_offsets=name_offsets,
+            src=np.frombuffer(self._src, dtype=np.int32),
+            dst=np.frombuffer(self._dst, dtype=np.int32),
+            spec=np.frombuffer(self._spec, dtype=np.int32),
+            kind=np.frombuffer(self._kind, dtype=np.int8),
+        )
+        if self._json is None:
+            # A JSON copy from an earlier opt-in run would otherwise go stale next to the npz.
+            (self.directory / "graph.json").unlink(missing_ok=True)
+            return
+        self._json.write("\n], " + json.dumps({"stats": stats})[1:] + "\n")
+        self._json.close()
+        os.replace(self.directory / "graph.json.tmp", self.directory / "graph.json")
+
+
+class EdgeArtifact:
+    """Read side of `edges.npz`; strings are decoded lazily, per page of edges."""
+
+    def __init__(self, path: Path) -> None:
+        with np.load(path) as data:
+            self.meta: dict[str, Any] = json.loads(data["meta"].tobytes())
+            self.node_count = int(data["node_count"])
+            self._names = data["names"].tobytes()
+            self._offsets = data["name_offsets"].tolist()
+            self.src = data["src"]
+            self.dst = data["dst"]
+            self.spec = data["spec"]
+            self.kind = data["kind"]
+
+    def __len__(self) -> int:
+        return len(self.src)
+
+    def name(self, idx: int) -> str:
+        return self._names[self._offsets[idx] : self._offsets[idx + 1]].decode("utf-8")
+
+    @property
+    def nodes(self) -> list[str]:
+        return [self.name(idx) for idx in range(self.node_count)]
+
+    def edges(self, offset: int = 0, limit: int | None = None) -> Iterator[dict[str, str]]:
+        stop = len(self) if limit is None else min(len(self), offset + limit)
+        rows = zip(
+            self.src[offset:stop].tolist(),
+            self.dst[offset:stop].tolist(),
+            self.kind[offset:stop].tolist(),
+            self.spec[offset:stop].tolist(),
+        )
+        for src, dst, kind, spec in rows:
+            edge = {"from": self.name(src), "to": self.name(dst)}
+            if EDGE_KINDS[kind]:
+                edge["type"] = EDGE_KINDS[kind]
+            if spec >= 0:
+                edge["spec"] = self.name(spec)
+            yield edge
+
+
+_artifacts: OrderedDict[tuple[str, int], EdgeArtifact] = OrderedDict()
+_artifacts_lock = threading.Lock()
+
+
+def load_edges(path: Path) -> EdgeArtifact | None:
+    """Load an `edges.npz`, cached until the file is rewritten."""
+    try:
+        key = (str(path), path.stat().st_mtime_ns)
+    except FileNotFoundError:
+        return None
+    with _artifacts_lock:
+        artifact = _artifacts.get(key)
+        if artifact is not None:
+            _artifacts.move_to_end(key)
+            return artifact
+    artifact = EdgeArtifact(path)
+    with _artifacts_lock:
+        _artifacts[key] = artifact
+        while len(_artifacts) > _ARTIFACT_CACHE_SIZE:
+            _artifacts.popitem(last=False)
+    return artifact
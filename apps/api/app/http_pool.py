@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+import weakref
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from typing import Any
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool
+
+from .config import HTTP_CONNECT_TIMEOUT, HTTP_POOL_HOSTS, HTTP_POOL_MAXSIZE
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - optional at runtime
+    httpx = None
+
+
+class HttpPoolError(RuntimeError):
+    pass
+
+
+@dataclass
+class HostStats:
+    requests: int = 0
+    errors: int = 0
+    connections_opened: int = 0
+    seconds: float = 0.0
+
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(str(url))
+    return f"{parts.scheme}://{parts.hostname}:{parts.port or _DEFAULT_PORTS.get(parts.scheme, 0)}"
+
+
+class _Metrics:
+    """Per-host request counts, failures, new connections and time spent, thread-safe."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._hosts: dict[str, HostStats] = defaultdict(HostStats)
+
+    def record(self, origin: str, seconds: float, failed: bool) -> None:
+        with self._lock:
+            stats = self._hosts[origin]
+            stats.requests += 1
+            stats.errors += failed
+            stats.seconds += seconds
+
+    def connected(self, origin: str) -> None:
+        with self._lock:
+            self._hosts[origin].connections_opened += 1
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            hosts = {origin: asdict(stats) for origin, stats in self._hosts.items()}
+        for stats in hosts.values():
+            stats["reused"] = max(stats["requests"] - stats["connections_opened"], 0)
+            stats["avg_ms"] = round(stats.pop("seconds") * 1000 / stats["requests"], 2) if stats["requests"] else 0.0
+        return hosts
+
+
+class _CountingPool:
+    """Mixed into urllib3's connection pools to report each connection they open."""
+
+    metrics: _Metrics
+
+    def _new_conn(self):
+        self.metrics.connected(f"{self.scheme}://{self.host}:{self.port or _DEFAULT_PORTS[self.scheme]}")
+        return super()._new_conn()
+
+
+class _CountingAdapter(HTTPAdapter):
+    def __init__(self, metrics: _Metrics, **kwargs: Any) -> None:
+        self._metrics = metrics
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: type(f"Counting{base.__name__}", (_CountingPool, base), {"metrics": self._metrics})
+            for scheme, base in (("http", HTTPConnectionPool), ("https", HTTPSConnectionPool))
+        }
+
+
+class PooledClient:
+    """A keep-alive `requests.Session` shared by every caller of one upstream service.
+
+    Connections are pooled per host (up to `HTTP_POOL_MAXSIZE` idle ones each), so repeated
+    calls skip DNS, TCP and TLS setup. Requests get a (connect, read) timeout unless they pass
+    their own.
+    """
+
+    def __init__(self, name: str, timeout: float, pool_maxsize: int | None = None) -> None:
+        self.name = name
+        self.timeout = (HTTP_CONNECT_TIMEOUT, timeout)
+        self.metrics = _Metrics()
+        self._session = requests.Session()
+        adapter = _CountingAdapter(
+            self.metrics,
+            pool_connections=HTTP_POOL_HOSTS,
+            pool_maxsize=pool_maxsize or HTTP_POOL_MAXSIZE,
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        began = time.perf_counter()
+        failed = True
+        try:
+            resp = self._session.request(method, url, **kwargs)
+            failed = resp.status_code >= 500
+            return resp
+        finally:
+            self.metrics.record(_origin(url), time.perf_counter() - began, failed)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self) -> None:
+        self._session.close()
+
+
+class AsyncPooledClient:
+    """The httpx counterpart of `PooledClient`, for request handlers that should not hold a
+    worker thread while an upstream call is in flight. Requires `httpx`."""
+
+    def __init__(self, name: str, timeout: float, pool_maxsize: int | None = None) -> None:
+        if httpx is None:
+            raise HttpPoolError("httpx is not installed; the async HTTP client is unavailable")
+        self.name = name
+        self.metrics = _Metrics()
+        size = pool_maxsize or HTTP_POOL_MAXSIZE
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout, connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=size, max_keepalive_connections=size),
+        )
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        origin = _origin(url)
+
+        async def trace(event: str, info: dict[str, Any]) -> None:
+            if event == "connection.connect_tcp.complete":
+                self.metrics.connected(origin)
+
+        began = time.perf_counter()
+        failed = True
+        try:
+            resp = await self._client.request(method, url, extensions={"trace": trace}, **kwargs)
+            failed = resp.status_code >= 500
+            return resp
+        finally:
+            self.metrics.record(origin, time.perf_counter() - began, failed)
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+_clients: dict[str, PooledClient] = {}
+# httpx connections belong to the event loop that opened them, so async clients are per loop.
+_async_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, AsyncPooledClient]] = (
+    weakref.WeakKeyDictionary()
+)
+_clients_lock = threading.Lock()
+
+
+def get_http_client(name: str, timeout: float, pool_maxsize: int | None = None) -> PooledClient:
+    """The process-wide pooled client for one upstream service, created on first use."""
+    with _clients_lock:
+        client = _clients.get(name)
+        if client is None:
+            client = _clients[name] = PooledClient(name, timeout, pool_maxsize)
+        return client
+
+
+def get_async_http_client(name: str, timeout: float, pool_maxsize: int | None = None) -> AsyncPooledClient:
+    """The pooled async client for one upstream service on the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(name)
+        if client is None:
+            client = clients[name] = AsyncPooledClient(name, timeout, pool_maxsize)
+        return client
+
+
+def http_connection_stats() -> dict[str, dict[str, dict[str, Any]]]:
+    """Per client and host: requests, errors (5xx and transport failures), connections
+    opened, requests served on a reused connection and mean latency."""
+    with _clients_lock:
+        clients = list(_clients.values())
+        async_clients = [client for per_loop in _async_clients.values() for client in per_loop.values()]
+    stats: dict[str, dict[str, dict[str, Any]]] = {client.name: client.metrics.snapshot() for client in clients}
+    for client in async_clients:
+        hosts = stats.setdefault(f"{client.name}:async", {})
+        for origin, host in client.metrics.snapshot().items():
+            merged = hosts.setdefault(origin, dict.fromkeys(host, 0))
+            for key, value in host.items():
+                merged[key] += value
+    return stats
+
+
+async def close_http_clients() -> None:
+    """Close every pooled connection, and the running loop's async clients (run on app shutdown)."""
+    with _clients_lock:
+        clients = list(_clients.values())
+        async_clients = list(_async_clients.pop(asyncio.get_running_loop(), {}).values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+    for async_client in async_clients:
+        await async_client.aclose()
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import PurePosixPath
+from typing import Any
+
+from .graph_index import LANG_BY_EXT, _tag_path
+
+
+def chunk_metadata(path: str, kind: str | None) -> dict[str, str | bool]:
+  """Filterable metadata of a chunk of `path`, as flat scalars every store can match exactly.
+
+  Tags become `tag_<name>: True` flags and the directory becomes one `dir_<depth>` key per
+  ancestor (`dir_1: "apps"`, `dir_2: "apps/api"`), since stores match on equality only.
+  """
+  parts = PurePosixPath(path).parts[:-1]
+  metadata: dict[str, str | bool] = {
+    "language": LANG_BY_EXT.get(PurePosixPath(path).suffix, ""),
+    "kind": kind or "",
+  }
+  metadata.update({f"tag_{tag}": True for tag in _tag_path(path)})
+  metadata.update({f"dir_{depth}": "/".join(parts[:depth]) for depth in range(1, len(parts) + 1)})
+  return metadata
+
+
+@dataclass(frozen=True)
+class ChunkFilter:
+  """Restricts retrieval to chunks matching every given field; empty fields match anything.
+
+  `path_prefix` is a directory (`apps/api` matches `apps/api/main.py`, not `apps/apix.py`).
+  """
+
+  language: str | None = None
+  tags: tuple[str, ...] = ()
+  path_prefix: str | None = None
+  symbol_kind: str | None = None
+
+  def conditions(self) -> dict[str, str | bool]:
+    """Equality conditions on `chunk_metadata` keys, for a store's `where`."""
+    where: dict[str, str | bool] = {}
+    if self.language:
+      where["language"] = self.language
+    if self.symbol_kind:
+      where["kind"] = self.symbol_kind
+    for tag in self.tags:
+      where[f"tag_{tag}"] = True
+    parts = [part for part in (self.path_prefix or "").split("/") if part and part != "."]
+    if parts:
+      where[f"dir_{len(parts)}"] = "/".join(parts)
+    return where
+
+  def matches(self, metadata: dict[str, Any]) -> bool:
+    return all(metadata.get(key) == value for key, value in self.conditions().items())
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import ast
+from dataclasses import dataclass, field
+from pathlib import PurePosixPath
+
+from ..ast_analyzer import _bound_names, _parser_for
+
+TS_CLASS_TYPES = {"class_declaration", "abstract_class_declaration", "class"}
+TS_FUNCTION_TYPES = {
+  "function_declaration",
+  "generator_function_declaration",
+  "method_definition",
+  "arrow_function",
+  "function",
+  "function_expression",
+}
+TS_VARIABLE_TYPES = {"variable_declarator", "public_field_definition", "field_definition"}
+
+
+@dataclass
+class Chunk:
+  text: str
+  start_line: int
+  end_line: int
+  symbol: str | None = None
+  # "class", "function", "method" or "variable" when every symbol in the chunk is of that kind.
+  kind: str | None = None
+
+
+@dataclass
+class _Span:
+  start: int
+  end: int
+  symbol: str | None = None
+  children: list[_Span] = field(default_factory=list)
+  kind: str | None = None
+
+
+class _Lines:
+  """File lines with prefix sums, so the token estimate of any line range is O(1)."""
+
+  def __init__(self, text: str) -> None:
+    self.lines = text.split("\n")
+    if self.lines and self.lines[-1] == "":
+      self.lines.pop()
+    self.offsets = [0]
+    for line in self.lines:
+      self.offsets.append(self.offsets[-1] + len(line) + 1)
+
+  def tokens(self, start: int, end: int) -> int:
+    # ~4 characters per token is close enough for code under BPE tokenizers.
+    return (self.offsets[end + 1] - self.offsets[start]) // 4
+
+  def chunk(self, start: int, end: int, symbol: str | None, kind: str | None = None) -> Chunk:
+    return Chunk("\n".join(self.lines[start : end + 1]), start + 1, end + 1, symbol, kind)
+
+
+def _python_spans(text: str, tree: ast.Module | None = None) -> list[_Span] | None:
+  if tree is None:
+    try:
+      tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+      return None
+  return [_python_span(node, "") for node in tree.body]
+
+
+def _python_span(node: ast.stmt, prefix: str) -> _Span:
+  decorators = getattr(node, "decorator_list", [])
+  start = min([node.lineno, *(item.lineno for item in decorators)]) - 1
+  end = (node.end_lineno or node.lineno) - 1
+  if isinstance(node, (ast.Assign, ast.AnnAssign)):
+    # Module and class attributes, named as the analyzer's symbol table names them.
+    targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+    names = [f"{prefix}{name}" for target in targets for name in _bound_names(target)]
+    return _Span(start, end, ", ".join(names), kind="variable") if names else _Span(start, end)
+  if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+    return _Span(start, end)
+  symbol = f"{prefix}{node.name}"
+  if isinstance(node, ast.ClassDef):
+    return _Span(start, end, symbol, [_python_span(child, f"{symbol}.") for child in node.body], "class")
+  return _Span(start, end, symbol, kind="method" if prefix else "function")
+
+
+def _ts_spans(ext: str, text: str, tree=None) -> list[_Span] | None:
+  if tree is None:
+    parser = _parser_for(ext)
+    if not parser:
+      return None
+    tree = parser.parse(text.encode("utf-8"))
+  return [_ts_span(node, "") for node in tree.root_node.named_children]
+
+
+def _ts_declaration(node):
+  if node.type == "export_statement":
+    node = node.child_by_field_name("declaration") or node
+  if node.type in {"lexical_declaration", "variable_declaration"}:
+    for child in node.named_children:
+      if child.type == "variable_declarator":
+        return child
+  return node
+
+
+def _ts_kind(declaration, prefix: str) -> str | None:
+  if declaration.type in TS_CLASS_TYPES:
+    return "class"
+  value = declaration.child_by_field_name("value")
+  if declaration.type in TS_FUNCTION_TYPES or (value is not None and value.type in TS_FUNCTION_TYPES):
+    return "method" if prefix else "function"
+  if declaration.type in TS_VARIABLE_TYPES:
+    return "variable"
+  # Interfaces, type aliases and enums have no kind.
+  return None
+
+
+def _ts_span(node, prefix: str) -> _Span:
+  declaration = _ts_declaration(node)
+  name = declaration.child_by_field_name("name")
+  span = _Span(node.start_point[0], node.end_point[0])
+  if name is None:
+    return span
+  span.symbol = f"{prefix}{name.text.decode('utf-8', errors='ignore')}"
+  span.kind = _ts_kind(declaration, prefix)
+  body = declaration.child_by_field_name("body")
+  if declaration.type in TS_CLASS_TYPES and body is not None:
+    span.children = [_ts_span(child, f"{span.symbol}.") for child in body.named_children]
+  return span
+
+
+def _tile(spans: list[_Span], start: int, end: int) -> list[_Span]:
+  """Stretch spans so they cover [start, end] without gaps; leading comments join the next span."""
+  out: list[_Span] = []
+  cursor = start
+  for span in spans:
+    if span.end < cursor:
+      continue
+    out.append(_Span(cursor, min(span.end, end), span.symbol, span.children, span.kind))
+    cursor = out[-1].end + 1
+    if cursor > end:
+      break
+  if out:
+    out[-1].end = end
+  elif start <= end:
+    out.append(_Span(start, end))
+  return out
+
+
+def _windows(span: _Span, lines: _Lines, max_tokens: int, overlap_lines: int) -> list[Chunk]:
+  chunks: list[Chunk] = []
+  start = span.start
+  while start <= span.end:
+    end = start
+    while end < span.end and lines.tokens(start, end + 1) <= max_tokens:
+      end += 1
+    chunks.append(lines.chunk(start, end, span.symbol, span.kind))
+    if end >= span.end:
+      break
+    start = max(end + 1 - overlap_lines, start + 1)
+  return chunks
+
+
+def _pack(spans: list[_Span], lines: _Lines, max_tokens: int, overlap_lines: int) -> list[Chunk]:
+  """Merge neighbouring spans up to the budget and split the spans that exceed it."""
+  chunks: list[Chunk] = []
+  group: list[_Span] = []
+
+  def flush() -> None:
+    if group:
+      symbols = ", ".join(span.symbol for span in group if span.symbol)
+      kinds = {span.kind for span in group if span.symbol}
+      chunks.append(lines.chunk(group[0].start, group[-1].end, symbols or None, kinds.pop() if len(kinds) == 1 else None))
+      group.clear()
+
+  for span in spans:
+    if lines.tokens(span.start, span.end) > max_tokens:
+      flush()
+      if span.children:
+        chunks.extend(_pack(_tile(span.children, span.start, span.end), lines, max_tokens, overlap_lines))
+      else:
+        chunks.extend(_windows(span, lines, max_tokens, overlap_lines))
+      continue
+    if group and lines.tokens(group[0].start, span.end) > max_tokens:
+      flush()
+    group.append(span)
+  flush()
+  return chunks
+
+
+def chunk_file(
+  path: str,
+  text: str,
+  max_tokens: int = 512,
+  overlap_lines: int = 2,
+  strategy: str = "syntax",
+  tree=None,
+) -> list[Chunk]:
+  """Split a file into chunks of roughly `max_tokens`.
+
+  The syntax strategy cuts at top-level function and class boundaries (Python via `ast`,
+  JS/TS via tree-sitter), descends into classes that are too large and falls back to
+  overlapping line windows for oversized bodies and for other languages. Pass the `tree`
+  from `parse_source` when the file was already parsed to skip parsing it again.
+  """
+  lines = _Lines(text)
+  if not lines.lines:
+    return []
+  spans = None
+  if strategy == "syntax":
+    ext = PurePosixPath(path).suffix
+    spans = _python_spans(text, tree) if ext == ".py" else _ts_spans(ext, text, tree)
+  last = len(lines.lines) - 1
+  if spans is None:
+    return _windows(_Span(0, last), lines, max(1, max_tokens), overlap_lines)
+  return _pack(_tile(spans, 0, last), lines, max(1, max_tokens), overlap_lines)
@@ -0,0 +1,426 @@
+from __future__ import annotations
+
+import bisect
+import json
+import mmap
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from ..config import CODE_SEARCH_DIR, CODE_SEARCH_MAX_REGEX_CHARS, CODE_SEARCH_MAX_SCAN_BYTES
+from ..graph_artifacts import pack_strings, save_npz, unpack_strings
+
+# The regex planner reads patterns with CPython's private parser (3.11+ layout). Without it,
+# regex queries still work but scan every file.
+try:
+  from re import _constants as sre_constants
+  from re import _parser as sre_parser
+
+  _REPEATS = (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT, sre_constants.POSSESSIVE_REPEAT)
+except (ImportError, AttributeError):  # pragma: no cover - depends on the interpreter
+  sre_constants = sre_parser = None
+  _REPEATS = ()
+
+_INDEX_CACHE_SIZE = 8
+_MAX_ALTERNATIVES = 16
+_MAX_LINE_CHARS = 500
+# A tmp-* build directory untouched for this long belongs to a run that died.
+_STALE_BUILD_SECONDS = 24 * 3600
+
+
+class CodeSearchError(RuntimeError):
+  pass
+
+
+def trigrams(data: bytes, unique: bool = True) -> np.ndarray:
+  """ASCII-case-folded byte trigrams of `data` as uint32 keys (b0 << 16 | b1 << 8 | b2)."""
+  raw = np.frombuffer(data, dtype=np.uint8)
+  if len(raw) < 3:
+    return np.empty(0, dtype=np.uint32)
+  folded = np.where((raw >= 65) & (raw <= 90), raw + 32, raw).astype(np.uint32)
+  keys = (folded[:-2] << 16) | (folded[1:-1] << 8) | folded[2:]
+  return np.unique(keys) if unique else keys
+
+
+def _required(items: Any) -> list[list[str]]:
+  """Alternatives of literal strings a match must contain; an empty alternative constrains nothing."""
+  alternatives: list[list[str]] = [[]]
+  run: list[str] = []
+
+  def flush() -> None:
+    if run:
+      for alternative in alternatives:
+        alternative.append("".join(run))
+      run.clear()
+
+  for op, av in items:
+    if op is sre_constants.LITERAL:
+      run.append(chr(av))
+      continue
+    flush()
+    if op is sre_constants.SUBPATTERN:
+      # A scoped (?i:...) group may match non-ASCII case variants the index does not fold.
+      if av[1] & sre_constants.SRE_FLAG_IGNORECASE:
+        continue
+      inner = _required(av[3])
+    elif op in _REPEATS and av[0] >= 1:
+      inner = _required(av[2])
+    elif op is sre_constants.ATOMIC_GROUP:
+      inner = _required(av)
+    elif op is sre_constants.BRANCH:
+      inner = [alternative for branch in av[1] for alternative in _required(branch)]
+    else:
+      continue
+    if len(alternatives) * len(inner) <= _MAX_ALTERNATIVES:
+      alternatives = [outer + branch for outer in alternatives for branch in inner]
+  flush()
+  return alternatives
+
+
+def query_plan(query: str, regex: bool, case_sensitive: bool) -> list[np.ndarray] | None:
+  """Trigram sets, one per alternative, of which a matching file must hold all of one set;
+  None when the query has no usable trigrams and every file is a candidate."""
+  if regex:
+    if sre_parser is None:
+      return None
+    try:
+      parsed = sre_parser.parse(query, 0 if case_sensitive else re.IGNORECASE)
+      ascii_only = not case_sensitive or bool(parsed.state.flags & sre_constants.SRE_FLAG_IGNORECASE)
+      alternatives = _required(parsed)
+    except re.error as exc:
+      raise CodeSearchError(f"invalid regex: {exc}") from exc
+    except Exception:
+      # The private parser's output changed shape; a full scan is slower but still correct.
+      return None
+  else:
+    ascii_only = not case_sensitive
+    alternatives = [[query]]
+
+  plan: list[np.ndarray] = []
+  for literals in alternatives:
+    keys = [trigrams(literal.encode("utf-8"), unique=False) for literal in literals]
+    merged = np.unique(np.concatenate(keys)) if keys else np.empty(0, dtype=np.uint32)
+    if ascii_only:
+      merged = merged[((merged >> 16) < 128) & (((merged >> 8) & 0xFF) < 128) & ((merged & 0xFF) < 128)]
+    if not len(merged):
+      return None
+    plan.append(merged)
+  return plan
+
+
+class CodeSearchIndex:
+  """One generation of a repo's code-search index.
+
+  `content.bin` holds every file's text back to back and is memory-mapped; `index.npz`
+  holds the sorted paths, their byte ranges in `content.bin` and the trigram posting lists:
+  sorted unique trigram keys, CSR offsets into `postings`, and per trigram the ascending
+  ids of the files containing it (uint16 while a repo has fewer than 65536 files).
+  """
+
+  def __init__(self, directory: Path) -> None:
+    self.directory = directory
+    with np.load(directory / "index.npz") as data:
+      self.meta: dict[str, Any] = json.loads(data["meta"].tobytes())
+      self.paths = unpack_strings(data["names"], data["name_offsets"])
+      self.file_offsets = data["file_offsets"]
+      self.file_lengths = data["file_lengths"]
+      self.keys = data["keys"]
+      self.starts = data["starts"]
+      self.postings = data["postings"]
+    with (directory / "content.bin").open("rb") as handle:
+      size = os.fstat(handle.fileno()).st_size
+      self._content: mmap.mmap | bytes = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+  def text(self, file_id: int) -> str:
+    start = int(self.file_offsets[file_id])
+    return self._content[start : start + int(self.file_lengths[file_id])].decode("utf-8", errors="replace")
+
+  def file_text(self, path: str) -> str | None:
+    file_id = bisect.bisect_left(self.paths, path)
+    if file_id == len(self.paths) or self.paths[file_id] != path:
+      return None
+    return self.text(file_id)
+
+  def posting(self, key: int) -> np.ndarray:
+    idx = int(np.searchsorted(self.keys, key))
+    if idx == len(self.keys) or self.keys[idx] != key:
+      return np.empty(0, dtype=self.postings.dtype)
+    return self.postings[self.starts[idx] : self.starts[idx + 1]]
+
+  def candidates(self, plan: list[np.ndarray] | None) -> np.ndarray:
+    """Ascending ids of the files that hold every trigram of at least one alternative."""
+    if plan is None:
+      return np.arange(len(self.paths))
+    found: list[np.ndarray] = []
+    for keys in plan:
+      lists = sorted((self.posting(int(key)) for key in keys), key=len)
+      files = lists[0]
+      for posting in lists[1:]:
+        if not len(files):
+          break
+        files = np.intersect1d(files, posting, assume_unique=True)
+      found.append(files)
+    return np.unique(np.concatenate(found)).astype(np.int64)
+
+  def search(self, query: str, regex: bool = False, case_sensitive: bool = True, offset: int = 0, limit: int = 50) -> dict[str, Any]:
+    """Matching lines, in path then line order, from the `offset`-th on.
+
+    Candidate files come from the trigram postings and are verified with the real pattern;
+    verification stops as soon as the page plus one more match is found, or once
+    `CODE_SEARCH_MAX_SCAN_BYTES` of files were read, in which case `truncated` is set and
+    there is no next page.
+    """
+    if regex and len(query) > CODE_SEARCH_MAX_REGEX_CHARS:
+      raise CodeSearchError(f"regex is longer than {CODE_SEARCH_MAX_REGEX_CHARS} characters")
+    plan = query_plan(query, regex, case_sensitive)
+    flags = re.MULTILINE if case_sensitive else re.MULTILINE | re.IGNORECASE
+    try:
+      # MULTILINE gives `^` and `$` grep's per-line meaning.
+      pattern = re.compile(query if regex else re.escape(query), flags)
+    except re.error as exc:
+      raise CodeSearchError(f"invalid regex: {exc}") from exc
+    candidates = self.candidates(plan)
+    matches: list[dict[str, Any]] = []
+    skipped = 0
+    scanned = 0
+    scanned_bytes = 0
+    has_more = False
+    truncated = False
+    for file_id in candidates.tolist():
+      if has_more:
+        break
+      length = int(self.file_lengths[file_id])
+      if scanned and scanned_bytes + length > CODE_SEARCH_MAX_SCAN_BYTES:
+        truncated = True
+        break
+      scanned += 1
+      scanned_bytes += length
+      text = self.text(file_id)
+      line_no = 1
+      line_start = 0
+      last_line = 0
+      for match in pattern.finditer(text):
+        line_no += text.count("\n", line_start, match.start())
+        line_start = text.rfind("\n", 0, match.start()) + 1
+        if line_no == last_line:
+          continue
+        last_line = line_no
+        if skipped < offset:
+          skipped += 1
+          continue
+        if len(matches) == limit:
+          has_more = True
+          break
+        line_end = text.find("\n", match.start())
+        line = text[line_start : len(text) if line_end < 0 else line_end]
+        matches.append(
+          {
+            "path": self.paths[file_id],
+            "line": line_no,
+            "column": match.start() - line_start + 1,
+            "text": line[:_MAX_LINE_CHARS],
+          }
+        )
+    return {
+      "matches": matches,
+      "next_offset": offset + len(matches) if has_more else None,
+      "candidate_files": len(candidates),
+      "scanned_files": scanned,
+      "truncated": truncated,
+      "commit_sha": self.meta.get("commit_sha"),
+    }
+
+  def close(self) -> None:
+    if isinstance(self._content, mmap.mmap):
+      self._content.close()
+
+
+def _repo_dir(repo_id: str) -> Path:
+  return CODE_SEARCH_DIR / repo_id
+
+
+def _current(repo_id: str) -> Path | None:
+  try:
+    name = (_repo_dir(repo_id) / "CURRENT").read_text(encoding="utf-8").strip()
+  except FileNotFoundError:
+    return None
+  return _repo_dir(repo_id) / name
+
+
+_indexes: OrderedDict[str, CodeSearchIndex] = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def load_code_search(repo_id: str) -> CodeSearchIndex | None:
+  """The repo's current index generation, cached until a new one is published."""
+  directory = _current(repo_id)
+  if directory is None or not directory.exists():
+    return None
+  key = str(directory)
+  with _indexes_lock:
+    index = _indexes.get(key)
+    if index is not None:
+      _indexes.move_to_end(key)
+      return index
+  index = CodeSearchIndex(directory)
+  with _indexes_lock:
+    _indexes[key] = index
+    while len(_indexes) > _INDEX_CACHE_SIZE:
+      # Dropped generations are unmapped by the GC once in-flight searches release them.
+      _indexes.popitem(last=False)
+  return index
+
+
+def search_code(repo_id: str, query: str, regex: bool = False, case_sensitive: bool = True, offset: int = 0, limit: int = 50) -> dict[str, Any] | None:
+  index = load_code_search(repo_id)
+  if index is None:
+    return None
+  return index.search(query, regex, case_sensitive, offset, limit)
+
+
+def read_indexed_file(repo_id: str, path: str) -> str | None:
+  """A file's text as of the last indexed commit, without touching the working tree."""
+  index = load_code_search(repo_id)
+  return index.file_text(path) if index is not None else None
+
+
+class CodeSearchBuilder:
+  """Writes a new index generation while files stream in from the indexing scan.
+
+  Added files go straight to the new `content.bin` with their trigram sets kept in memory;
+  when the builder was loaded from the previous generation, files that were not touched are
+  copied over at `write()` together with their posting entries, so only the diff is
+  re-trigrammed. The generation is built in a `tmp-*` directory, so overlapping runs never
+  see each other's files; one left by an interrupted run is removed by a later `write()`
+  once it is a day old.
+  """
+
+  def __init__(self, repo_id: str, base: CodeSearchIndex | None = None) -> None:
+    self.repo_id = repo_id
+    self._base = base
+    self._kept: set[str] = set(base.paths) if base is not None else set()
+    self._files: dict[str, tuple[int, int, np.ndarray]] = {}
+    self._dir = _repo_dir(repo_id) / f"tmp-{uuid.uuid4().hex[:12]}"
+    self._dir.mkdir(parents=True)
+    self._content = (self._dir / "content.bin").open("wb")
+    self._size = 0
+
+  @classmethod
+  def load(cls, repo_id: str, commit_sha: str | None = None) -> CodeSearchBuilder | None:
+    """Start from the current generation, or None if it is missing or, when `commit_sha` is
+    given, was built for another commit."""
+    base = load_code_search(repo_id)
+    if base is None or (commit_sha and base.meta.get("commit_sha") != commit_sha):
+      return None
+    return cls(repo_id, base)
+
+  def _append(self, data: bytes) -> int:
+    offset = self._size
+    self._content.write(data)
+    self._size += len(data)
+    return offset
+
+  def remove(self, rel: str) -> None:
+    self._kept.discard(rel)
+    self._files.pop(rel, None)
+
+  def add(self, rel: str, text: str | None) -> None:
+    self.remove(rel)
+    if text is None:
+      return
+    data = text.encode("utf-8")
+    self._files[rel] = (self._append(data), len(data), trigrams(data))
+
+  def discard(self) -> None:
+    """Drop an unpublished generation: close `content.bin` and remove its `tmp-*` directory."""
+    self._content.close()
+    shutil.rmtree(self._dir, ignore_errors=True)
+
+  def write(self, commit_sha: str | None = None) -> dict[str, int]:
+    """Publish the generation as the repo's current index and drop older ones."""
+    paths = sorted(self._kept | self._files.keys())
+    ids = {path: idx for idx, path in enumerate(paths)}
+    file_offsets = np.zeros(len(paths), dtype=np.int64)
+    file_lengths = np.zeros(len(paths), dtype=np.int64)
+    pair_keys: list[np.ndarray] = []
+    pair_files: list[np.ndarray] = []
+
+    base = self._base
+    if base is not None and self._kept:
+      remap = np.full(len(base.paths), -1, dtype=np.int64)
+      for old_id, path in enumerate(base.paths):
+        if path in self._kept:
+          remap[old_id] = ids[path]
+          file_offsets[ids[path]] = self._append(base._content[int(base.file_offsets[old_id]) : int(base.file_offsets[old_id] + base.file_lengths[old_id])])
+          file_lengths[ids[path]] = base.file_lengths[old_id]
+      old_keys = np.repeat(base.keys, np.diff(base.starts))
+      new_ids = remap[base.postings.astype(np.int64)]
+      pair_keys.append(old_keys[new_ids >= 0])
+      pair_files.append(new_ids[new_ids >= 0])
+    for path, (offset, length, keys) in self._files.items():
+      file_offsets[ids[path]] = offset
+      file_lengths[ids[path]] = length
+      pair_keys.append(keys)
+      pair_files.append(np.full(len(keys), ids[path], dtype=np.int64))
+    self._content.close()
+
+    pairs = np.concatenate(pair_keys).astype(np.uint64) << np.uint64(32) if pair_keys else np.empty(0, dtype=np.uint64)
+    if pair_files:
+      pairs |= np.concatenate(pair_files).astype(np.uint64)
+    pairs.sort()
+    keys, starts = np.unique((pairs >> np.uint64(32)).astype(np.uint32), return_index=True)
+    posting_dtype = np.uint16 if len(paths) < 1 << 16 else np.uint32
+    names, name_offsets = pack_strings(paths)
+    meta = {"commit_sha": commit_sha, "files": len(paths), "bytes": self._size}
+    save_npz(
+      self._dir / "index.npz",
+      meta=np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8),
+      names=names,
+      name_offsets=name_offsets,
+      file_offsets=file_offsets,
+      file_lengths=file_lengths,
+      keys=keys,
+      starts=np.append(starts, len(pairs)).astype(np.int64),
+      postings=(pairs & np.uint64(0xFFFFFFFF)).astype(posting_dtype),
+    )
+
+    repo_dir = _repo_dir(self.repo_id)
+    generation = repo_dir / f"{commit_sha or 'worktree'}-{uuid.uuid4().hex[:8]}"
+    self._dir.rename(generation)
+    pointer = repo_dir / "CURRENT.tmp"
+    pointer.write_text(generation.name, encoding="utf-8")
+    os.replace(pointer, repo_dir / "CURRENT")
+    _remove_stale(repo_dir, generation)
+    return {"files": len(paths), "bytes": self._size, "trigrams": len(keys), "postings": len(pairs)}
+
+
+def _last_modified(directory: Path) -> float:
+  try:
+    return max([directory.stat().st_mtime, *(entry.stat().st_mtime for entry in directory.iterdir())])
+  except OSError:
+    return time.time()
+
+
+def _remove_stale(repo_dir: Path, published: Path) -> None:
+  """Drop generations that are no longer current, and abandoned build directories.
+
+  A concurrent run may have published after this one, so CURRENT is re-read. Open readers
+  keep their mapping of a removed generation; failures (e.g. a file still mapped on
+  Windows) are retried by the next write.
+  """
+  current = _current(repo_dir.name)
+  cutoff = time.time() - _STALE_BUILD_SECONDS
+  for entry in repo_dir.iterdir():
+    if not entry.is_dir() or entry in (published, current):
+      continue
+    if entry.name.startswith("tmp-") and _last_modified(entry) > cutoff:
+      continue
+    shutil.rmtree(entry, ignore_errors=True)
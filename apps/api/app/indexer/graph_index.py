@@ -1,12 +1,14 @@
 from __future__ import annotations
 
-import json
+import os
 import re
-from collections import Counter, defaultdict
-from pathlib import Path
-from typing import Iterable
+import shutil
+from collections import Counter
+from pathlib import Path, PurePosixPath
 
-from ..config import ARTIFACTS_DIR
+from ..config import ARTIFACTS_DIR, GRAPH_ARTIFACT_FORMAT, GRAPH_HISTORY_LIMIT
+from ..graph_artifacts import GraphArtifactWriter, load_edges
+from .import_graph import CsrGraph, ImportResolver
 
 IMPORT_PATTERNS = {
   ".py": [
@@ -41,6 +43,8 @@ IMPORT_PATTERNS = {
   ],
 }
 
+GRAPH_FILES = ("edges.npz", "graph.npz", "graph.json")
+
 LANG_BY_EXT = {
   ".py": "python",
   ".js": "javascript",
@@ -53,15 +57,6 @@ LANG_BY_EXT = {
 }
 
 
-def _iter_code_files(repo_path: Path) -> Iterable[Path]:
-  ignore_dirs = {".git", "node_modules", ".next", ".venv", "venv", "__pycache__"}
-  for path in repo_path.rglob("*"):
-    if any(part in ignore_dirs for part in path.parts):
-      continue
-    if path.is_file() and path.suffix in LANG_BY_EXT:
-      yield path
-
-
 def _extract_imports(ext: str, text: str) -> list[str]:
   patterns = IMPORT_PATTERNS.get(ext, [])
   imports: list[str] = []
@@ -90,43 +85,133 @@ def _tag_path(path: str) -> list[str]:
   return tags
 
 
-def build_graph(repo_path: str, repo_id: str) -> dict[str, object]:
-  root = Path(repo_path)
-  edges: list[dict[str, str]] = []
-  nodes: set[str] = set()
-  lang_counts: Counter[str] = Counter()
-  tag_counts: Counter[str] = Counter()
+def _go_module(repo_path: str | Path | None) -> str | None:
+  if repo_path is None:
+    return None
+  try:
+    text = (Path(repo_path) / "go.mod").read_text(encoding="utf-8")
+  except OSError:
+    return None
+  match = re.search(r"^module\s+(\S+)", text, re.MULTILINE)
+  return match.group(1) if match else None
+
+
+class GraphBuilder:
+  """Accumulates the import graph file by file, so it can ride along another pass over the tree.
 
-  for file_path in _iter_code_files(root):
-    rel = file_path.relative_to(root).as_posix()
-    nodes.add(rel)
-    lang = LANG_BY_EXT.get(file_path.suffix, "unknown")
-    lang_counts[lang] += 1
+  Raw import strings are kept per file and resolved to repo paths on `write`, once every
+  file is known. A builder loaded from the last written graph can be patched with only the
+  files a commit touched: `remove` the deleted ones, `add` the changed ones again.
+  """
+
+  def __init__(self, repo_path: str | Path | None = None) -> None:
+    self.repo_path = repo_path
+    self.imports: dict[str, list[str]] = {}
+    self.nodes: set[str] = set()
+    self.lang_counts: Counter[str] = Counter()
+    self.tag_counts: Counter[str] = Counter()
+
+  @classmethod
+  def load(cls, repo_id: str, repo_path: str | Path | None = None, commit_sha: str | None = None) -> GraphBuilder | None:
+    """Rebuild the builder from the repo's last written graph, or None if it is missing or,
+    when `commit_sha` is given, was written for another commit."""
+    artifact = load_edges(ARTIFACTS_DIR / "index" / repo_id / "edges.npz")
+    if artifact is None or (commit_sha and artifact.meta.get("commit_sha") != commit_sha):
+      return None
+    builder = cls(repo_path)
+    builder.nodes = set(artifact.nodes)
+    builder.lang_counts.update(artifact.meta["stats"]["languages"])
+    builder.tag_counts.update(artifact.meta["stats"]["tags"])
+    imports: dict[str, dict[str, None]] = {}
+    for edge in artifact.edges():
+      # Resolved edges keep their raw spec, so resolution can be redone as files come and go.
+      imports.setdefault(edge["from"], {})[edge.get("spec", edge["to"])] = None
+    builder.imports = {rel: list(specs) for rel, specs in imports.items()}
+    return builder
+
+  def remove(self, rel: str) -> None:
+    if rel not in self.nodes:
+      return
+    self.nodes.discard(rel)
+    self.imports.pop(rel, None)
+    self.lang_counts[LANG_BY_EXT[PurePosixPath(rel).suffix]] -= 1
     for tag in _tag_path(rel):
-      tag_counts[tag] += 1
-    try:
-      text = file_path.read_text(encoding="utf-8")
-    except UnicodeDecodeError:
-      continue
-    for imp in _extract_imports(file_path.suffix, text):
-      edges.append({"from": rel, "to": imp, "type": "import"})
-
-  graph = {
-    "nodes": sorted(nodes),
-    "edges": edges,
-    "stats": {
-      "languages": dict(lang_counts),
-      "tags": dict(tag_counts),
-      "edge_count": len(edges),
+      self.tag_counts[tag] -= 1
+    self.lang_counts = +self.lang_counts
+    self.tag_counts = +self.tag_counts
+
+  def add(self, rel: str, text: str | None) -> None:
+    ext = PurePosixPath(rel).suffix
+    if ext not in LANG_BY_EXT:
+      return
+    self.remove(rel)
+    self.nodes.add(rel)
+    self.lang_counts[LANG_BY_EXT[ext]] += 1
+    for tag in _tag_path(rel):
+      self.tag_counts[tag] += 1
+    if text is not None:
+      self.imports[rel] = list(dict.fromkeys(_extract_imports(ext, text)))
+
+  def _write_edges(self, writer: GraphArtifactWriter, nodes: list[str]) -> None:
+    """Resolve raw imports against the known files; unresolved ones become external edges."""
+    resolver = ImportResolver(nodes, _go_module(self.repo_path))
+    for rel in nodes:
+      for imp in self.imports.get(rel, []):
+        targets = [target for target in resolver.resolve(rel, imp) if target != rel]
+        if not targets:
+          writer.add_edge(rel, imp, "external")
+        for target in targets:
+          writer.add_edge(rel, target, "import", imp)
+
+  def write(self, repo_id: str, commit_sha: str | None = None) -> dict[str, object]:
+    """Stream the graph to `edges.npz` and `graph.npz` (plus `graph.json` when
+    `GRAPH_ARTIFACT_FORMAT=json`). With a commit the files are written to `graphs/<sha>/`
+    and linked into the repo's graph directory; the newest `GRAPH_HISTORY_LIMIT` versions
+    are kept."""
+    graph_dir = ARTIFACTS_DIR / "index" / repo_id
+    target_dir = graph_dir / "graphs" / commit_sha if commit_sha else graph_dir
+    nodes = sorted(self.nodes)
+    write_json = GRAPH_ARTIFACT_FORMAT == "json"
+    writer = GraphArtifactWriter(target_dir, nodes, {"commit_sha": commit_sha}, write_json)
+    self._write_edges(writer, nodes)
+    csr = CsrGraph.from_arrays(nodes, *writer.edge_arrays("import"))
+    stats = {
+      "languages": dict(self.lang_counts),
+      "tags": dict(self.tag_counts),
+      "edge_count": len(writer),
+      "resolved_edge_count": csr.edge_count,
       "node_count": len(nodes),
-    },
-  }
-
-  graph_dir = ARTIFACTS_DIR / "index" / repo_id
-  graph_dir.mkdir(parents=True, exist_ok=True)
-  graph_path = graph_dir / "graph.json"
-  graph_path.write_text(json.dumps(graph, indent=2), encoding="utf-8")
-  return {
-    "graph_url": f"/artifacts/index/{repo_id}/graph.json",
-    "stats": graph["stats"],
-  }
+      "cycle_count": len(csr.cycles()),
+    }
+    writer.close(stats)
+    csr.save(target_dir / "graph.npz")
+    if commit_sha:
+      _publish(target_dir, graph_dir)
+      _prune_versions(graph_dir / "graphs")
+    return {
+      "graph_url": f"/artifacts/index/{repo_id}/graph.json" if write_json else f"/graph/{repo_id}/edges",
+      "stats": stats,
+    }
+
+
+def _publish(version_dir: Path, graph_dir: Path) -> None:
+  """Make a version's files the repo's latest graph; hard links avoid copying them."""
+  for name in GRAPH_FILES:
+    source = version_dir / name
+    target = graph_dir / name
+    if not source.exists():
+      target.unlink(missing_ok=True)
+      continue
+    tmp_path = graph_dir / f"{name}.tmp"
+    tmp_path.unlink(missing_ok=True)
+    try:
+      os.link(source, tmp_path)
+    except OSError:
+      shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, target)
+
+
+def _prune_versions(versions_dir: Path) -> None:
+  versions = sorted(versions_dir.iterdir(), key=lambda path: path.stat().st_mtime_ns, reverse=True)
+  for stale in versions[max(GRAPH_HISTORY_LIMIT, 1) :]:
+    shutil.rmtree(stale, ignore_errors=True)
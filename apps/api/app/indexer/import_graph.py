@@ -0,0 +1,338 @@
+from __future__ import annotations
+
+import posixpath
+import threading
+from collections import OrderedDict, defaultdict
+from collections.abc import Iterable
+from pathlib import Path
+
+import numpy as np
+
+from ..config import ARTIFACTS_DIR
+from ..graph_artifacts import pack_strings, save_npz, unpack_strings
+
+JS_EXTENSIONS = (".ts", ".tsx", ".js", ".jsx")
+_GRAPH_CACHE_SIZE = 8
+
+
+class ImportResolver:
+  """Maps raw import strings to repo file paths, per language; external imports resolve to nothing."""
+
+  def __init__(self, paths: Iterable[str], go_module: str | None = None) -> None:
+    self.paths = set(paths)
+    self.go_module = go_module
+    # Every dotted tail of every Python module, so "app.main" finds "apps/api/app/main.py".
+    self.py_modules: dict[str, list[str]] = defaultdict(list)
+    self.path_tails: dict[str, list[str]] = defaultdict(list)
+    self.dir_files: dict[str, list[str]] = defaultdict(list)
+    for rel in sorted(self.paths):
+      parts = rel.split("/")
+      self.dir_files[posixpath.dirname(rel)].append(rel)
+      if rel.endswith(".java"):
+        for idx in range(len(parts)):
+          self.path_tails["/".join(parts[idx:])].append(rel)
+      if rel.endswith(".py"):
+        module = parts[:-1] if parts[-1] == "__init__.py" else [*parts[:-1], parts[-1][:-3]]
+        for idx in range(len(module)):
+          self.py_modules[".".join(module[idx:])].append(rel)
+
+  def resolve(self, src: str, spec: str) -> list[str]:
+    ext = posixpath.splitext(src)[1]
+    if ext == ".py":
+      return self._python(src, spec)
+    if ext in JS_EXTENSIONS:
+      return self._javascript(src, spec)
+    if ext == ".go":
+      return self._go(spec)
+    if ext == ".java":
+      return self._closest(src, self.path_tails.get(spec.replace(".", "/") + ".java", []))
+    if ext == ".rs":
+      return self._rust(src, spec)
+    return []
+
+  def _closest(self, src: str, candidates: list[str]) -> list[str]:
+    """Pick the candidate sharing the longest directory prefix with `src`, then the shortest."""
+    if not candidates:
+      return []
+    src_parts = src.split("/")
+
+    def rank(rel: str) -> tuple[int, int]:
+      shared = 0
+      for left, right in zip(src_parts, rel.split("/")):
+        if left != right:
+          break
+        shared += 1
+      return -shared, len(rel)
+
+    return [min(candidates, key=rank)]
+
+  def _python(self, src: str, spec: str) -> list[str]:
+    if spec.startswith("."):
+      level = len(spec) - len(spec.lstrip("."))
+      base = posixpath.dirname(src)
+      for _ in range(level - 1):
+        base = posixpath.dirname(base)
+      parts = [part for part in spec[level:].split(".") if part]
+      stem = posixpath.join(base, *parts) if parts else base
+      for candidate in (f"{stem}.py", f"{stem}/__init__.py"):
+        if candidate in self.paths:
+          return [candidate]
+      return []
+    parts = spec.split(".")
+    # `import pkg.mod.attr`-style specs fall back to their longest importable prefix.
+    for size in range(len(parts), 0, -1):
+      candidates = self.py_modules.get(".".join(parts[:size]), [])
+      if size == 1:
+        # A bare name only resolves next to the importer or at the root; else it is likely stdlib.
+        src_dir = posixpath.dirname(src)
+        candidates = [rel for rel in candidates if posixpath.dirname(rel) in {src_dir, ""}
+                      or rel in {f"{parts[0]}/__init__.py", f"{src_dir}/{parts[0]}/__init__.py".lstrip("/")}]
+      if candidates:
+        return self._closest(src, candidates)
+    return []
+
+  def _javascript(self, src: str, spec: str) -> list[str]:
+    if not spec.startswith("."):
+      return []
+    target = posixpath.normpath(posixpath.join(posixpath.dirname(src), spec))
+    stem, ext = posixpath.splitext(target)
+    candidates = [target] if ext in JS_EXTENSIONS else []
+    if ext in {".js", ".jsx"}:
+      # TypeScript sources import their compiled name ("./util.js" -> util.ts).
+      candidates += [stem + other for other in JS_EXTENSIONS]
+    candidates += [target + other for other in JS_EXTENSIONS]
+    candidates += [f"{target}/index{other}" for other in JS_EXTENSIONS]
+    for candidate in candidates:
+      if candidate in self.paths:
+        return [candidate]
+    return []
+
+  def _go(self, spec: str) -> list[str]:
+    if not self.go_module or not (spec == self.go_module or spec.startswith(self.go_module + "/")):
+      return []
+    package_dir = spec[len(self.go_module) + 1 :]
+    return [
+      rel for rel in self.dir_files.get(package_dir, []) if rel.endswith(".go") and not rel.endswith("_test.go")
+    ]
+
+  def _rust(self, src: str, spec: str) -> list[str]:
+    parts = [part.strip() for part in spec.split("{")[0].split("::") if part.strip()]
+    if not parts or parts[0] not in {"crate", "self", "super"}:
+      return []
+    if parts[0] == "crate":
+      base = posixpath.dirname(src)
+      while base and not any(f"{base}/{root}" in self.paths for root in ("lib.rs", "main.rs")):
+        base = posixpath.dirname(base)
+    else:
+      base = posixpath.dirname(src)
+      if parts[0] == "super":
+        base = posixpath.dirname(base)
+    module = parts[1:]
+    for size in range(len(module), 0, -1):
+      stem = posixpath.join(base, *module[:size])
+      for candidate in (f"{stem}.rs", f"{stem}/mod.rs"):
+        if candidate in self.paths:
+          return [candidate]
+    return []
+
+
+def _strongly_connected(indptr: np.ndarray, indices: np.ndarray) -> np.ndarray:
+  """Iterative Tarjan; returns a component id per node."""
+  count = len(indptr) - 1
+  ptr = indptr.tolist()
+  adj = indices.tolist()
+  index = [-1] * count
+  low = [0] * count
+  on_stack = [False] * count
+  component = [-1] * count
+  stack: list[int] = []
+  counter = 0
+  components = 0
+  for root in range(count):
+    if index[root] != -1:
+      continue
+    index[root] = low[root] = counter
+    counter += 1
+    stack.append(root)
+    on_stack[root] = True
+    work = [(root, ptr[root])]
+    while work:
+      node, pos = work[-1]
+      if pos < ptr[node + 1]:
+        work[-1] = (node, pos + 1)
+        nxt = adj[pos]
+        if index[nxt] == -1:
+          index[nxt] = low[nxt] = counter
+          counter += 1
+          stack.append(nxt)
+          on_stack[nxt] = True
+          work.append((nxt, ptr[nxt]))
+        elif on_stack[nxt]:
+          low[node] = min(low[node], index[nxt])
+        continue
+      work.pop()
+      if work:
+        parent = work[-1][0]
+        low[parent] = min(low[parent], low[node])
+      if low[node] == index[node]:
+        while True:
+          member = stack.pop()
+          on_stack[member] = False
+          component[member] = components
+          if member == node:
+            break
+        components += 1
+  return np.array(component, dtype=np.int32)
+
+
+def _csr(count: int, src: np.ndarray, dst: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+  order = np.lexsort((dst, src))
+  indptr = np.zeros(count + 1, dtype=np.int64)
+  np.cumsum(np.bincount(src, minlength=count), out=indptr[1:])
+  return indptr, dst[order].astype(np.int32)
+
+
+class CsrGraph:
+  """File-level import graph with interned node ids and CSR adjacency in both directions."""
+
+  def __init__(
+    self,
+    nodes: list[str],
+    fwd_indptr: np.ndarray,
+    fwd_indices: np.ndarray,
+    rev_indptr: np.ndarray,
+    rev_indices: np.ndarray,
+    scc: np.ndarray,
+  ) -> None:
+    self.nodes = nodes
+    self.fwd_indptr = fwd_indptr
+    self.fwd_indices = fwd_indices
+    self.rev_indptr = rev_indptr
+    self.rev_indices = rev_indices
+    self.scc = scc
+    self._ids: dict[str, int] | None = None
+
+  @classmethod
+  def from_edges(cls, nodes: list[str], edges: Iterable[tuple[int, int]]) -> CsrGraph:
+    pairs = np.array(list(edges), dtype=np.int64).reshape(-1, 2)
+    return cls.from_arrays(nodes, pairs[:, 0], pairs[:, 1])
+
+  @classmethod
+  def from_arrays(cls, nodes: list[str], src: np.ndarray, dst: np.ndarray) -> CsrGraph:
+    """Build from parallel source/target id arrays; duplicate edges are dropped."""
+    count = len(nodes)
+    keys = np.unique(src.astype(np.int64) * count + dst.astype(np.int64))
+    src, dst = keys // count, keys % count
+    fwd_indptr, fwd_indices = _csr(count, src, dst)
+    rev_indptr, rev_indices = _csr(count, dst, src)
+    return cls(nodes, fwd_indptr, fwd_indices, rev_indptr, rev_indices, _strongly_connected(fwd_indptr, fwd_indices))
+
+  @property
+  def edge_count(self) -> int:
+    return len(self.fwd_indices)
+
+  def node_id(self, path: str) -> int | None:
+    if self._ids is None:
+      self._ids = {name: idx for idx, name in enumerate(self.nodes)}
+    return self._ids.get(path)
+
+  def _adjacency(self, direction: str) -> tuple[np.ndarray, np.ndarray]:
+    if direction == "dependencies":
+      return self.fwd_indptr, self.fwd_indices
+    if direction == "dependents":
+      return self.rev_indptr, self.rev_indices
+    raise ValueError(f"unknown direction: {direction}")
+
+  def neighbors(self, node: int, direction: str = "dependencies") -> list[str]:
+    indptr, indices = self._adjacency(direction)
+    return [self.nodes[idx] for idx in indices[indptr[node] : indptr[node + 1]].tolist()]
+
+  def closure(self, node: int, direction: str = "dependencies", max_depth: int = 0) -> list[tuple[str, int]]:
+    """Breadth-first transitive closure as (path, depth) pairs; `max_depth` 0 means unlimited.
+
+    Each level is expanded with vectorized CSR gathers rather than per-edge Python loops.
+    """
+    indptr, indices = self._adjacency(direction)
+    seen = np.zeros(len(self.nodes), dtype=bool)
+    seen[node] = True
+    frontier = np.array([node], dtype=np.int64)
+    found: list[tuple[str, int]] = []
+    depth = 0
+    while len(frontier) and (max_depth <= 0 or depth < max_depth):
+      depth += 1
+      starts = indptr[frontier]
+      lengths = indptr[frontier + 1] - starts
+      total = int(lengths.sum())
+      if not total:
+        break
+      offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+      reached = np.unique(indices[offsets])
+      frontier = reached[~seen[reached]]
+      seen[frontier] = True
+      found.extend((self.nodes[idx], depth) for idx in frontier.tolist())
+    return found
+
+  def cycles(self) -> list[list[str]]:
+    """Strongly connected components with more than one file, largest first."""
+    sizes = np.bincount(self.scc) if len(self.scc) else np.zeros(0, dtype=np.int64)
+    members: dict[int, list[str]] = defaultdict(list)
+    for idx in np.flatnonzero(sizes[self.scc] > 1).tolist():
+      members[int(self.scc[idx])].append(self.nodes[idx])
+    return sorted(members.values(), key=lambda group: (-len(group), group[0]))
+
+  def save(self, path: Path) -> None:
+    names, name_offsets = pack_strings(self.nodes)
+    save_npz(
+      path,
+      names=names,
+      name_offsets=name_offsets,
+      fwd_indptr=self.fwd_indptr,
+      fwd_indices=self.fwd_indices,
+      rev_indptr=self.rev_indptr,
+      rev_indices=self.rev_indices,
+      scc=self.scc,
+    )
+
+  @classmethod
+  def load(cls, path: Path) -> CsrGraph:
+    with np.load(path) as data:
+      return cls(
+        unpack_strings(data["names"], data["name_offsets"]),
+        data["fwd_indptr"],
+        data["fwd_indices"],
+        data["rev_indptr"],
+        data["rev_indices"],
+        data["scc"],
+      )
+
+
+def graph_path(repo_id: str, commit_sha: str | None = None) -> Path:
+  """Latest graph of a repo, or the version written for `commit_sha`."""
+  graph_dir = ARTIFACTS_DIR / "index" / repo_id
+  if commit_sha:
+    graph_dir = graph_dir / "graphs" / commit_sha
+  return graph_dir / "graph.npz"
+
+
+_graphs: OrderedDict[tuple[str, int], CsrGraph] = OrderedDict()
+_graphs_lock = threading.Lock()
+
+
+def load_graph(repo_id: str, commit_sha: str | None = None) -> CsrGraph | None:
+  """Load a repo's CSR graph, cached until the artifact is rewritten."""
+  path = graph_path(repo_id, commit_sha)
+  try:
+    key = (str(path), path.stat().st_mtime_ns)
+  except FileNotFoundError:
+    return None
+  with _graphs_lock:
+    graph = _graphs.get(key)
+    if graph is not None:
+      _graphs.move_to_end(key)
+      return graph
+  graph = CsrGraph.load(path)
+  with _graphs_lock:
+    _graphs[key] = graph
+    while len(_graphs) > _GRAPH_CACHE_SIZE:
+      _graphs.popitem(last=False)
+  return graph
@@ -1,53 +1,310 @@
 from __future__ import annotations
 
+import hashlib
+import subprocess
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Iterator
 
-from ..llm.ollama_client import embed
-from ..vector_store.chroma_store import ChromaStore
-from .graph_index import build_graph
+from ..code_scan import ScannedFile, scan_repository
+from ..config import CHUNK_MAX_TOKENS, CHUNK_OVERLAP_LINES, CHUNK_STRATEGY, INDEX_BATCH_SIZE, INDEX_QUEUE_SIZE
+from ..llm.ollama_client import EmbedStats, embed_with_stats
+from ..repo_files import list_repo_files
+from ..symbol_index import SymbolIndex
+from ..vector_store.stores import get_store
+from .chunk_filters import chunk_metadata
+from .chunker import chunk_file
+from .code_search import CodeSearchBuilder
+from .graph_index import GraphBuilder
+from .index_state import IndexState
+from .lexical_index import LexicalIndex
+from .pipeline import buffered
 
+# Part of every chunk hash: bump it when chunk metadata changes shape, so the next run
+# re-upserts every chunk (their embeddings come from the embed cache).
+CHUNK_METADATA_VERSION = "3"
 
-def _iter_code_files(repo_path: Path) -> list[Path]:
-  ignore_dirs = {".git", "node_modules", ".next", ".venv", "venv", "__pycache__"}
-  files: list[Path] = []
-  for path in repo_path.rglob("*"):
-    if any(part in ignore_dirs for part in path.parts):
-      continue
-    if path.is_file() and path.suffix in {".py", ".ts", ".tsx", ".js", ".jsx", ".go", ".rs", ".java"}:
-      files.append(path)
-  return files
 
+@dataclass
+class _Chunk:
+  id: str
+  document: str
+  metadata: dict[str, str | int]
 
-def _chunk_lines(text: str, max_lines: int = 200) -> Iterable[str]:
-  lines = text.splitlines()
-  for i in range(0, len(lines), max_lines):
-    yield "\n".join(lines[i : i + max_lines])
 
+@dataclass
+class _FileDone:
+  path: str
+  hashes: dict[int, str]
+  stale_ids: list[str]
+  added: int = 0
+  updated: int = 0
 
-def index_repository(repo_id: str, repo_path: str) -> dict[str, object]:
+
+@dataclass
+class _Batch:
+  chunks: list[_Chunk] = field(default_factory=list)
+  files: list[_FileDone] = field(default_factory=list)
+  embeddings: list[list[float]] = field(default_factory=list)
+  stats: EmbedStats = field(default_factory=EmbedStats)
+
+
+def _chunk_hash(chunk: str) -> str:
+  return hashlib.sha256(f"{CHUNK_METADATA_VERSION}\0{chunk}".encode("utf-8")).hexdigest()
+
+
+def _git(args: list[str], cwd: Path) -> str | None:
+  proc = subprocess.run(
+    ["git", *args],
+    cwd=str(cwd),
+    capture_output=True,
+    text=True,
+    check=False,
+  )
+  if proc.returncode != 0:
+    return None
+  return proc.stdout
+
+
+def _head_commit(repo_path: Path) -> str | None:
+  out = _git(["rev-parse", "HEAD"], repo_path)
+  return out.strip() if out else None
+
+
+def _diff_paths(repo_path: Path, old_sha: str, new_sha: str) -> tuple[set[str], set[str]] | None:
+  """Return (changed, deleted) paths between two commits, or None if git cannot diff them."""
+  out = _git(["diff", "--name-status", "--no-renames", "-z", old_sha, new_sha], repo_path)
+  if out is None:
+    return None
+  changed: set[str] = set()
+  deleted: set[str] = set()
+  fields = out.split("\0")
+  for status, path in zip(fields[0::2], fields[1::2]):
+    if status.startswith("D"):
+      deleted.add(path)
+    elif path:
+      changed.add(path)
+  return changed, deleted
+
+
+def _read_chunks(
+  scanned: Iterable[ScannedFile],
+  repo_id: str,
+  paths: set[str],
+  incremental: bool,
+  graph: GraphBuilder,
+  search: CodeSearchBuilder,
+) -> Iterator[_Chunk | _FileDone]:
+  """Feed every scanned file to the graph, the code-search index and the symbol table, and
+  yield the chunks of `paths` that need embedding, each file followed by a marker closing it."""
+  state = IndexState(repo_id)
+  symbols = SymbolIndex(repo_id)
+  try:
+    for item in scanned:
+      rel = item.rel
+      graph.add(rel, item.text)
+      search.add(rel, item.text)
+      if item.analysis is not None:
+        symbols.replace_file(rel, item.blob_sha, item.analysis.symbols, item.analysis.references)
+      if rel not in paths:
+        continue
+      old_hashes = state.file_hashes(rel)
+      if item.text is None:
+        yield _FileDone(rel, {}, [f"{rel}:{idx}" for idx in old_hashes])
+        continue
+      done = _FileDone(rel, {}, [])
+      # Reuses the tree the scan parsed for the analysis instead of parsing the file again.
+      tree = item.syntax_tree if CHUNK_STRATEGY == "syntax" else None
+      chunks = chunk_file(rel, item.text, CHUNK_MAX_TOKENS, CHUNK_OVERLAP_LINES, CHUNK_STRATEGY, tree)
+      for chunk_idx, chunk in enumerate(chunks):
+        if not chunk.text.strip():
+          continue
+        digest = _chunk_hash(chunk.text)
+        done.hashes[chunk_idx] = digest
+        if incremental and old_hashes.get(chunk_idx) == digest:
+          continue
+        if chunk_idx in old_hashes:
+          done.updated += 1
+        else:
+          done.added += 1
+        metadata = {
+          "path": rel,
+          "chunk": str(chunk_idx),
+          "start_line": chunk.start_line,
+          "end_line": chunk.end_line,
+          "symbol": chunk.symbol or "",
+          **chunk_metadata(rel, chunk.kind),
+        }
+        yield _Chunk(f"{rel}:{chunk_idx}", chunk.text, metadata)
+      done.stale_ids = [f"{rel}:{idx}" for idx in old_hashes.keys() - done.hashes.keys()]
+      yield done
+    symbols.commit()
+  finally:
+    symbols.close()
+    state.close()
+
+
+def _group_batches(items: Iterable[_Chunk | _FileDone], batch_size: int) -> Iterator[_Batch]:
+  batch = _Batch()
+  for item in items:
+    if isinstance(item, _FileDone):
+      batch.files.append(item)
+    else:
+      batch.chunks.append(item)
+    if len(batch.chunks) >= batch_size or len(batch.files) >= batch_size:
+      yield batch
+      batch = _Batch()
+  if batch.chunks or batch.files:
+    yield batch
+
+
+def _embed_batches(batches: Iterable[_Batch]) -> Iterator[_Batch]:
+  for batch in batches:
+    if batch.chunks:
+      batch.embeddings, batch.stats = embed_with_stats([chunk.document for chunk in batch.chunks])
+    yield batch
+
+
+def index_repository(repo_id: str, repo_path: str, incremental: bool = True) -> dict[str, object]:
+  """Embed the repo's code chunks into its vector collection.
+
+  Files stream through read -> chunk -> embed -> upsert stages connected by bounded queues,
+  and chunk hashes are committed after every upserted batch, so memory stays flat and an
+  interrupted run resumes after the last fully indexed file of the same commit.
+
+  In incremental mode only files touched since the last indexed commit are read, and only
+  chunks whose content hash changed are re-embedded. Without a usable git diff every file
+  is read, but unchanged chunks are still skipped.
+
+  Every listed file is read exactly once by a shared scan that also feeds the import graph
+  and fills the analysis cache, so a following `/analysis/run` re-reads nothing. When the
+  graph of the last indexed commit is on disk, only the diff is scanned and the graph is
+  patched in place; unchanged files are already in the blob-keyed analysis cache. The
+  trigram code-search index is patched the same way, from its previous generation, and the
+  symbol table is rewritten only for files whose blob changed.
+
+  Every upserted or deleted chunk is mirrored into the repo's lexical (FTS5) index in the
+  same batch. A lexical index that is behind the vector collection, e.g. one created after
+  the repo was first indexed, makes this run re-read every file; unchanged chunks come from
+  the embedding cache.
+  """
   root = Path(repo_path)
-  store = ChromaStore(collection=f"repo:{repo_id}")
-  ids: list[str] = []
-  embeddings: list[list[float]] = []
-  metadatas: list[dict[str, str]] = []
-  documents: list[str] = []
-
-  for file_path in _iter_code_files(root):
-    rel = file_path.relative_to(root).as_posix()
+  store = get_store(f"repo:{repo_id}")
+  state = IndexState(repo_id)
+  lexical = LexicalIndex(repo_id)
+  head_sha = _head_commit(root)
+  added = 0
+  updated = 0
+  deleted = 0
+  embed_stats = EmbedStats()
+  search = None
+  search_meta = None
+  try:
+    diff = None
+    last_sha = state.last_commit()
+    if lexical.last_commit() != last_sha:
+      incremental = False
+    if incremental and head_sha and last_sha:
+      diff = _diff_paths(root, last_sha, head_sha)
+
+    listed = [repo_file.rel for repo_file in list_repo_files(root)]
+    graph = None
+    if diff is None:
+      candidates = listed
+      removed = state.paths() - set(listed)
+    else:
+      changed, removed = diff
+      indexable = changed.intersection(listed)
+      candidates = sorted(indexable)
+      removed |= changed - indexable
+      # The graph of the last indexed commit is patched with just this diff.
+      graph = GraphBuilder.load(repo_id, root, last_sha)
+      search = CodeSearchBuilder.load(repo_id, last_sha) if graph is not None else None
+    if graph is None or search is None:
+      graph = GraphBuilder(root)
+      search = CodeSearchBuilder(repo_id)
+      scan_paths = listed
+    else:
+      for rel in removed:
+        graph.remove(rel)
+        search.remove(rel)
+      scan_paths = sorted(indexable)
+
+    resume_after = state.resume_point(head_sha) if incremental and head_sha else None
+    if resume_after:
+      candidates = [rel for rel in candidates if rel > resume_after]
+
+    stale_ids = [f"{rel}:{idx}" for rel in sorted(removed) for idx in state.file_hashes(rel)]
+    store.delete(stale_ids)
+    lexical.delete(stale_ids)
+    for rel in removed:
+      state.remove_file(rel)
+    lexical.commit()
+    state.commit()
+    deleted += len(stale_ids)
+    symbols = SymbolIndex(repo_id)
     try:
-      content = file_path.read_text(encoding="utf-8")
-    except UnicodeDecodeError:
-      continue
-    for chunk_idx, chunk in enumerate(_chunk_lines(content)):
-      if not chunk.strip():
-        continue
-      ids.append(f"{rel}:{chunk_idx}")
-      documents.append(chunk)
-      metadatas.append({"path": rel, "chunk": str(chunk_idx)})
-  if documents:
-    embeddings = embed(documents)
-    store.add_documents(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
-
-  graph_meta = build_graph(repo_path, repo_id)
-  return {"chunks": len(ids), **graph_meta}
+      if scan_paths is listed:
+        symbols.retain(set(listed))
+      else:
+        symbols.remove_files(removed)
+      symbols.commit()
+    finally:
+      symbols.close()
+
+    scanned = scan_repository(root, scan_paths)
+    records = buffered(_read_chunks(scanned, repo_id, set(candidates), incremental, graph, search), INDEX_QUEUE_SIZE)
+    for batch in buffered(_embed_batches(_group_batches(records, INDEX_BATCH_SIZE)), 2):
+      if batch.chunks:
+        store.add_documents(
+          ids=[chunk.id for chunk in batch.chunks],
+          embeddings=batch.embeddings,
+          metadatas=[chunk.metadata for chunk in batch.chunks],
+          documents=[chunk.document for chunk in batch.chunks],
+        )
+        lexical.add_documents(
+          ids=[chunk.id for chunk in batch.chunks],
+          metadatas=[chunk.metadata for chunk in batch.chunks],
+          documents=[chunk.document for chunk in batch.chunks],
+        )
+      stale_ids = [doc_id for done in batch.files for doc_id in done.stale_ids]
+      store.delete(stale_ids)
+      lexical.delete(stale_ids)
+      for done in batch.files:
+        state.replace_file(done.path, done.hashes)
+        added += done.added
+        updated += done.updated
+      deleted += len(stale_ids)
+      embed_stats.merge(batch.stats)
+      if batch.files and head_sha:
+        state.set_resume_point(head_sha, batch.files[-1].path)
+      lexical.commit()
+      state.commit()
+
+    graph_meta = graph.write(repo_id, head_sha)
+    search_meta = search.write(head_sha)
+    state.set_last_commit(head_sha)
+    state.clear_resume_point()
+    lexical.set_last_commit(head_sha)
+    lexical.commit()
+    state.commit()
+    total = state.chunk_count()
+  finally:
+    # A run that fails before publishing must not leave its half-built generation behind.
+    if search is not None and search_meta is None:
+      search.discard()
+    lexical.close()
+    state.close()
+
+  return {
+    "chunks": total,
+    "added": added,
+    "updated": updated,
+    "deleted": deleted,
+    "skipped": total - added - updated,
+    "commit_sha": head_sha,
+    "embed_chunks_per_sec": round(embed_stats.chunks_per_sec, 2),
+    "embed_cache_hits": embed_stats.cache_hits,
+    "code_search": search_meta,
+    **graph_meta,
+  }
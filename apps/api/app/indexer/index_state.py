@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import sqlite3
+from datetime import UTC, datetime
+
+from ..config import INDEX_DB_PATH
+
+
+def _connect() -> sqlite3.Connection:
+  conn = sqlite3.connect(INDEX_DB_PATH)
+  conn.row_factory = sqlite3.Row
+  conn.execute("PRAGMA journal_mode=WAL")
+  conn.execute(
+    """
+    CREATE TABLE IF NOT EXISTS index_commits (
+      repo_id TEXT PRIMARY KEY,
+      commit_sha TEXT,
+      updated_at TEXT NOT NULL
+    )
+    """
+  )
+  conn.execute(
+    """
+    CREATE TABLE IF NOT EXISTS index_chunks (
+      repo_id TEXT NOT NULL,
+      path TEXT NOT NULL,
+      chunk_idx INTEGER NOT NULL,
+      content_hash TEXT NOT NULL,
+      PRIMARY KEY (repo_id, path, chunk_idx)
+    )
+    """
+  )
+  conn.execute(
+    """
+    CREATE TABLE IF NOT EXISTS index_progress (
+      repo_id TEXT PRIMARY KEY,
+      commit_sha TEXT NOT NULL,
+      resume_after TEXT NOT NULL
+    )
+    """
+  )
+  conn.commit()
+  return conn
+
+
+class IndexState:
+  """Chunk content hashes and the last indexed commit of one repo."""
+
+  def __init__(self, repo_id: str) -> None:
+    self.repo_id = repo_id
+    self._conn = _connect()
+
+  def last_commit(self) -> str | None:
+    row = self._conn.execute(
+      "SELECT commit_sha FROM index_commits WHERE repo_id=?",
+      (self.repo_id,),
+    ).fetchone()
+    return row["commit_sha"] if row else None
+
+  def set_last_commit(self, commit_sha: str | None) -> None:
+    self._conn.execute(
+      "INSERT INTO index_commits (repo_id, commit_sha, updated_at) VALUES (?, ?, ?) "
+      "ON CONFLICT(repo_id) DO UPDATE SET commit_sha=excluded.commit_sha, updated_at=excluded.updated_at",
+      (self.repo_id, commit_sha, datetime.now(UTC).isoformat()),
+    )
+
+  def resume_point(self, commit_sha: str) -> str | None:
+    """Return the last fully indexed path of an interrupted run targeting `commit_sha`."""
+    row = self._conn.execute(
+      "SELECT resume_after FROM index_progress WHERE repo_id=? AND commit_sha=?",
+      (self.repo_id, commit_sha),
+    ).fetchone()
+    return row["resume_after"] if row else None
+
+  def set_resume_point(self, commit_sha: str, resume_after: str) -> None:
+    self._conn.execute(
+      "INSERT INTO index_progress (repo_id, commit_sha, resume_after) VALUES (?, ?, ?) "
+      "ON CONFLICT(repo_id) DO UPDATE SET commit_sha=excluded.commit_sha, resume_after=excluded.resume_after",
+      (self.repo_id, commit_sha, resume_after),
+    )
+
+  def clear_resume_point(self) -> None:
+    self._conn.execute("DELETE FROM index_progress WHERE repo_id=?", (self.repo_id,))
+
+  def paths(self) -> set[str]:
+    rows = self._conn.execute(
+      "SELECT DISTINCT path FROM index_chunks WHERE repo_id=?",
+      (self.repo_id,),
+    ).fetchall()
+    return {row["path"] for row in rows}
+
+  def file_hashes(self, path: str) -> dict[int, str]:
+    rows = self._conn.execute(
+      "SELECT chunk_idx, content_hash FROM index_chunks WHERE repo_id=? AND path=?",
+      (self.repo_id, path),
+    ).fetchall()
+    return {int(row["chunk_idx"]): row["content_hash"] for row in rows}
+
+  def replace_file(self, path: str, hashes: dict[int, str]) -> None:
+    self.remove_file(path)
+    self._conn.executemany(
+      "INSERT INTO index_chunks (repo_id, path, chunk_idx, content_hash) VALUES (?, ?, ?, ?)",
+      [(self.repo_id, path, idx, digest) for idx, digest in hashes.items()],
+    )
+
+  def remove_file(self, path: str) -> None:
+    self._conn.execute("DELETE FROM index_chunks WHERE repo_id=? AND path=?", (self.repo_id, path))
+
+  def chunk_count(self) -> int:
+    row = self._conn.execute("SELECT COUNT(*) AS n FROM index_chunks WHERE repo_id=?", (self.repo_id,)).fetchone()
+    return int(row["n"])
+
+  def commit(self) -> None:
+    self._conn.commit()
+
+  def close(self) -> None:
+    self._conn.close()
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import json
+import re
+import sqlite3
+from pathlib import Path
+from typing import Any
+
+from ..config import LEXICAL_INDEX_DIR
+
+_IDENTIFIER = re.compile(r"[A-Za-z0-9_]+")
+_SUBWORD = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+_QUOTED = re.compile(r"`([^`]+)`|\"([^\"]+)\"|'([^']{3,})'")
+_SQL_BATCH = 500
+# Weights of the path, symbol, text and words columns in bm25().
+_BM25_WEIGHTS = (2.0, 4.0, 1.0, 0.5)
+_STOPWORDS = frozenset(
+  "a an and are as at be by can do does for from how i if in is it me of on or our "
+  "should so that the this to was we what when where which who why will with you".split()
+)
+
+
+def index_path(repo_id: str) -> Path:
+  return LEXICAL_INDEX_DIR / f"{repo_id}.sqlite3"
+
+
+def subwords(text: str) -> str:
+  """snake_case and camelCase identifiers split into their words, so `store` finds `get_store`."""
+  words: list[str] = []
+  for token in _IDENTIFIER.findall(text):
+    parts = [part for piece in token.split("_") for part in _SUBWORD.findall(piece)]
+    if len(parts) > 1:
+      words.extend(parts)
+  return " ".join(words)
+
+
+def match_query(question: str, expand: bool = True) -> str:
+  """FTS5 query OR-ing the question's quoted phrases and identifiers, plus the identifiers'
+  subwords when `expand` is set."""
+  terms: list[str] = []
+  for groups in _QUOTED.findall(question):
+    phrase = " ".join(_IDENTIFIER.findall(next(group for group in groups if group)))
+    if phrase:
+      terms.append(phrase)
+  for token in _IDENTIFIER.findall(question):
+    terms.append(token)
+    if expand:
+      terms.extend(subwords(token).split())
+  seen: dict[str, None] = {}
+  for term in terms:
+    if len(term) > 1 and term.lower() not in _STOPWORDS:
+      seen.setdefault(term.lower(), None)
+  return " OR ".join(f'"{term}"' for term in seen)
+
+
+class LexicalIndex:
+  """BM25 full-text index of one repo's chunks in SQLite FTS5.
+
+  Every chunk in the vector collection has a row here under the same id, with its path,
+  symbol, text and identifier subwords as columns. Identifiers stay whole (`_` is a token
+  character), so exact names, config keys and error strings rank first.
+  """
+
+  def __init__(self, repo_id: str, path: Path | None = None) -> None:
+    self.repo_id = repo_id
+    self.path = path or index_path(repo_id)
+    self.path.parent.mkdir(parents=True, exist_ok=True)
+    self._conn = sqlite3.connect(self.path, check_same_thread=False)
+    self._conn.execute("PRAGMA journal_mode=WAL")
+    self._conn.executescript(
+      """
+      CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT);
+      CREATE TABLE IF NOT EXISTS docs (
+        row INTEGER PRIMARY KEY,
+        id TEXT NOT NULL UNIQUE,
+        metadata TEXT NOT NULL
+      );
+      CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5(
+        path, symbol, text, words, tokenize="unicode61 tokenchars '_'"
+      );
+      """
+    )
+    self._conn.commit()
+
+  def last_commit(self) -> str | None:
+    row = self._conn.execute("SELECT value FROM info WHERE key='commit_sha'").fetchone()
+    return row[0] if row else None
+
+  def set_last_commit(self, commit_sha: str | None) -> None:
+    self._conn.execute(
+      "INSERT INTO info (key, value) VALUES ('commit_sha', ?) ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+      (commit_sha,),
+    )
+
+  def delete(self, ids: list[str]) -> None:
+    for start in range(0, len(ids), _SQL_BATCH):
+      batch = ids[start : start + _SQL_BATCH]
+      marks = ",".join("?" * len(batch))
+      rows = [row for (row,) in self._conn.execute(f"SELECT row FROM docs WHERE id IN ({marks})", batch)]
+      self._conn.executemany("DELETE FROM chunks WHERE rowid=?", [(row,) for row in rows])
+      self._conn.executemany("DELETE FROM docs WHERE row=?", [(row,) for row in rows])
+
+  def add_documents(self, ids: list[str], metadatas: list[dict[str, Any]], documents: list[str]) -> None:
+    self.delete(ids)
+    for doc_id, metadata, document in zip(ids, metadatas, documents):
+      cursor = self._conn.execute("INSERT INTO docs (id, metadata) VALUES (?, ?)", (doc_id, json.dumps(metadata)))
+      path = str(metadata.get("path", ""))
+      symbol = str(metadata.get("symbol") or "")
+      self._conn.execute(
+        "INSERT INTO chunks (rowid, path, symbol, text, words) VALUES (?, ?, ?, ?, ?)",
+        (cursor.lastrowid, path, symbol, document, subwords(f"{path} {symbol} {document}")),
+      )
+
+  def _match(self, query: str, limit: int, where: dict[str, Any] | None = None) -> list[dict[str, Any]]:
+    weights = ", ".join(str(weight) for weight in _BM25_WEIGHTS)
+    # Metadata conditions filter the matches in SQLite, ahead of the ORDER BY ... LIMIT.
+    conditions = "".join(" AND json_extract(docs.metadata, ?) = ?" for _ in where or {})
+    params = [item for key, value in (where or {}).items() for item in (f'$."{key}"', value)]
+    rows = self._conn.execute(
+      f"SELECT docs.id, docs.metadata, chunks.text, bm25(chunks, {weights}) AS rank "
+      f"FROM chunks JOIN docs ON docs.row = chunks.rowid WHERE chunks MATCH ?{conditions} ORDER BY rank LIMIT ?",
+      (query, *params, limit),
+    ).fetchall()
+    return [
+      {"id": doc_id, "metadata": json.loads(metadata), "document": text, "score": -rank}
+      for doc_id, metadata, text, rank in rows
+    ]
+
+  def search(self, question: str, limit: int = 20, where: dict[str, Any] | None = None) -> list[dict[str, Any]]:
+    """Best chunks first, each with its id, document, metadata and BM25 score (higher is better).
+
+    Subwords of the question's identifiers are common words that match much of a repo and
+    make BM25 score most chunks, so they are only tried when the exact terms match nothing.
+    `where` keeps only chunks whose metadata equals every item.
+    """
+    exact = match_query(question, expand=False)
+    if not exact or limit <= 0:
+      return []
+    hits = self._match(exact, limit, where)
+    expanded = match_query(question)
+    if not hits and expanded != exact:
+      hits = self._match(expanded, limit, where)
+    return hits
+
+  def count(self) -> int:
+    return int(self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0])
+
+  def commit(self) -> None:
+    self._conn.commit()
+
+  def close(self) -> None:
+    self._conn.close()
+
+
+def search_lexical(repo_id: str, question: str, limit: int = 20, where: dict[str, Any] | None = None) -> list[dict[str, Any]]:
+  """Search a repo's lexical index; a repo indexed before the index existed has no hits."""
+  path = index_path(repo_id)
+  if not path.exists():
+    return []
+  index = LexicalIndex(repo_id, path)
+  try:
+    return index.search(question, limit, where)
+  finally:
+    index.close()
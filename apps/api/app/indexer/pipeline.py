@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import queue
+import threading
+from typing import Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+class _Failure:
+  def __init__(self, exc: BaseException) -> None:
+    self.exc = exc
+
+
+def buffered(items: Iterable[T], maxsize: int) -> Iterator[T]:
+  """Run `items` on a background thread and hand its output over through a bounded queue.
+
+  The producer blocks once `maxsize` items are waiting, so chaining stages with this keeps
+  memory flat. Producer exceptions are re-raised in the consumer, and closing the consumer
+  stops the producer.
+  """
+  buffer: queue.Queue = queue.Queue(maxsize=max(1, maxsize))
+  stop = threading.Event()
+
+  def put(item: object) -> bool:
+    while not stop.is_set():
+      try:
+        buffer.put(item, timeout=0.1)
+        return True
+      except queue.Full:
+        continue
+    return False
+
+  def produce() -> None:
+    iterator = iter(items)
+    try:
+      for item in iterator:
+        if not put(item):
+          return
+      put(_DONE)
+    except BaseException as exc:
+      put(_Failure(exc))
+    finally:
+      close = getattr(iterator, "close", None)
+      if close:
+        close()
+
+  thread = threading.Thread(target=produce, daemon=True)
+  thread.start()
+  try:
+    while True:
+      item = buffer.get()
+      if item is _DONE:
+        return
+      if isinstance(item, _Failure):
+        raise item.exc
+      yield item
+  finally:
+    stop.set()
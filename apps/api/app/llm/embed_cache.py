@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+
+
+def _digest(text: str) -> str:
+  return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _chunks(items: list[str], size: int = 500):
+  for i in range(0, len(items), size):
+    yield items[i : i + size]
+
+
+class EmbeddingCache:
+  """On-disk embedding cache keyed by (embed model, sha256 of text) with LRU eviction.
+
+  Entries written for any other model are dropped when the cache is opened, so changing
+  OLLAMA_EMBED_MODEL invalidates it.
+  """
+
+  def __init__(self, path: Path, model: str, max_entries: int) -> None:
+    self.model = model
+    self.max_entries = max_entries
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+    self._lock = threading.Lock()
+    self._conn = sqlite3.connect(path, check_same_thread=False)
+    self._conn.execute(
+      """
+      CREATE TABLE IF NOT EXISTS embeddings (
+        model TEXT NOT NULL,
+        digest TEXT NOT NULL,
+        vector BLOB NOT NULL,
+        last_used REAL NOT NULL,
+        PRIMARY KEY (model, digest)
+      )
+      """
+    )
+    self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+    self._conn.execute("DELETE FROM embeddings WHERE model != ?", (model,))
+    self._conn.commit()
+    self._entries = int(self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0])
+
+  def get_many(self, texts: list[str]) -> dict[int, list[float]]:
+    """Return cached vectors by position in `texts`."""
+    digests = [_digest(text) for text in texts]
+    found: dict[str, list[float]] = {}
+    with self._lock:
+      for part in _chunks(list(set(digests))):
+        marks = ",".join("?" * len(part))
+        rows = self._conn.execute(
+          f"SELECT digest, vector FROM embeddings WHERE model=? AND digest IN ({marks})",
+          (self.model, *part),
+        ).fetchall()
+        for digest, blob in rows:
+          found[digest] = array("f", blob).tolist()
+      if found:
+        now = time.time()
+        self._conn.executemany(
+          "UPDATE embeddings SET last_used=? WHERE model=? AND digest=?",
+          [(now, self.model, digest) for digest in found],
+        )
+        self._conn.commit()
+      out = {idx: found[digest] for idx, digest in enumerate(digests) if digest in found}
+      self.hits += len(out)
+      self.misses += len(texts) - len(out)
+    return out
+
+  def put_many(self, texts: list[str], vectors: list[list[float]]) -> None:
+    rows = [
+      (self.model, _digest(text), array("f", vector).tobytes(), time.time())
+      for text, vector in zip(texts, vectors)
+      if vector
+    ]
+    with self._lock:
+      before = self._conn.total_changes
+      self._conn.executemany(
+        "INSERT OR IGNORE INTO embeddings (model, digest, vector, last_used) VALUES (?, ?, ?, ?)",
+        rows,
+      )
+      self._entries += self._conn.total_changes - before
+      excess = self._entries - self.max_entries
+      if excess > 0:
+        self._conn.execute(
+          "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+          (excess,),
+        )
+        self._entries -= excess
+        self.evictions += excess
+      self._conn.commit()
+
+  def stats(self) -> dict[str, int | str]:
+    return {
+      "model": self.model,
+      "entries": self._entries,
+      "max_entries": self.max_entries,
+      "hits": self.hits,
+      "misses": self.misses,
+      "evictions": self.evictions,
+    }
+
+  def close(self) -> None:
+    with self._lock:
+      self._conn.close()
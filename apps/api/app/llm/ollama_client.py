@@ -1,40 +1,94 @@
 from __future__ import annotations
 
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from typing import Any
 
-import requests
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from ..config import (
+  EMBED_CACHE_MAX_ENTRIES,
+  EMBED_CACHE_PATH,
+  HTTP_POOL_MAXSIZE,
   OLLAMA_BASE_URL,
   OLLAMA_CHAT_MODEL,
   OLLAMA_CODE_MODEL,
+  OLLAMA_EMBED_BATCH_SIZE,
+  OLLAMA_EMBED_CONCURRENCY,
   OLLAMA_EMBED_MODEL,
   OLLAMA_FALLBACK_MODEL,
+  OLLAMA_TIMEOUT,
 )
+from ..http_pool import get_async_http_client, get_http_client
+from .embed_cache import EmbeddingCache
 
 
 class OllamaError(RuntimeError):
   pass
 
 
+_embed_cache: EmbeddingCache | None = None
+_embed_cache_lock = threading.Lock()
+
+
+def get_embed_cache() -> EmbeddingCache | None:
+  global _embed_cache
+  if EMBED_CACHE_MAX_ENTRIES <= 0:
+    return None
+  with _embed_cache_lock:
+    if _embed_cache is None:
+      _embed_cache = EmbeddingCache(EMBED_CACHE_PATH, OLLAMA_EMBED_MODEL, EMBED_CACHE_MAX_ENTRIES)
+    return _embed_cache
+
+
+# Embedding batches run OLLAMA_EMBED_CONCURRENCY at a time; each needs its own pooled connection.
+_POOL_SIZE = max(HTTP_POOL_MAXSIZE, OLLAMA_EMBED_CONCURRENCY)
+
+
 @retry(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=8))
 def _post(path: str, payload: dict[str, Any]) -> dict[str, Any]:
   url = f"{OLLAMA_BASE_URL}{path}"
-  resp = requests.post(url, json=payload, timeout=60)
+  resp = get_http_client("ollama", OLLAMA_TIMEOUT, _POOL_SIZE).post(url, json=payload)
   if resp.status_code >= 400:
     raise OllamaError(f"Ollama error {resp.status_code}: {resp.text}")
   return resp.json()
 
 
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=8))
+async def _apost(path: str, payload: dict[str, Any]) -> dict[str, Any]:
+  url = f"{OLLAMA_BASE_URL}{path}"
+  resp = await get_async_http_client("ollama", OLLAMA_TIMEOUT, _POOL_SIZE).post(url, json=payload)
+  if resp.status_code >= 400:
+    raise OllamaError(f"Ollama error {resp.status_code}: {resp.text}")
+  return resp.json()
+
+
+def _chat_payload(messages: list[dict[str, str]], model: str) -> dict[str, Any]:
+  return {"model": model, "messages": messages, "stream": False}
+
+
 def chat(messages: list[dict[str, str]], model: str | None = None) -> str:
   selected = model or OLLAMA_CHAT_MODEL
   try:
-    data = _post("/api/chat", {"model": selected, "messages": messages, "stream": False})
+    data = _post("/api/chat", _chat_payload(messages, selected))
   except Exception:
     if OLLAMA_FALLBACK_MODEL and selected != OLLAMA_FALLBACK_MODEL:
-      data = _post("/api/chat", {"model": OLLAMA_FALLBACK_MODEL, "messages": messages, "stream": False})
+      data = _post("/api/chat", _chat_payload(messages, OLLAMA_FALLBACK_MODEL))
+    else:
+      raise
+  return data.get("message", {}).get("content", "")
+
+
+async def achat(messages: list[dict[str, str]], model: str | None = None) -> str:
+  """`chat` without holding a thread while the model generates, for async request handlers."""
+  selected = model or OLLAMA_CHAT_MODEL
+  try:
+    data = await _apost("/api/chat", _chat_payload(messages, selected))
+  except Exception:
+    if OLLAMA_FALLBACK_MODEL and selected != OLLAMA_FALLBACK_MODEL:
+      data = await _apost("/api/chat", _chat_payload(messages, OLLAMA_FALLBACK_MODEL))
     else:
       raise
   return data.get("message", {}).get("content", "")
@@ -44,13 +98,77 @@ def code(messages: list[dict[str, str]]) -> str:
   return chat(messages, model=OLLAMA_CODE_MODEL)
 
 
+@dataclass
+class EmbedStats:
+  texts: int = 0
+  batches: int = 0
+  cache_hits: int = 0
+  seconds: float = 0.0
+
+  @property
+  def chunks_per_sec(self) -> float:
+    return self.texts / self.seconds if self.seconds > 0 else 0.0
+
+  def merge(self, other: EmbedStats) -> None:
+    self.texts += other.texts
+    self.batches += other.batches
+    self.cache_hits += other.cache_hits
+    self.seconds += other.seconds
+
+
+def _embed_batch(texts: list[str]) -> list[list[float]]:
+  data = _post("/api/embed", {"model": OLLAMA_EMBED_MODEL, "input": texts})
+  vectors = data.get("embeddings", [])
+  if len(vectors) != len(texts):
+    raise OllamaError(f"Ollama returned {len(vectors)} embeddings for {len(texts)} inputs")
+  return vectors
+
+
+def embed_with_stats(
+  texts: list[str],
+  batch_size: int | None = None,
+  max_in_flight: int | None = None,
+) -> tuple[list[list[float]], EmbedStats]:
+  """Embed texts through the multi-input endpoint, keeping input order.
+
+  Blank texts get an empty vector and are never sent. Texts found in the embedding cache
+  are not sent either, and identical texts are embedded once. Batches run on at most
+  `max_in_flight` threads; each batch request is retried on its own by `_post`.
+  """
+  size = max(1, batch_size or OLLAMA_EMBED_BATCH_SIZE)
+  workers = max(1, max_in_flight or OLLAMA_EMBED_CONCURRENCY)
+  vectors: list[list[float]] = [[] for _ in texts]
+  positions = [idx for idx, text in enumerate(texts) if text.strip()]
+
+  cache = get_embed_cache()
+  cached = cache.get_many([texts[idx] for idx in positions]) if cache else {}
+  pending: dict[str, list[int]] = {}
+  for offset, idx in enumerate(positions):
+    if offset in cached:
+      vectors[idx] = cached[offset]
+    else:
+      pending.setdefault(texts[idx], []).append(idx)
+  unique = list(pending)
+  batches = [unique[i : i + size] for i in range(0, len(unique), size)]
+
+  started = time.perf_counter()
+  if batches:
+    with ThreadPoolExecutor(max_workers=min(workers, len(batches))) as pool:
+      for batch, batch_vectors in zip(batches, pool.map(_embed_batch, batches)):
+        for text, vector in zip(batch, batch_vectors):
+          for idx in pending[text]:
+            vectors[idx] = vector
+        if cache:
+          cache.put_many(batch, batch_vectors)
+  stats = EmbedStats(
+    texts=len(unique),
+    batches=len(batches),
+    cache_hits=len(cached),
+    seconds=time.perf_counter() - started,
+  )
+  return vectors, stats
+
+
 def embed(texts: list[str]) -> list[list[float]]:
-  vectors: list[list[float]] = []
-  for text in texts:
-    if not text.strip():
-      vectors.append([])
-      continue
-    data = _post("/api/embeddings", {"model": OLLAMA_EMBED_MODEL, "prompt": text})
-    vectors.append(data.get("embedding", []))
-    time.sleep(0.01)
+  vectors, _ = embed_with_stats(texts)
   return vectors
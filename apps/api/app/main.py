@@ -1,14 +1,24 @@
 from __future__ import annotations
 
+import json
 import subprocess
+import threading
+import time
 import uuid
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import Literal
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
 
 from .ast_analyzer import analyze_repository
-from .config import ARTIFACTS_DIR
+from .churn import ChurnError
+from .config import ARTIFACTS_DIR, CHAT_RETRIEVAL_MODE
+from .git_objects import GitObjectError, resolve_commit
 from .git_refactor import GitRefactorError, create_refactor_commit, rollback_branch
 from .github_app import (
     GithubAppError,
@@ -17,8 +27,13 @@ from .github_app import (
     is_github_app_configured,
     push_branch,
 )
+from .graph_artifacts import EdgeArtifact, load_edges
+from .http_pool import close_http_clients, http_connection_stats
+from .indexer.chunk_filters import ChunkFilter
+from .indexer.code_search import CodeSearchError, search_code
+from .indexer.import_graph import CsrGraph, graph_path, load_graph
 from .indexer.index_repo import index_repository
-from .llm.ollama_client import chat, embed
+from .llm.ollama_client import achat
 from .memory.sqlite_memory import (
     add_feedback,
     add_message,
@@ -32,17 +47,24 @@ from .memory.sqlite_memory import (
 )
 from .pr_draft import write_local_pr_draft
 from .repo_ingest import RepoIngestError, ingest_repository, install_post_commit_hook
+from .retrieval import retrieve
 from .schemas import (
     AnalysisResultResponse,
     AnalysisRunRequest,
     AnalysisRunResponse,
     ChatRequest,
     ChatResponse,
+    CodeSearchResponse,
     ConversationListResponse,
     FeedbackRequest,
     FeedbackResponse,
+    FunctionHotspot,
     GithubPrRequest,
     GithubPrResponse,
+    GraphClosureItem,
+    GraphClosureResponse,
+    GraphCyclesResponse,
+    GraphNeighborsResponse,
     Hotspot,
     IndexRepoRequest,
     IndexRepoResponse,
@@ -54,14 +76,35 @@ from .schemas import (
     RefactorApplyResponse,
     RefactorProposalRequest,
     RefactorProposalResponse,
+    SymbolLookupResponse,
+    SymbolReferencesResponse,
     TaskEnqueueRequest,
     TaskEnqueueResponse,
     TaskStatusResponse,
 )
 from .store import store
-from .vector_store.chroma_store import ChromaStore
+from .symbol_index import find_references, lookup_symbols
+from .vector_store.stores import close_stores, warm_up_stores
 
-app = FastAPI(title="Codebase Agent API", version="0.3.0")
+
+def _warm_vector_store() -> None:
+    try:
+        warm_up_stores()
+    except Exception:
+        # A cold store only costs the first query its load time.
+        pass
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    # Collections load in the background so a large store does not hold up startup.
+    threading.Thread(target=_warm_vector_store, name="vector-store-warmup", daemon=True).start()
+    yield
+    close_stores()
+    await close_http_clients()
+
+
+app = FastAPI(title="Codebase Agent API", version="0.3.0", lifespan=lifespan)
 app.mount("/artifacts", StaticFiles(directory=ARTIFACTS_DIR), name="artifacts")
 
 init_db()
@@ -112,11 +155,16 @@ def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/metrics/http")
+def http_metrics() -> dict[str, dict[str, dict[str, float | int]]]:
+    return http_connection_stats()
+
+
 @app.post("/repos/import", response_model=RepoImportResponse)
 def import_repo(payload: RepoImportRequest) -> RepoImportResponse:
     repo_id = f"r_{uuid.uuid4().hex[:8]}"
     try:
-        ingest_result = ingest_repository(payload.repo_url, payload.branch)
+        ingest_result = ingest_repository(payload.repo_url, payload.branch, depth=payload.history_depth)
     except RepoIngestError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
     store.repos[repo_id] = {
@@ -161,10 +209,17 @@ def index_repo(payload: IndexRepoRequest) -> IndexRepoResponse:
     if not repo:
         raise HTTPException(status_code=404, detail="repo_id not found")
     try:
-        result = index_repository(payload.repo_id, repo["path"])
+        result = index_repository(payload.repo_id, repo["path"], incremental=payload.incremental)
         return IndexRepoResponse(
             status="completed",
             chunks=int(result.get("chunks", 0)),
+            added=int(result.get("added", 0)),
+            updated=int(result.get("updated", 0)),
+            deleted=int(result.get("deleted", 0)),
+            skipped=int(result.get("skipped", 0)),
+            commit_sha=result.get("commit_sha"),
+            embed_chunks_per_sec=float(result.get("embed_chunks_per_sec", 0.0)),
+            embed_cache_hits=int(result.get("embed_cache_hits", 0)),
             graph_url=result.get("graph_url"),
             stats=result.get("stats", {}),
         )
@@ -172,35 +227,227 @@ def index_repo(payload: IndexRepoRequest) -> IndexRepoResponse:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
 
+GRAPH_COMMIT_QUERY = Query(None, pattern="^[0-9a-f]{40}$", description="Query the graph version of this commit")
+
+
+def _graph(repo_id: str, commit_sha: str | None) -> CsrGraph:
+    graph = load_graph(repo_id, commit_sha)
+    if graph is None:
+        raise HTTPException(status_code=404, detail="import graph not found; index the repo first")
+    return graph
+
+
+def _graph_node(repo_id: str, path: str, commit_sha: str | None) -> tuple[CsrGraph, int]:
+    graph = _graph(repo_id, commit_sha)
+    node = graph.node_id(path)
+    if node is None:
+        raise HTTPException(status_code=404, detail="path not in import graph")
+    return graph, node
+
+
+@app.get("/graph/{repo_id}/dependencies", response_model=GraphNeighborsResponse)
+def graph_dependencies(repo_id: str, path: str, commit_sha: str | None = GRAPH_COMMIT_QUERY) -> GraphNeighborsResponse:
+    graph, node = _graph_node(repo_id, path, commit_sha)
+    return GraphNeighborsResponse(
+        repo_id=repo_id, path=path, direction="dependencies", paths=graph.neighbors(node, "dependencies")
+    )
+
+
+@app.get("/graph/{repo_id}/dependents", response_model=GraphNeighborsResponse)
+def graph_dependents(repo_id: str, path: str, commit_sha: str | None = GRAPH_COMMIT_QUERY) -> GraphNeighborsResponse:
+    graph, node = _graph_node(repo_id, path, commit_sha)
+    return GraphNeighborsResponse(
+        repo_id=repo_id, path=path, direction="dependents", paths=graph.neighbors(node, "dependents")
+    )
+
+
+@app.get("/graph/{repo_id}/closure", response_model=GraphClosureResponse)
+def graph_closure(
+    repo_id: str,
+    path: str,
+    direction: Literal["dependencies", "dependents"] = "dependencies",
+    max_depth: int = Query(0, ge=0),
+    commit_sha: str | None = GRAPH_COMMIT_QUERY,
+) -> GraphClosureResponse:
+    """Transitive dependencies or dependents of `path`; `max_depth` 0 walks the whole closure."""
+    graph, node = _graph_node(repo_id, path, commit_sha)
+    items = [GraphClosureItem(path=rel, depth=depth) for rel, depth in graph.closure(node, direction, max_depth)]
+    return GraphClosureResponse(repo_id=repo_id, path=path, direction=direction, max_depth=max_depth, items=items)
+
+
+NDJSON_BATCH_LINES = 1000
+
+
+def _stream_edges(artifact: EdgeArtifact, offset: int, limit: int) -> StreamingResponse:
+    """One JSON edge per line, sent in batches; `X-Total-Count` lets clients page with `offset`."""
+
+    def lines() -> Iterator[str]:
+        batch: list[str] = []
+        for edge in artifact.edges(offset, limit):
+            batch.append(json.dumps(edge))
+            if len(batch) >= NDJSON_BATCH_LINES:
+                yield "\n".join(batch) + "\n"
+                batch = []
+        if batch:
+            yield "\n".join(batch) + "\n"
+
+    return StreamingResponse(
+        lines(), media_type="application/x-ndjson", headers={"X-Total-Count": str(len(artifact))}
+    )
+
+
+@app.get("/graph/{repo_id}/edges")
+def graph_edges(
+    repo_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(10_000, ge=1, le=1_000_000),
+    commit_sha: str | None = GRAPH_COMMIT_QUERY,
+) -> StreamingResponse:
+    """Export the import graph's edges, resolved and external, as NDJSON."""
+    artifact = load_edges(graph_path(repo_id, commit_sha).with_name("edges.npz"))
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="import graph not found; index the repo first")
+    return _stream_edges(artifact, offset, limit)
+
+
+@app.get("/graph/{repo_id}/cycles", response_model=GraphCyclesResponse)
+def graph_cycles(repo_id: str, commit_sha: str | None = GRAPH_COMMIT_QUERY) -> GraphCyclesResponse:
+    graph = _graph(repo_id, commit_sha)
+    return GraphCyclesResponse(repo_id=repo_id, cycles=graph.cycles())
+
+
+@app.get("/search/code", response_model=CodeSearchResponse)
+def code_search(
+    repo_id: str,
+    q: str = Query(..., min_length=1, max_length=1000),
+    regex: bool = False,
+    case_sensitive: bool = True,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+) -> CodeSearchResponse:
+    """Grep the repo's indexed code for a literal or regex, one result per matching line."""
+    began = time.perf_counter()
+    try:
+        result = search_code(repo_id, q, regex=regex, case_sensitive=case_sensitive, offset=offset, limit=limit)
+    except CodeSearchError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if result is None:
+        raise HTTPException(status_code=404, detail="code search index not found; index the repo first")
+    return CodeSearchResponse(
+        repo_id=repo_id,
+        query=q,
+        took_ms=round((time.perf_counter() - began) * 1000, 2),
+        **result,
+    )
+
+
+@app.get("/symbols/lookup", response_model=SymbolLookupResponse)
+def symbol_lookup(
+    repo_id: str,
+    name: str = Query(..., min_length=1, max_length=500),
+    kind: Literal["class", "function", "method", "variable"] | None = None,
+    limit: int = Query(20, ge=1, le=500),
+) -> SymbolLookupResponse:
+    """Definitions of a Python symbol by name or qualified name (`Class.method`)."""
+    began = time.perf_counter()
+    definitions = lookup_symbols(repo_id, name, kind, limit)
+    return SymbolLookupResponse(
+        repo_id=repo_id,
+        name=name,
+        definitions=definitions,
+        took_ms=round((time.perf_counter() - began) * 1000, 2),
+    )
+
+
+@app.get("/symbols/references", response_model=SymbolReferencesResponse)
+def symbol_references(
+    repo_id: str,
+    name: str = Query(..., min_length=1, max_length=500),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+) -> SymbolReferencesResponse:
+    """Call sites of a symbol, matched by its last name part, in path and line order."""
+    began = time.perf_counter()
+    references, total = find_references(repo_id, name, offset, limit)
+    next_offset = offset + len(references)
+    return SymbolReferencesResponse(
+        repo_id=repo_id,
+        name=name,
+        references=references,
+        total=total,
+        next_offset=next_offset if next_offset < total else None,
+        took_ms=round((time.perf_counter() - began) * 1000, 2),
+    )
+
+
 @app.post("/analysis/run", response_model=AnalysisRunResponse)
 def run_analysis(payload: AnalysisRunRequest) -> AnalysisRunResponse:
     repo = store.repos.get(payload.repo_id)
     if not repo:
         raise HTTPException(status_code=404, detail="repo_id not found")
+    commit_sha = None
+    if payload.commit_sha != "HEAD":
+        # Historical commits are read from the object database, so no checkout is needed.
+        try:
+            commit_sha = resolve_commit(repo["path"], payload.commit_sha)
+        except GitObjectError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
     analysis_id = f"a_{uuid.uuid4().hex[:8]}"
-    analysis_data = analyze_repository(repo["path"], analysis_id)
+    try:
+        analysis_data = analyze_repository(
+            repo["path"],
+            analysis_id,
+            commit_sha=commit_sha,
+            scoring=payload.scoring,
+            churn_window_days=payload.churn_window_days,
+            repo_id=payload.repo_id,
+        )
+    except ChurnError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
     store.analyses[analysis_id] = {
         "repo_id": payload.repo_id,
-        "commit_sha": repo["commit_sha"] if payload.commit_sha == "HEAD" else payload.commit_sha,
+        "commit_sha": commit_sha or repo["commit_sha"],
         **analysis_data,
     }
     return AnalysisRunResponse(analysis_id=analysis_id, status="completed")
 
 
 @app.get("/analysis/{analysis_id}", response_model=AnalysisResultResponse)
-def get_analysis(analysis_id: str) -> AnalysisResultResponse:
+def get_analysis(
+    analysis_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=0, le=500),
+    sort: Literal["complexity", "loc", "nesting", "params"] = "complexity",
+) -> AnalysisResultResponse:
+    """Analysis result; `offset`/`limit`/`sort` page through the function-level hotspots."""
     item = store.analyses.get(analysis_id)
     if not item:
         raise HTTPException(status_code=404, detail="analysis_id not found")
     hotspots = [Hotspot(**h) for h in item["hotspots"]]
+    functions = item.get("functions")
     return AnalysisResultResponse(
         status=item["status"],
         summary=item["summary"],
         hotspots=hotspots,
         module_graph_url=item["module_graph_url"],
+        function_hotspots=[FunctionHotspot(**row) for row in functions.top(limit, offset, sort)] if functions else [],
+        function_count=len(functions) if functions else 0,
     )
 
 
+@app.get("/analysis/{analysis_id}/edges")
+def get_analysis_edges(
+    analysis_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(10_000, ge=1, le=1_000_000),
+) -> StreamingResponse:
+    """Export an analysis's module dependency edges as NDJSON."""
+    artifact = load_edges(ARTIFACTS_DIR / analysis_id / "edges.npz") if analysis_id in store.analyses else None
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="analysis_id not found")
+    return _stream_edges(artifact, offset, limit)
+
+
 @app.post("/refactors/propose", response_model=RefactorProposalResponse)
 def propose_refactor(payload: RefactorProposalRequest) -> RefactorProposalResponse:
     analysis = store.analyses.get(payload.analysis_id)
@@ -343,26 +590,43 @@ def create_pr(payload: GithubPrRequest) -> GithubPrResponse:
 
 
 @app.post("/chat", response_model=ChatResponse)
-def chat_route(payload: ChatRequest) -> ChatResponse:
-    conversation_id = payload.conversation_id or create_conversation(payload.project_id)
-    add_message(conversation_id, "user", payload.message)
-
-    store_ref = ChromaStore(collection=f"repo:{payload.project_id}")
-    query_vec = embed([payload.message])
-    results = store_ref.query(query_embeddings=query_vec, n_results=4)
-    docs = results.get("documents", [[]])[0]
-    metas = results.get("metadatas", [[]])[0]
-    distances = results.get("distances", [[]])[0]
+async def chat_route(payload: ChatRequest) -> ChatResponse:
+    # Async so the model call does not hold a worker thread; blocking work goes to the pool.
+    conversation_id = payload.conversation_id or await run_in_threadpool(create_conversation, payload.project_id)
+    await run_in_threadpool(add_message, conversation_id, "user", payload.message)
+
+    filters = None
+    if payload.filters is not None:
+        filters = ChunkFilter(
+            language=payload.filters.language,
+            tags=tuple(payload.filters.tags),
+            path_prefix=payload.filters.path_prefix,
+            symbol_kind=payload.filters.symbol_kind,
+        )
+    retrieved = await run_in_threadpool(
+        retrieve,
+        payload.project_id,
+        payload.message,
+        payload.retrieval or CHAT_RETRIEVAL_MODE,
+        n_results=4,
+        filters=filters,
+    )
+    docs = [hit["document"] for hit in retrieved.hits]
 
     sources = []
-    for idx, doc in enumerate(docs):
-        meta = metas[idx] if idx < len(metas) else {}
-        dist = distances[idx] if idx < len(distances) else None
+    for hit in retrieved.hits:
+        meta = hit["metadata"]
+        dist = hit.get("distance")
         sources.append({
             "path": meta.get("path"),
             "chunk": meta.get("chunk"),
+            "start_line": meta.get("start_line"),
+            "end_line": meta.get("end_line"),
+            "symbol": meta.get("symbol") or None,
+            "kind": meta.get("kind") or None,
             "score": None if dist is None else float(dist),
-            "excerpt": doc[:400],
+            "retrievers": hit["retrievers"],
+            "excerpt": hit["document"][:400],
         })
 
     context = "\n\n".join(docs)
@@ -370,9 +634,11 @@ def chat_route(payload: ChatRequest) -> ChatResponse:
         {"role": "system", "content": "You are a local self-hosted codebase agent. Cite sources from context."},
         {"role": "user", "content": f"Context:\n{context}\n\nQuestion: {payload.message}"},
     ]
-    answer = chat(messages)
-    add_message(conversation_id, "assistant", answer)
-    return ChatResponse(conversation_id=conversation_id, answer=answer, sources=sources)
+    began = time.perf_counter()
+    answer = await achat(messages)
+    timings = {**retrieved.timings, "llm_ms": round((time.perf_counter() - began) * 1000, 2)}
+    await run_in_threadpool(add_message, conversation_id, "assistant", answer)
+    return ChatResponse(conversation_id=conversation_id, answer=answer, sources=sources, timings=timings)
 
 
 @app.get("/chat/conversations", response_model=ConversationListResponse)
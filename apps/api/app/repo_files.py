@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import os
+import stat
+import subprocess
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .config import REPO_FILE_MAX_BYTES, REPO_WALK_MODE
+from .git_objects import TreeEntry, list_tree
+
+CODE_EXTENSIONS = frozenset({".py", ".ts", ".tsx", ".js", ".jsx", ".go", ".rs", ".java"})
+IGNORE_DIRS = frozenset({".git", "node_modules", ".next", ".venv", "venv", "__pycache__"})
+GENERATED_SUFFIXES = (
+    ".min.js",
+    ".bundle.js",
+    ".generated.ts",
+    ".generated.js",
+    ".pb.go",
+    "_pb2.py",
+    "_pb2_grpc.py",
+)
+GENERATED_MARKERS = (b"@generated", b"Code generated", b"DO NOT EDIT")
+
+_SNIFF_BYTES = 8192
+_CACHE_SIZE = 16
+_cache: OrderedDict[tuple, _Listing] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class RepoFile:
+    path: Path
+    rel: str
+    size: int
+    mtime_ns: int
+
+    @property
+    def suffix(self) -> str:
+        return self.path.suffix
+
+
+@dataclass
+class _Listing:
+    """The tracked code paths of one commit and index, with the skip verdict of each file
+    sniffed so far, keyed by the (size, mtime_ns) it had when sniffed."""
+
+    tracked: list[str]
+    verdicts: dict[str, tuple[int, int, bool]] = field(default_factory=dict)
+
+
+def _git(args: list[str], cwd: Path) -> bytes | None:
+    proc = subprocess.run(["git", *args], cwd=str(cwd), capture_output=True, check=False)
+    if proc.returncode != 0:
+        return None
+    return proc.stdout
+
+
+def _git_paths(root: Path, *selection: str) -> list[str] | None:
+    """Code paths `git ls-files` reports for `selection` (e.g. "--cached", "--others")."""
+    out = _git(["ls-files", "-z", *selection, "--exclude-standard"], root)
+    if out is None:
+        return None
+    paths: list[str] = []
+    for raw in dict.fromkeys(out.split(b"\0")):
+        if not raw:
+            continue
+        rel = os.fsdecode(raw)
+        parts = rel.split("/")
+        if os.path.splitext(parts[-1])[1] in CODE_EXTENSIONS and not IGNORE_DIRS.intersection(parts[:-1]):
+            paths.append(rel)
+    return paths
+
+
+def _stat_paths(root: Path, paths: Iterable[str]) -> Iterator[tuple[str, os.stat_result]]:
+    for rel in paths:
+        try:
+            yield rel, os.stat(root / rel)
+        except OSError:
+            continue
+
+
+def _walk_paths(root: Path) -> Iterator[tuple[str, os.stat_result]]:
+    stack = [("", str(root))]
+    while stack:
+        prefix, directory = stack.pop()
+        try:
+            scan = os.scandir(directory)
+        except OSError:
+            continue
+        with scan:
+            for entry in scan:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in IGNORE_DIRS:
+                        stack.append((f"{prefix}{entry.name}/", entry.path))
+                elif os.path.splitext(entry.name)[1] in CODE_EXTENSIONS:
+                    try:
+                        yield f"{prefix}{entry.name}", entry.stat()
+                    except OSError:
+                        continue
+
+
+def _is_skippable(path: Path, size: int, max_bytes: int) -> bool:
+    """Skip oversized, binary, minified and generated files."""
+    if size > max_bytes or path.name.endswith(GENERATED_SUFFIXES):
+        return True
+    try:
+        with path.open("rb") as handle:
+            sample = handle.read(_SNIFF_BYTES)
+    except OSError:
+        return True
+    if b"\0" in sample:
+        return True
+    # Minified bundles average hundreds of characters per line.
+    if len(sample) >= 2048 and sample.count(b"\n") * 500 < len(sample):
+        return True
+    return any(marker in sample[:1024] for marker in GENERATED_MARKERS)
+
+
+def _listing_key(root: Path, mode: str, max_bytes: int) -> tuple | None:
+    head = _git(["rev-parse", "HEAD"], root)
+    if head is None:
+        return None
+    index = root / ".git" / "index"
+    index_mtime = index.stat().st_mtime_ns if index.exists() else 0
+    return (str(root), head.strip(), index_mtime, mode, max_bytes)
+
+
+def _tracked_listing(root: Path, mode: str, max_bytes: int) -> _Listing | None:
+    key = _listing_key(root, mode, max_bytes)
+    if key is None:
+        return None
+    with _cache_lock:
+        listing = _cache.get(key)
+        if listing is not None:
+            _cache.move_to_end(key)
+            return listing
+    tracked = _git_paths(root, "--cached")
+    if tracked is None:
+        return None
+    with _cache_lock:
+        listing = _cache.setdefault(key, _Listing(tracked))
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return listing
+
+
+def _list_files(root: Path, mode: str, max_bytes: int) -> list[RepoFile]:
+    listing = _tracked_listing(root, mode, max_bytes) if mode in {"auto", "git"} else None
+    paths: list[str] | None = None
+    if listing is not None:
+        # Untracked files are not part of the cache key, so they are listed on every call.
+        paths = [*listing.tracked, *(_git_paths(root, "--others") or [])]
+    elif mode in {"auto", "git"}:
+        paths = _git_paths(root, "--cached", "--others")
+    entries = _stat_paths(root, dict.fromkeys(paths)) if paths is not None else _walk_paths(root)
+    verdicts = listing.verdicts if listing is not None else {}
+
+    files: list[RepoFile] = []
+    for rel, info in entries:
+        if not stat.S_ISREG(info.st_mode):
+            continue
+        path = root / rel
+        seen = verdicts.get(rel)
+        if seen is not None and seen[:2] == (info.st_size, info.st_mtime_ns):
+            skip = seen[2]
+        else:
+            skip = _is_skippable(path, info.st_size, max_bytes)
+            if listing is not None:
+                verdicts[rel] = (info.st_size, info.st_mtime_ns, skip)
+        if not skip:
+            files.append(RepoFile(path=path, rel=rel, size=info.st_size, mtime_ns=info.st_mtime_ns))
+    files.sort(key=lambda item: item.rel)
+    return files
+
+
+def list_repo_files(
+    repo_path: str | Path,
+    extensions: Iterable[str] | None = None,
+    mode: str | None = None,
+    max_bytes: int | None = None,
+) -> list[RepoFile]:
+    """List the repo's code files sorted by relative path.
+
+    `mode` is "git" (`git ls-files`, honours .gitignore), "scandir" (walk that prunes
+    ignored directories) or "auto" (git when available). In git checkouts the tracked
+    paths are cached per commit and index, and a file is only re-sniffed when its size or
+    mtime changes, so the analyzer, indexer and graph builder mostly pay for one `stat`
+    per file. Untracked files are listed on every call.
+    """
+    root = Path(repo_path).resolve()
+    mode = mode or REPO_WALK_MODE
+    max_bytes = REPO_FILE_MAX_BYTES if max_bytes is None else max_bytes
+    files = _list_files(root, mode, max_bytes)
+    if extensions is None:
+        return files
+    wanted = set(extensions)
+    return [item for item in files if item.suffix in wanted]
+
+
+def list_commit_files(
+    repo_path: str | Path,
+    commit_sha: str,
+    extensions: Iterable[str] | None = None,
+    max_bytes: int | None = None,
+) -> list[TreeEntry]:
+    """List a commit's code files from the object database, sorted by relative path.
+
+    Applies the same extension, directory, size and file-name filters as
+    `list_repo_files`; contents are not sniffed, since that would read every blob.
+    """
+    max_bytes = REPO_FILE_MAX_BYTES if max_bytes is None else max_bytes
+    wanted = set(extensions) if extensions is not None else CODE_EXTENSIONS
+    entries: list[TreeEntry] = []
+    for entry in list_tree(repo_path, commit_sha):
+        parts = entry.rel.split("/")
+        if os.path.splitext(parts[-1])[1] not in wanted or IGNORE_DIRS.intersection(parts[:-1]):
+            continue
+        if entry.size > max_bytes or parts[-1].endswith(GENERATED_SUFFIXES):
+            continue
+        entries.append(entry)
+    return entries
@@ -4,7 +4,7 @@ import hashlib
 import subprocess
 from pathlib import Path
 
-from .config import BASE_DIR, REPOS_DIR
+from .config import BASE_DIR, INGEST_HISTORY_DEPTH, REPOS_DIR
 
 
 class RepoIngestError(RuntimeError):
@@ -45,12 +45,24 @@ def install_post_commit_hook(repo_path: str, repo_id: str) -> None:
     hook_path.write_text(hook, encoding="utf-8")
 
 
-def ingest_repository(repo_url: str, branch: str) -> dict[str, str]:
+def _fetch_depth_args(repo_dir: Path, depth: int) -> list[str]:
+    if depth > 0:
+        # --depth on an existing clone deepens (or trims) its history to `depth` commits.
+        return ["--depth", str(depth)]
+    shallow = _run_git(["rev-parse", "--is-shallow-repository"], cwd=repo_dir) == "true"
+    return ["--unshallow"] if shallow else []
+
+
+def ingest_repository(repo_url: str, branch: str, depth: int | None = None) -> dict[str, str]:
+    """Clone or refresh `branch`. `depth` commits of history are kept (0 = full history,
+    unshallowing an existing shallow clone); churn scoring needs more than the default 1."""
+    depth = INGEST_HISTORY_DEPTH if depth is None else depth
     repo_dir = REPOS_DIR / _repo_dir_name(repo_url)
     if not repo_dir.exists():
-        _run_git(["clone", "--depth", "1", "--branch", branch, repo_url, str(repo_dir)])
+        depth_args = ["--depth", str(depth)] if depth > 0 else []
+        _run_git(["clone", *depth_args, "--branch", branch, repo_url, str(repo_dir)])
     else:
-        _run_git(["fetch", "origin", branch, "--depth", "1"], cwd=repo_dir)
+        _run_git(["fetch", "origin", branch, *_fetch_depth_args(repo_dir, depth)], cwd=repo_dir)
         _run_git(["checkout", branch], cwd=repo_dir)
         _run_git(["reset", "--hard", f"origin/{branch}"], cwd=repo_dir)
 
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any
+
+from .config import RETRIEVAL_CANDIDATES, RETRIEVAL_RRF_K, RETRIEVAL_SYMBOL_LIMIT
+from .indexer.chunk_filters import ChunkFilter, chunk_metadata
+from .indexer.code_search import read_indexed_file
+from .indexer.lexical_index import search_lexical
+from .llm.ollama_client import embed
+from .symbol_index import SymbolIndex
+from .vector_store.stores import get_store
+
+RETRIEVAL_MODES = ("vector", "lexical", "hybrid")
+
+# Lexical, vector and symbol searches of one request run side by side on this pool.
+_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="retrieval")
+
+_IDENTIFIER = re.compile(r"(`?)([A-Za-z_][\w.]*\w)(`?)(\s*\()?")
+_CAMEL_CASE = re.compile(r"[a-z][A-Z]")
+# Definitions longer than this are cut; the head of a class or function carries its signature.
+_SYMBOL_MAX_LINES = 80
+
+
+@dataclass
+class Retrieved:
+    hits: list[dict[str, Any]] = field(default_factory=list)
+    timings: dict[str, float] = field(default_factory=dict)
+
+
+def _elapsed_ms(began: float) -> float:
+    return round((time.perf_counter() - began) * 1000, 2)
+
+
+def _vector_search(repo_id: str, question: str, limit: int, where: dict[str, Any]) -> Retrieved:
+    began = time.perf_counter()
+    query_vec = embed([question])
+    timings = {"embed_ms": _elapsed_ms(began)}
+    began = time.perf_counter()
+    results = get_store(f"repo:{repo_id}").query(query_embeddings=query_vec, n_results=limit, where=where or None)
+    timings["vector_ms"] = _elapsed_ms(began)
+    ids = results.get("ids", [[]])[0]
+    docs = results.get("documents", [[]])[0]
+    metas = results.get("metadatas", [[]])[0]
+    distances = results.get("distances", [[]])[0]
+    hits = [
+        {
+            "id": ids[idx] if idx < len(ids) else str(idx),
+            "document": doc,
+            "metadata": (metas[idx] if idx < len(metas) else None) or {},
+            "distance": distances[idx] if idx < len(distances) else None,
+        }
+        for idx, doc in enumerate(docs)
+    ]
+    return Retrieved(hits, timings)
+
+
+def _lexical_search(repo_id: str, question: str, limit: int, where: dict[str, Any]) -> Retrieved:
+    began = time.perf_counter()
+    hits = search_lexical(repo_id, question, limit, where=where or None)
+    return Retrieved(hits, {"lexical_ms": _elapsed_ms(began)})
+
+
+def code_identifiers(question: str) -> list[str]:
+    """Names in `question` that look like code rather than prose: backticked, called with `(`,
+    dotted, snake_case or camelCase."""
+    names: list[str] = []
+    for match in _IDENTIFIER.finditer(question):
+        opened, name, closed, call = match.groups()
+        if (opened and closed) or call or "_" in name or "." in name or _CAMEL_CASE.search(name):
+            if name not in names:
+                names.append(name)
+    return names
+
+
+def _symbol_search(repo_id: str, names: list[str], limit: int, filters: ChunkFilter | None) -> Retrieved:
+    """Exact definitions of the code names in the question, with their source from the
+    code-search index; definitions whose file is not indexed or outside `filters` are skipped."""
+    began = time.perf_counter()
+    index = SymbolIndex(repo_id)
+    try:
+        definitions = [row for name in names for row in index.lookup(name, limit=limit)]
+    finally:
+        index.close()
+    hits: list[dict[str, Any]] = []
+    for row in definitions:
+        if filters is not None and not filters.matches(chunk_metadata(row["path"], row["kind"])):
+            continue
+        text = read_indexed_file(repo_id, row["path"])
+        if text is None:
+            continue
+        end_line = min(row["end_line"], row["line"] + _SYMBOL_MAX_LINES - 1)
+        hits.append({
+            "id": f"symbol:{row['path']}:{row['line']}",
+            "document": "\n".join(text.splitlines()[row["line"] - 1 : end_line]),
+            "metadata": {
+                "path": row["path"],
+                "start_line": row["line"],
+                "end_line": end_line,
+                "symbol": row["qualname"],
+                "kind": row["kind"],
+            },
+            "retrievers": ["symbols"],
+        })
+        if len(hits) >= limit:
+            break
+    return Retrieved(hits, {"symbols_ms": _elapsed_ms(began)})
+
+
+def reciprocal_rank_fusion(rankings: dict[str, list[dict[str, Any]]], k: int = RETRIEVAL_RRF_K) -> list[dict[str, Any]]:
+    """Merge ranked hit lists by id; each list adds 1 / (k + rank) to a hit's score.
+
+    The merged hits keep the first list's fields, record which retrievers found them, and
+    come best first.
+    """
+    fused: dict[str, dict[str, Any]] = {}
+    for retriever, hits in rankings.items():
+        for rank, hit in enumerate(hits, start=1):
+            merged = fused.setdefault(hit["id"], {**hit, "retrievers": [], "rrf_score": 0.0})
+            merged["retrievers"].append(retriever)
+            merged["rrf_score"] += 1.0 / (k + rank)
+            if retriever == "lexical":
+                merged["lexical_score"] = hit.get("score")
+            elif retriever == "vector":
+                merged["distance"] = hit.get("distance")
+    return sorted(fused.values(), key=lambda hit: -hit["rrf_score"])
+
+
+def retrieve(
+    repo_id: str,
+    question: str,
+    mode: str = "hybrid",
+    n_results: int = 4,
+    filters: ChunkFilter | None = None,
+) -> Retrieved:
+    """Top `n_results` chunks for `question`, with per-stage latencies in milliseconds.
+
+    `hybrid` runs the vector and lexical searches concurrently, takes `RETRIEVAL_CANDIDATES`
+    from each and fuses them with reciprocal-rank fusion. In `hybrid` and `lexical` mode, code
+    names in the question (`parse_config`, `Store.get`) are also looked up in the symbol table
+    alongside, and up to `RETRIEVAL_SYMBOL_LIMIT` exact definitions go ahead of the fused hits.
+
+    `filters` is applied inside each store, so every retriever ranks only matching chunks.
+    """
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"unknown retrieval mode {mode!r}")
+    began = time.perf_counter()
+    depth = max(n_results, RETRIEVAL_CANDIDATES) if mode == "hybrid" else n_results
+    where = filters.conditions() if filters is not None else {}
+    searches = {
+        retriever: _pool.submit(search, repo_id, question, depth, where)
+        for retriever, search in (("vector", _vector_search), ("lexical", _lexical_search))
+        if mode in (retriever, "hybrid")
+    }
+    names = code_identifiers(question) if mode != "vector" and RETRIEVAL_SYMBOL_LIMIT > 0 else []
+    symbols = _pool.submit(_symbol_search, repo_id, names, RETRIEVAL_SYMBOL_LIMIT, filters) if names else None
+    results = {retriever: future.result() for retriever, future in searches.items()}
+    timings: dict[str, float] = {}
+    for result in results.values():
+        timings.update(result.timings)
+    definitions = symbols.result() if symbols else Retrieved()
+    timings.update(definitions.timings)
+
+    fusion_began = time.perf_counter()
+    hits = reciprocal_rank_fusion({retriever: result.hits for retriever, result in results.items()})[:n_results]
+    # A chunk that is just the found definition again would repeat it in the prompt.
+    covered = {(hit["metadata"]["path"], hit["metadata"]["start_line"]) for hit in definitions.hits}
+    hits = [*definitions.hits, *(hit for hit in hits if (hit["metadata"].get("path"), hit["metadata"].get("start_line")) not in covered)]
+    timings["fusion_ms"] = _elapsed_ms(fusion_began)
+    timings["retrieval_ms"] = _elapsed_ms(began)
+    return Retrieved(hits, timings)
@@ -7,6 +7,8 @@ from pydantic import BaseModel, Field
 class RepoImportRequest(BaseModel):
     repo_url: str
     branch: str = "main"
+    # Commits of history to fetch; 0 = full history. Defaults to INGEST_HISTORY_DEPTH.
+    history_depth: int | None = Field(default=None, ge=0)
 
 
 class RepoImportResponse(BaseModel):
@@ -27,6 +29,8 @@ class RepoInfoResponse(BaseModel):
 class AnalysisRunRequest(BaseModel):
     repo_id: str
     commit_sha: str = "HEAD"
+    scoring: Literal["complexity", "churn"] = "complexity"
+    churn_window_days: int | None = Field(default=None, ge=0)
 
 
 class AnalysisRunResponse(BaseModel):
@@ -39,11 +43,23 @@ class Hotspot(BaseModel):
     reason: str
 
 
+class FunctionHotspot(BaseModel):
+    file: str
+    name: str
+    line: int
+    complexity: int
+    loc: int
+    nesting: int
+    params: int
+
+
 class AnalysisResultResponse(BaseModel):
     status: Literal["queued", "running", "completed", "failed"]
     summary: str
     hotspots: list[Hotspot] = Field(default_factory=list)
     module_graph_url: str
+    function_hotspots: list[FunctionHotspot] = Field(default_factory=list)
+    function_count: int = 0
 
 
 class RefactorProposalRequest(BaseModel):
@@ -89,25 +105,131 @@ class GithubPrResponse(BaseModel):
 
 class IndexRepoRequest(BaseModel):
     repo_id: str
+    incremental: bool = True
 
 
 class IndexRepoResponse(BaseModel):
     status: Literal["completed", "failed"]
     chunks: int = 0
+    added: int = 0
+    updated: int = 0
+    deleted: int = 0
+    skipped: int = 0
+    commit_sha: str | None = None
+    embed_chunks_per_sec: float = 0.0
+    embed_cache_hits: int = 0
     graph_url: str | None = None
     stats: dict[str, Any] = Field(default_factory=dict)
 
 
+class GraphNeighborsResponse(BaseModel):
+    repo_id: str
+    path: str
+    direction: Literal["dependencies", "dependents"]
+    paths: list[str] = Field(default_factory=list)
+
+
+class GraphClosureItem(BaseModel):
+    path: str
+    depth: int
+
+
+class GraphClosureResponse(BaseModel):
+    repo_id: str
+    path: str
+    direction: Literal["dependencies", "dependents"]
+    max_depth: int
+    items: list[GraphClosureItem] = Field(default_factory=list)
+
+
+class GraphCyclesResponse(BaseModel):
+    repo_id: str
+    cycles: list[list[str]] = Field(default_factory=list)
+
+
+class CodeSearchMatch(BaseModel):
+    path: str
+    line: int
+    column: int
+    text: str
+
+
+class CodeSearchResponse(BaseModel):
+    repo_id: str
+    query: str
+    commit_sha: str | None = None
+    matches: list[CodeSearchMatch] = Field(default_factory=list)
+    # Offset of the next page, or None when this page holds the last match.
+    next_offset: int | None = None
+    candidate_files: int = 0
+    scanned_files: int = 0
+    # True when the scan stopped at CODE_SEARCH_MAX_SCAN_BYTES before finding the page.
+    truncated: bool = False
+    took_ms: float = 0.0
+
+
+class SymbolDefinition(BaseModel):
+    path: str
+    name: str
+    qualname: str
+    kind: Literal["class", "function", "method", "variable"]
+    line: int
+    end_line: int
+    scope: str = ""
+
+
+class SymbolLookupResponse(BaseModel):
+    repo_id: str
+    name: str
+    definitions: list[SymbolDefinition] = Field(default_factory=list)
+    took_ms: float = 0.0
+
+
+class SymbolReference(BaseModel):
+    path: str
+    name: str
+    line: int
+    column: int
+    scope: str = ""
+
+
+class SymbolReferencesResponse(BaseModel):
+    repo_id: str
+    name: str
+    references: list[SymbolReference] = Field(default_factory=list)
+    total: int = 0
+    next_offset: int | None = None
+    took_ms: float = 0.0
+
+
+class ChatFilters(BaseModel):
+    # Language of the file, as in the import graph ("python", "typescript", "go", ...).
+    language: str | None = None
+    # Path tags, as in the import graph; a chunk must carry all of them.
+    tags: list[Literal["test", "api", "service", "controller", "data"]] = Field(default_factory=list)
+    # Directory the file is under, e.g. "services/billing".
+    path_prefix: str | None = None
+    # Kind shared by every symbol in the chunk; "variable" covers module and class attributes
+    # (Python assignments, JS/TS variable and field declarations).
+    symbol_kind: Literal["class", "function", "method", "variable"] | None = None
+
+
 class ChatRequest(BaseModel):
     project_id: str
     message: str
     conversation_id: int | None = None
+    # Chunk retrieval: dense vectors, BM25 over the lexical index, or both fused. Defaults to CHAT_RETRIEVAL_MODE.
+    retrieval: Literal["vector", "lexical", "hybrid"] | None = None
+    # Restricts every retriever to matching chunks; applied inside the stores.
+    filters: ChatFilters | None = None
 
 
 class ChatResponse(BaseModel):
     conversation_id: int
     answer: str
     sources: list[dict[str, Any]] = Field(default_factory=list)
+    # Per-stage latency in milliseconds (embed, vector, lexical, symbols, fusion, retrieval, llm).
+    timings: dict[str, float] = Field(default_factory=dict)
 
 
 class ConversationInfo(BaseModel):
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import sqlite3
+from collections.abc import Iterable
+from typing import Any
+
+from .config import SYMBOL_DB_PATH
+
+SYMBOL_KINDS = ("class", "function", "method", "variable")
+# Part of every stored file stamp: bump it when extraction changes, so the next run rewrites
+# the rows of files whose blobs did not change.
+SYMBOL_INDEX_VERSION = "2"
+
+# (name, qualified name, kind, line, end line, enclosing scope) of one definition.
+SymbolRow = tuple[str, str, str, int, int, str]
+# (called name, line, column, enclosing scope) of one call site.
+ReferenceRow = tuple[str, int, int, str]
+
+
+def _connect() -> sqlite3.Connection:
+    SYMBOL_DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(SYMBOL_DB_PATH, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS symbol_files (
+            repo TEXT NOT NULL,
+            path TEXT NOT NULL,
+            blob_sha TEXT,
+            PRIMARY KEY (repo, path)
+        );
+        CREATE TABLE IF NOT EXISTS symbols (
+            repo TEXT NOT NULL,
+            path TEXT NOT NULL,
+            name TEXT NOT NULL,
+            qualname TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            line INTEGER NOT NULL,
+            end_line INTEGER NOT NULL,
+            scope TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS symbols_by_name ON symbols (repo, name);
+        CREATE INDEX IF NOT EXISTS symbols_by_qualname ON symbols (repo, qualname);
+        CREATE INDEX IF NOT EXISTS symbols_by_path ON symbols (repo, path);
+        CREATE TABLE IF NOT EXISTS symbol_refs (
+            repo TEXT NOT NULL,
+            path TEXT NOT NULL,
+            name TEXT NOT NULL,
+            line INTEGER NOT NULL,
+            col INTEGER NOT NULL,
+            scope TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS symbol_refs_by_name ON symbol_refs (repo, name, path, line);
+        CREATE INDEX IF NOT EXISTS symbol_refs_by_path ON symbol_refs (repo, path);
+        """
+    )
+    return conn
+
+
+class SymbolIndex:
+    """Definitions and call sites of one repo's Python files, as the analyzer last saw them.
+
+    Rows are replaced per file and skipped when the file's blob SHA is unchanged, so
+    re-running analysis or indexing on a mostly unchanged tree writes almost nothing.
+    References are by called name (`obj.save()` is a reference to `save`), not type-resolved.
+    """
+
+    def __init__(self, repo_id: str) -> None:
+        self.repo_id = repo_id
+        self._conn = _connect()
+        self._blobs: dict[str, str | None] | None = None
+
+    def _file_blobs(self) -> dict[str, str | None]:
+        if self._blobs is None:
+            rows = self._conn.execute("SELECT path, blob_sha FROM symbol_files WHERE repo=?", (self.repo_id,))
+            self._blobs = {row["path"]: row["blob_sha"] for row in rows}
+        return self._blobs
+
+    def remove_files(self, paths: Iterable[str]) -> None:
+        blobs = self._file_blobs()
+        rows = [(self.repo_id, path) for path in paths]
+        for table in ("symbol_files", "symbols", "symbol_refs"):
+            self._conn.executemany(f"DELETE FROM {table} WHERE repo=? AND path=?", rows)
+        for _, path in rows:
+            blobs.pop(path, None)
+
+    def retain(self, paths: set[str]) -> None:
+        """Drop every file not in `paths`, after a run that saw the whole tree."""
+        self.remove_files([path for path in self._file_blobs() if path not in paths])
+
+    def replace_file(
+        self,
+        path: str,
+        blob_sha: str | None,
+        symbols: list[SymbolRow],
+        references: list[ReferenceRow],
+    ) -> None:
+        blobs = self._file_blobs()
+        stamp = f"{SYMBOL_INDEX_VERSION}:{blob_sha}" if blob_sha is not None else None
+        if stamp is not None and path in blobs and blobs[path] == stamp:
+            return
+        self.remove_files([path])
+        self._conn.execute(
+            "INSERT INTO symbol_files (repo, path, blob_sha) VALUES (?, ?, ?)",
+            (self.repo_id, path, stamp),
+        )
+        self._conn.executemany(
+            "INSERT INTO symbols (repo, path, name, qualname, kind, line, end_line, scope) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(self.repo_id, path, *row) for row in symbols],
+        )
+        self._conn.executemany(
+            "INSERT INTO symbol_refs (repo, path, name, line, col, scope) VALUES (?, ?, ?, ?, ?, ?)",
+            [(self.repo_id, path, *row) for row in references],
+        )
+        blobs[path] = stamp
+
+    def lookup(self, name: str, kind: str | None = None, limit: int = 20) -> list[dict[str, Any]]:
+        """Definitions whose name or qualified name (`Class.method`) is exactly `name`."""
+        # Sorting outside the union keeps SQLite on the name indexes; sorted in place, it
+        # walks the repo's whole (repo, path) index to avoid a sort.
+        sql = (
+            "SELECT * FROM ("
+            "SELECT path, name, qualname, kind, line, end_line, scope FROM symbols "
+            "WHERE repo=? AND name=? {kind} UNION "
+            "SELECT path, name, qualname, kind, line, end_line, scope FROM symbols "
+            "WHERE repo=? AND qualname=? {kind}) ORDER BY path, line LIMIT ?"
+        ).format(kind="AND kind=?" if kind else "")
+        params = (self.repo_id, name, kind) if kind else (self.repo_id, name)
+        return [dict(row) for row in self._conn.execute(sql, (*params, *params, limit))]
+
+    def references(self, name: str, offset: int = 0, limit: int = 100) -> tuple[list[dict[str, Any]], int]:
+        """Call sites of `name` (the last part of a qualified name) in path and line order,
+        with the total count."""
+        called = name.rsplit(".", 1)[-1]
+        total = self._conn.execute(
+            "SELECT COUNT(*) FROM symbol_refs WHERE repo=? AND name=?", (self.repo_id, called)
+        ).fetchone()[0]
+        rows = self._conn.execute(
+            "SELECT path, name, line, col AS column, scope FROM symbol_refs WHERE repo=? AND name=? "
+            "ORDER BY path, line, col LIMIT ? OFFSET ?",
+            (self.repo_id, called, limit, offset),
+        )
+        return [dict(row) for row in rows], int(total)
+
+    def commit(self) -> None:
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def lookup_symbols(repo_id: str, name: str, kind: str | None = None, limit: int = 20) -> list[dict[str, Any]]:
+    index = SymbolIndex(repo_id)
+    try:
+        return index.lookup(name, kind, limit)
+    finally:
+        index.close()
+
+
+def find_references(repo_id: str, name: str, offset: int = 0, limit: int = 100) -> tuple[list[dict[str, Any]], int]:
+    index = SymbolIndex(repo_id)
+    try:
+        return index.references(name, offset, limit)
+    finally:
+        index.close()
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import bisect
+import re
+import subprocess
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+from .analysis_cache import git_blob_sha
+from .config import ANALYSIS_TREE_CACHE_FILES
+
+# Below this size a full parse is as cheap as diffing, so such trees are not kept.
+REPARSE_MIN_BYTES = 16 * 1024
+
+_HUNK_HEADER = re.compile(rb"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@", re.MULTILINE)
+
+
+@dataclass
+class _ParsedFile:
+    blob_sha: str
+    source: bytes
+    tree: object
+
+
+# Hunks as (old_start, old_count, new_start, new_count), 0-based line numbers.
+Hunk = tuple[int, int, int, int]
+
+
+def _line_offsets(source: bytes) -> list[int]:
+    offsets = [0]
+    start = source.find(b"\n")
+    while start != -1:
+        offsets.append(start + 1)
+        start = source.find(b"\n", start + 1)
+    return offsets
+
+
+def _line_byte(offsets: list[int], source: bytes, line: int) -> int:
+    return offsets[line] if line < len(offsets) else len(source)
+
+
+def _point(offsets: list[int], byte: int) -> tuple[int, int]:
+    row = bisect.bisect_right(offsets, byte) - 1
+    return row, byte - offsets[row]
+
+
+def git_hunks(repo_path: str | Path, old_sha: str, new_sha: str) -> list[Hunk] | None:
+    """Line hunks between two blobs, or None when either is missing from the object database."""
+    proc = subprocess.run(
+        ["git", "diff", "-U0", "--no-color", "--no-ext-diff", old_sha, new_sha],
+        cwd=str(repo_path),
+        capture_output=True,
+        check=False,
+    )
+    if proc.returncode != 0:
+        return None
+    hunks: list[Hunk] = []
+    for match in _HUNK_HEADER.finditer(proc.stdout):
+        old_start, old_count, new_start, new_count = (
+            int(value) if value is not None else 1 for value in match.groups()
+        )
+        # A zero count names the line *after which* lines were added or removed.
+        hunks.append(
+            (
+                old_start if old_count == 0 else old_start - 1,
+                old_count,
+                new_start if new_count == 0 else new_start - 1,
+                new_count,
+            )
+        )
+    return hunks
+
+
+def span_hunk(old: bytes, new: bytes) -> list[Hunk]:
+    """One hunk covering everything between the common leading and trailing lines."""
+    old_lines = old.split(b"\n")
+    new_lines = new.split(b"\n")
+    prefix = 0
+    limit = min(len(old_lines), len(new_lines))
+    while prefix < limit and old_lines[prefix] == new_lines[prefix]:
+        prefix += 1
+    suffix = 0
+    while (
+        suffix < limit - prefix
+        and old_lines[len(old_lines) - 1 - suffix] == new_lines[len(new_lines) - 1 - suffix]
+    ):
+        suffix += 1
+    return [(prefix, len(old_lines) - prefix - suffix, prefix, len(new_lines) - prefix - suffix)]
+
+
+def apply_hunks(tree, old: bytes, new: bytes, hunks: list[Hunk]) -> None:
+    """Record each hunk as a tree-sitter edit.
+
+    Hunks are applied bottom-up, so the positions before each one are still those of the
+    old source and only the end of the replaced region has to be translated.
+    """
+    old_offsets = _line_offsets(old)
+    new_offsets = _line_offsets(new)
+    for old_start, old_count, new_start, new_count in reversed(hunks):
+        start_byte = _line_byte(old_offsets, old, old_start)
+        old_end_byte = _line_byte(old_offsets, old, old_start + old_count)
+        new_end = _line_byte(new_offsets, new, new_start + new_count)
+        new_end_byte = start_byte + new_end - _line_byte(new_offsets, new, new_start)
+        start_point = _point(old_offsets, start_byte)
+        new_end_row, new_end_column = _point(new_offsets, new_end)
+        tree.edit(
+            start_byte=start_byte,
+            old_end_byte=old_end_byte,
+            new_end_byte=new_end_byte,
+            start_point=start_point,
+            old_end_point=_point(old_offsets, old_end_byte),
+            new_end_point=(new_end_row - new_start + old_start, new_end_column),
+        )
+
+
+def _copy_tree(parser, tree, source: bytes):
+    copy = getattr(tree, "copy", None) or getattr(tree, "__copy__", None)
+    if copy is not None:
+        return copy()
+    # Bindings without Tree.copy (py-tree-sitter 0.23): reparsing against an unedited tree
+    # reuses every node and yields an independent tree, at about a tenth of a full parse.
+    return parser.parse(source, tree)
+
+
+class ParseCache:
+    """Keeps the syntax trees of recently parsed large files so a new revision of one can be
+    parsed incrementally: the old tree is edited with the diff hunks and tree-sitter only
+    re-parses the regions the edits touched.
+
+    The cache holds its own copy of each tree, since editing a tree mutates it in place;
+    trees handed to callers are never edited afterwards.
+    """
+
+    def __init__(self, max_files: int) -> None:
+        self.max_files = max_files
+        self.full_parses = 0
+        self.incremental_parses = 0
+        self._lock = threading.Lock()
+        self._files: OrderedDict[tuple[str, str], _ParsedFile] = OrderedDict()
+
+    def parse(self, parser, source: bytes, repo_path: str | Path, rel: str):
+        if self.max_files <= 0 or len(source) < REPARSE_MIN_BYTES:
+            return parser.parse(source)
+        key = (str(repo_path), rel)
+        blob_sha = git_blob_sha(source)
+        # Popped while in use, so two threads never edit the same tree at once.
+        with self._lock:
+            previous = self._files.pop(key, None)
+        if previous is not None and previous.blob_sha == blob_sha:
+            cached = previous
+            tree = _copy_tree(parser, previous.tree, source)
+        else:
+            if previous is not None:
+                hunks = git_hunks(repo_path, previous.blob_sha, blob_sha)
+                if hunks is None:
+                    hunks = span_hunk(previous.source, source)
+                apply_hunks(previous.tree, previous.source, source, hunks)
+                tree = parser.parse(source, previous.tree)
+                self.incremental_parses += 1
+            else:
+                tree = parser.parse(source)
+                self.full_parses += 1
+            cached = _ParsedFile(blob_sha, source, _copy_tree(parser, tree, source))
+        with self._lock:
+            self._files[key] = cached
+            while len(self._files) > self.max_files:
+                self._files.popitem(last=False)
+        return tree
+
+
+_parse_cache = ParseCache(ANALYSIS_TREE_CACHE_FILES)
+
+
+def get_parse_cache() -> ParseCache:
+    return _parse_cache
@@ -1,27 +1,115 @@
 from __future__ import annotations
 
+import re
+import threading
 from dataclasses import dataclass
 from typing import Any
 
 from chromadb import PersistentClient
+from chromadb.api.client import SharedSystemClient
 
-from ..config import VECTOR_STORE_DIR
+from ..config import CHROMA_WARMUP_COLLECTIONS, VECTOR_STORE_DIR
+
+# Process-wide handles: opening a PersistentClient reloads SQLite and the HNSW segments,
+# so one client per directory and one handle per collection are reused by every request.
+_clients: dict[str, Any] = {}
+_collections: dict[tuple[str, str], Any] = {}
+_registry_lock = threading.Lock()
+
+
+def collection_name(name: str) -> str:
+  """Map a logical name such as `repo:<id>` onto Chroma's allowed charset ([A-Za-z0-9._-], 3-63 chars)."""
+  safe = re.sub(r"[^A-Za-z0-9._-]+", "-", name).strip("-._")
+  return safe[:63].ljust(3, "0")
+
+
+def get_client(path: str | None = None):
+  key = path or str(VECTOR_STORE_DIR)
+  with _registry_lock:
+    client = _clients.get(key)
+    if client is None:
+      client = _clients[key] = PersistentClient(path=key)
+    return client
+
+
+def get_collection(name: str, path: str | None = None):
+  key = (path or str(VECTOR_STORE_DIR), collection_name(name))
+  with _registry_lock:
+    collection = _collections.get(key)
+  if collection is not None:
+    return collection
+  client = get_client(key[0])
+  with _registry_lock:
+    collection = _collections.get(key)
+    if collection is None:
+      collection = _collections[key] = client.get_or_create_collection(key[1])
+    return collection
+
+
+def close_clients() -> None:
+  """Drop every cached handle and stop the clients' systems (run on app shutdown)."""
+  with _registry_lock:
+    clients = list(_clients.values())
+    _clients.clear()
+    _collections.clear()
+  for client in clients:
+    try:
+      client._system.stop()
+    except Exception:
+      # Shutdown must go on for the remaining clients.
+      pass
+  SharedSystemClient.clear_system_cache()
+
+
+def warm_up(limit: int | None = None) -> list[str]:
+  """Open the `repo-*` collections and run one query against each, so their HNSW indexes
+  are in memory before the first chat request. Returns the collections warmed."""
+  limit = CHROMA_WARMUP_COLLECTIONS if limit is None else limit
+  if limit <= 0:
+    return []
+  warmed: list[str] = []
+  names = sorted(item.name for item in get_client().list_collections() if item.name.startswith("repo-"))
+  for name in names[:limit]:
+    collection = get_collection(name)
+    sample = collection.get(limit=1, include=["embeddings"])
+    if sample["embeddings"] is not None and len(sample["embeddings"]):
+      collection.query(query_embeddings=[list(sample["embeddings"][0])], n_results=1)
+    warmed.append(name)
+  return warmed
+
+
+def chroma_where(where: dict[str, str | int | float | bool] | None) -> dict[str, Any] | None:
+  """Chroma's filter syntax for flat equality conditions (it wants `$and` for more than one)."""
+  if not where:
+    return None
+  if len(where) == 1:
+    return dict(where)
+  return {"$and": [{key: value} for key, value in where.items()]}
 
 
 @dataclass
 class ChromaStore:
   collection: str
 
-  def _client(self):
-    return PersistentClient(path=str(VECTOR_STORE_DIR))
-
   def _collection(self):
-    return self._client().get_or_create_collection(self.collection)
+    return get_collection(self.collection)
 
   def add_documents(self, ids: list[str], embeddings: list[list[float]], metadatas: list[dict[str, Any]], documents: list[str]) -> None:
     if not ids:
       return
     self._collection().upsert(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
 
-  def query(self, query_embeddings: list[list[float]], n_results: int = 5) -> dict[str, Any]:
-    return self._collection().query(query_embeddings=query_embeddings, n_results=n_results)
+  def query(
+    self,
+    query_embeddings: list[list[float]],
+    n_results: int = 5,
+    where: dict[str, str | int | float | bool] | None = None,
+  ) -> dict[str, Any]:
+    """Nearest neighbours among the documents whose metadata equals every `where` item; the
+    filter runs inside Chroma, before the top `n_results` are taken."""
+    return self._collection().query(query_embeddings=query_embeddings, n_results=n_results, where=chroma_where(where))
+
+  def delete(self, ids: list[str]) -> None:
+    if not ids:
+      return
+    self._collection().delete(ids=ids)
@@ -0,0 +1,449 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from ..config import VECTOR_STORE_DIR, VECTOR_STORE_DTYPE, VECTOR_STORE_QUANTIZATION, VECTOR_STORE_RERANK_FACTOR
+from .chroma_store import collection_name
+
+QUERY_BLOCK_ROWS = 8192
+QUANTIZATION_MODES = ("none", "int8")
+_SQL_BATCH = 500
+_MIN_CAPACITY = 1024
+# Filters matching more than 1/_DENSE_FILTER_RATIO of the rows are applied as a scan mask.
+_DENSE_FILTER_RATIO = 4
+
+
+class VectorStoreError(RuntimeError):
+  pass
+
+
+def _normalize(vectors: Any) -> np.ndarray:
+  matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+  norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+  norms[norms == 0] = 1.0
+  return matrix / norms
+
+
+def _batches(items: list, size: int = _SQL_BATCH):
+  for start in range(0, len(items), size):
+    yield items[start : start + size]
+
+
+def _filter_entries(row: int, metadata: dict[str, Any]) -> list[tuple[str, Any, int]]:
+  return [
+    (key, value, row)
+    for key, value in (metadata or {}).items()
+    if isinstance(value, (str, int, float))
+  ]
+
+
+def quantize_int8(vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+  """Symmetric per-row int8 codes and the float32 scale that maps them back."""
+  peak = np.abs(vectors).max(axis=1) if vectors.size else np.zeros(len(vectors), dtype=np.float32)
+  scales = np.where(peak > 0, peak / 127.0, 1.0).astype(np.float32)
+  return np.rint(vectors / scales[:, None]).astype(np.int8), scales
+
+
+class NumpyStore:
+  """Collection of unit-normalized embeddings in memory-mapped per-row files.
+
+  `vectors.bin` holds one row per chunk (float32 or float16), `valid.bin` one byte per row,
+  and `meta.sqlite3` maps ids to rows and keeps documents and metadata. Deleted rows are
+  masked and reused by later inserts. Queries are blocked matrix products with an
+  argpartition top-k, so many query vectors are answered in one pass; distances are cosine
+  distances (1 - cosine similarity). The files are mapped shared, so API workers on the
+  same store share page cache and reopen in constant time.
+
+  With `int8` quantization, `codes.bin` and `scales.bin` keep a per-row scalar-quantized
+  copy that the scan reads instead (a quarter of float32's pages). The best
+  `n_results * rerank_factor` (default `VECTOR_STORE_RERANK_FACTOR`) candidates are then
+  rescored exactly from `vectors.bin`, which is only touched at those rows.
+
+  Scalar metadata values are also kept as indexed (key, value, row) entries, so a `where`
+  filter resolves to the matching rows in SQLite and the scan reads only those rows.
+  """
+
+  def __init__(self, collection: str, root: Path | None = None, quantization: str | None = None) -> None:
+    self.collection = collection
+    self.directory = (root or VECTOR_STORE_DIR / "numpy") / collection_name(collection)
+    self.quantization = quantization or VECTOR_STORE_QUANTIZATION
+    if self.quantization not in QUANTIZATION_MODES:
+      raise VectorStoreError(f"unknown quantization {self.quantization!r}; expected one of {', '.join(QUANTIZATION_MODES)}")
+    self._lock = threading.RLock()
+    self._conn: sqlite3.Connection | None = None
+    self._files: dict[str, np.memmap] = {}
+    self._capacity = -1
+
+  def _db(self) -> sqlite3.Connection:
+    if self._conn is None:
+      self.directory.mkdir(parents=True, exist_ok=True)
+      conn = sqlite3.connect(self.directory / "meta.sqlite3", check_same_thread=False)
+      conn.execute("PRAGMA journal_mode=WAL")
+      conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        CREATE TABLE IF NOT EXISTS docs (
+          row INTEGER PRIMARY KEY,
+          id TEXT NOT NULL UNIQUE,
+          document TEXT,
+          metadata TEXT
+        );
+        CREATE TABLE IF NOT EXISTS free_rows (row INTEGER PRIMARY KEY);
+        CREATE TABLE IF NOT EXISTS doc_filters (
+          key TEXT NOT NULL,
+          value NOT NULL,
+          row INTEGER NOT NULL,
+          PRIMARY KEY (key, value, row)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS doc_filters_by_row ON doc_filters (row);
+        """
+      )
+      if conn.execute("SELECT 1 FROM info WHERE key='filters'").fetchone() is None:
+        # Stores written before metadata filters existed get their entries once.
+        for row, metadata in conn.execute("SELECT row, metadata FROM docs").fetchall():
+          conn.executemany(
+            "INSERT OR IGNORE INTO doc_filters (key, value, row) VALUES (?, ?, ?)",
+            _filter_entries(row, json.loads(metadata) if metadata else {}),
+          )
+        conn.execute("INSERT INTO info (key, value) VALUES ('filters', '1')")
+        conn.commit()
+      self._conn = conn
+    return self._conn
+
+  def _info(self) -> tuple[int, str, int]:
+    """(dim, dtype, rows used) as recorded by the last writer; dim is 0 for an empty store."""
+    values = dict(self._db().execute("SELECT key, value FROM info").fetchall())
+    return int(values.get("dim", 0)), values.get("dtype", VECTOR_STORE_DTYPE), int(values.get("rows", 0))
+
+  def _stored_quantization(self) -> str:
+    row = self._db().execute("SELECT value FROM info WHERE key='quantization'").fetchone()
+    return row[0] if row else "none"
+
+  def _set_info(self, **values: object) -> None:
+    self._db().executemany(
+      "INSERT INTO info (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+      [(key, str(value)) for key, value in values.items()],
+    )
+
+  def _layout(self, dim: int, dtype: str) -> dict[str, tuple[str, tuple[int, ...]]]:
+    """File name -> (dtype, per-row shape) of every per-row file in use."""
+    layout: dict[str, tuple[str, tuple[int, ...]]] = {"valid.bin": ("uint8", ()), "vectors.bin": (dtype, (dim,))}
+    if self.quantization == "int8":
+      layout["codes.bin"] = ("int8", (dim,))
+      layout["scales.bin"] = ("float32", ())
+    return layout
+
+  def _map(self, dim: int, dtype: str) -> None:
+    """(Re)map the files when they were grown, here or by another process."""
+    valid = self.directory / "valid.bin"
+    capacity = valid.stat().st_size if valid.exists() else 0
+    if capacity == self._capacity:
+      return
+    self._files = {}
+    if capacity:
+      for name, (file_dtype, shape) in self._layout(dim, dtype).items():
+        self._files[name] = np.memmap(self.directory / name, dtype=file_dtype, mode="r+", shape=(capacity, *shape))
+    self._capacity = capacity
+
+  def _resize(self, capacity: int, dim: int, dtype: str) -> None:
+    self._files = {}
+    # Growing by truncate keeps the files sparse; new rows read as zeros and invalid.
+    for name, (file_dtype, shape) in self._layout(dim, dtype).items():
+      row_bytes = int(np.prod(shape, dtype=np.int64)) * np.dtype(file_dtype).itemsize
+      with (self.directory / name).open("ab") as handle:
+        handle.truncate(capacity * row_bytes)
+    self._capacity = -1
+    self._map(dim, dtype)
+
+  def _ensure_capacity(self, rows: int, dim: int, dtype: str) -> None:
+    capacity = max(self._capacity, 0)
+    if rows > capacity:
+      self._resize(max(rows, capacity * 2, _MIN_CAPACITY), dim, dtype)
+
+  def _prepare(self, dim: int, dtype: str, used: int) -> None:
+    """Map the files, building or dropping the int8 codes when the configured mode changed."""
+    if self._stored_quantization() == self.quantization:
+      self._map(dim, dtype)
+      return
+    if self.quantization == "int8":
+      valid = self.directory / "valid.bin"
+      self._resize(valid.stat().st_size if valid.exists() else 0, dim, dtype)
+      for start in range(0, used, QUERY_BLOCK_ROWS):
+        stop = min(used, start + QUERY_BLOCK_ROWS)
+        codes, scales = quantize_int8(np.asarray(self._files["vectors.bin"][start:stop], dtype=np.float32))
+        self._files["codes.bin"][start:stop] = codes
+        self._files["scales.bin"][start:stop] = scales
+      self._flush()
+    else:
+      for name in ("codes.bin", "scales.bin"):
+        (self.directory / name).unlink(missing_ok=True)
+      self._capacity = -1
+      self._map(dim, dtype)
+    self._set_info(quantization=self.quantization)
+    self._db().commit()
+
+  def _flush(self) -> None:
+    for mapped in self._files.values():
+      mapped.flush()
+
+  def _rows_for(self, ids: list[str]) -> dict[str, int]:
+    found: dict[str, int] = {}
+    for batch in _batches(ids):
+      marks = ",".join("?" * len(batch))
+      found.update(self._db().execute(f"SELECT id, row FROM docs WHERE id IN ({marks})", batch).fetchall())
+    return found
+
+  def add_documents(self, ids: list[str], embeddings: list[list[float]], metadatas: list[dict[str, Any]], documents: list[str]) -> None:
+    if not ids:
+      return
+    # Last write wins for ids repeated within one batch, as with an upsert.
+    latest = {doc_id: idx for idx, doc_id in enumerate(ids)}
+    order = list(latest.values())
+    ids = [ids[idx] for idx in order]
+    vectors = _normalize([embeddings[idx] for idx in order])
+    with self._lock:
+      conn = self._db()
+      dim, dtype, used = self._info()
+      if dim and vectors.shape[1] != dim:
+        raise VectorStoreError(f"embedding dimension {vectors.shape[1]} does not match collection dimension {dim}")
+      dim = vectors.shape[1]
+      self._prepare(dim, dtype, used)
+      rows = self._rows_for(ids)
+      missing = [doc_id for doc_id in ids if doc_id not in rows]
+      reused = [row for (row,) in conn.execute("SELECT row FROM free_rows ORDER BY row LIMIT ?", (len(missing),))]
+      conn.executemany("DELETE FROM free_rows WHERE row=?", [(row,) for row in reused])
+      fresh = list(range(used, used + len(missing) - len(reused)))
+      rows.update(zip(missing, reused + fresh))
+      used += len(fresh)
+      self._ensure_capacity(used, dim, dtype)
+
+      targets = np.array([rows[doc_id] for doc_id in ids], dtype=np.int64)
+      self._files["vectors.bin"][targets] = vectors.astype(dtype)
+      if self.quantization == "int8":
+        codes, scales = quantize_int8(vectors)
+        self._files["codes.bin"][targets] = codes
+        self._files["scales.bin"][targets] = scales
+      self._files["valid.bin"][targets] = 1
+      self._flush()
+      conn.executemany(
+        "INSERT INTO docs (row, id, document, metadata) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(row) DO UPDATE SET id=excluded.id, document=excluded.document, metadata=excluded.metadata",
+        [
+          (rows[doc_id], doc_id, documents[idx], json.dumps(metadatas[idx]))
+          for doc_id, idx in zip(ids, order)
+        ],
+      )
+      conn.executemany("DELETE FROM doc_filters WHERE row=?", [(int(row),) for row in targets])
+      conn.executemany(
+        "INSERT OR IGNORE INTO doc_filters (key, value, row) VALUES (?, ?, ?)",
+        [entry for doc_id, idx in zip(ids, order) for entry in _filter_entries(rows[doc_id], metadatas[idx])],
+      )
+      self._set_info(dim=dim, dtype=dtype, rows=used)
+      conn.commit()
+
+  def delete(self, ids: list[str]) -> None:
+    if not ids:
+      return
+    with self._lock:
+      conn = self._db()
+      dim, dtype, used = self._info()
+      rows = list(self._rows_for(list(dict.fromkeys(ids))).values())
+      if not rows:
+        return
+      self._prepare(dim, dtype, used)
+      self._files["valid.bin"][np.array(rows, dtype=np.int64)] = 0
+      self._files["valid.bin"].flush()
+      for batch in _batches(rows):
+        conn.execute(f"DELETE FROM docs WHERE row IN ({','.join('?' * len(batch))})", batch)
+        conn.execute(f"DELETE FROM doc_filters WHERE row IN ({','.join('?' * len(batch))})", batch)
+      conn.executemany("INSERT OR IGNORE INTO free_rows (row) VALUES (?)", [(row,) for row in rows])
+      conn.commit()
+
+  def count(self) -> int:
+    with self._lock:
+      return int(self._db().execute("SELECT COUNT(*) FROM docs").fetchone()[0])
+
+  def scan_bytes_per_row(self) -> int:
+    """Bytes the first pass reads per row, i.e. the page cache a store needs to stay hot."""
+    with self._lock:
+      dim, dtype, _ = self._info()
+    if self.quantization == "int8":
+      return dim + 4 + 1
+    return dim * np.dtype(dtype).itemsize + 1
+
+  def live_vectors(self) -> np.ndarray:
+    """A float32 copy of every stored (not deleted) vector, in row order."""
+    with self._lock:
+      dim, dtype, used = self._info()
+      if not dim:
+        return np.empty((0, 0), dtype=np.float32)
+      self._prepare(dim, dtype, used)
+      valid = np.asarray(self._files["valid.bin"][:used]) == 1
+      return np.asarray(self._files["vectors.bin"][:used], dtype=np.float32)[valid]
+
+  def _matching_rows(self, where: dict[str, Any], used: int) -> np.ndarray | None:
+    """Rows whose metadata equals every `where` item: ascending row ids when the filter is
+    selective, a mask over all `used` rows when it is not, None when it matches every row."""
+    conn = self._db()
+    live = conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+    # Counting is an index range scan; fetching a condition every row satisfies is not free.
+    where = {
+      key: value
+      for key, value in where.items()
+      if conn.execute("SELECT COUNT(*) FROM doc_filters WHERE key=? AND value=?", (key, value)).fetchone()[0] != live
+    }
+    if not where:
+      return None
+    sql = " INTERSECT ".join("SELECT row FROM doc_filters WHERE key=? AND value=?" for _ in where)
+    params = [item for pair in where.items() for item in pair]
+    rows = np.array([row for (row,) in conn.execute(f"{sql} ORDER BY row", params)], dtype=np.int64)
+    if len(rows) * _DENSE_FILTER_RATIO <= used:
+      return rows
+    # Scanning contiguous blocks and masking beats gathering most of the rows.
+    mask = np.zeros(used, dtype=bool)
+    mask[rows] = True
+    return mask
+
+  def _block_scores(self, queries: np.ndarray, block: slice | np.ndarray, quantized: bool) -> np.ndarray:
+    if quantized:
+      codes = np.asarray(self._files["codes.bin"][block], dtype=np.float32)
+      return (queries @ codes.T) * self._files["scales.bin"][block]
+    return queries @ np.asarray(self._files["vectors.bin"][block], dtype=np.float32).T
+
+  def _scan(
+    self,
+    queries: np.ndarray,
+    k: int,
+    rows: int,
+    quantized: bool,
+    subset: np.ndarray | None = None,
+  ) -> tuple[np.ndarray, np.ndarray]:
+    """Row ids and scores of the k best rows per query, unordered. `subset` restricts the scan
+    to the given row ids, or to the rows set in a boolean mask."""
+    best_rows = np.empty((len(queries), 0), dtype=np.int64)
+    best_scores = np.empty((len(queries), 0), dtype=np.float32)
+    gather = subset is not None and subset.dtype != np.bool_
+    total = len(subset) if gather else rows
+    for start in range(0, total, QUERY_BLOCK_ROWS):
+      stop = min(total, start + QUERY_BLOCK_ROWS)
+      block = subset[start:stop] if gather else slice(start, stop)
+      scores = self._block_scores(queries, block, quantized)
+      scores[:, self._files["valid.bin"][block] == 0] = -np.inf
+      if subset is not None and not gather:
+        scores[:, ~subset[start:stop]] = -np.inf
+      block_rows = block if gather else np.arange(start, stop)
+      best_rows = np.concatenate([best_rows, np.broadcast_to(block_rows, scores.shape)], axis=1)
+      best_scores = np.concatenate([best_scores, scores], axis=1)
+      if best_scores.shape[1] > k:
+        keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+        best_rows = np.take_along_axis(best_rows, keep, axis=1)
+        best_scores = np.take_along_axis(best_scores, keep, axis=1)
+    return best_rows, best_scores
+
+  def _rerank(self, queries: np.ndarray, rows: np.ndarray, scores: np.ndarray) -> np.ndarray:
+    """Exact scores for candidate rows; each distinct row is read from `vectors.bin` once."""
+    live = np.isfinite(scores)
+    unique_rows = np.unique(rows[live])
+    if not len(unique_rows):
+      return scores
+    exact = queries @ np.asarray(self._files["vectors.bin"][unique_rows], dtype=np.float32).T
+    positions = np.clip(np.searchsorted(unique_rows, rows), 0, len(unique_rows) - 1)
+    rescored = np.take_along_axis(exact, positions, axis=1)
+    rescored[~live] = -np.inf
+    return rescored
+
+  def _top_k(
+    self,
+    queries: np.ndarray,
+    k: int,
+    rows: int,
+    subset: np.ndarray | None = None,
+    rerank_factor: int = VECTOR_STORE_RERANK_FACTOR,
+  ) -> tuple[np.ndarray, np.ndarray]:
+    """Row ids and similarities of the k best rows per query, best first."""
+    if self.quantization == "int8":
+      candidates, approx = self._scan(queries, max(k * rerank_factor, k), rows, True, subset)
+      scores = self._rerank(queries, candidates, approx)
+    else:
+      candidates, scores = self._scan(queries, k, rows, False, subset)
+    order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+  def query(
+    self,
+    query_embeddings: list[list[float]],
+    n_results: int = 5,
+    where: dict[str, str | int | float | bool] | None = None,
+    rerank_factor: int | None = None,
+  ) -> dict[str, Any]:
+    """Chroma-shaped results: one list of ids, documents, metadatas and distances per query.
+
+    With `where`, only rows whose metadata equals every item are scored. `rerank_factor`
+    overrides `VECTOR_STORE_RERANK_FACTOR` for an int8 store.
+    """
+    empty: dict[str, Any] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+    if not len(query_embeddings):
+      return empty
+    with self._lock:
+      dim, dtype, used = self._info()
+      if not dim or n_results <= 0:
+        return {key: [[] for _ in query_embeddings] for key in empty}
+      queries = _normalize(query_embeddings)
+      if queries.shape[1] != dim:
+        raise VectorStoreError(f"query dimension {queries.shape[1]} does not match collection dimension {dim}")
+      self._prepare(dim, dtype, used)
+      subset = self._matching_rows(where, used) if where else None
+      if subset is not None and not len(subset):
+        return {key: [[] for _ in query_embeddings] for key in empty}
+      rows, scores = self._top_k(queries, n_results, used, subset, rerank_factor or VECTOR_STORE_RERANK_FACTOR)
+      wanted = sorted({int(row) for row in rows[np.isfinite(scores)]})
+      docs: dict[int, tuple[str, str, str]] = {}
+      for batch in _batches(wanted):
+        marks = ",".join("?" * len(batch))
+        for row, doc_id, document, metadata in self._db().execute(
+          f"SELECT row, id, document, metadata FROM docs WHERE row IN ({marks})", batch
+        ):
+          docs[row] = (doc_id, document, metadata)
+
+    result: dict[str, Any] = {key: [] for key in empty}
+    for query_rows, query_scores in zip(rows.tolist(), scores.tolist()):
+      hits = [(docs[row], score) for row, score in zip(query_rows, query_scores) if row in docs and score != -np.inf]
+      result["ids"].append([hit[0] for hit, _ in hits])
+      result["documents"].append([hit[1] for hit, _ in hits])
+      result["metadatas"].append([json.loads(hit[2]) if hit[2] else {} for hit, _ in hits])
+      result["distances"].append([1.0 - score for _, score in hits])
+    return result
+
+  def close(self) -> None:
+    with self._lock:
+      if self._conn is not None:
+        self._conn.close()
+        self._conn = None
+      self._files = {}
+      self._capacity = -1
+
+
+_stores: dict[str, NumpyStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_numpy_store(collection: str) -> NumpyStore:
+  with _stores_lock:
+    store = _stores.get(collection)
+    if store is None:
+      store = _stores[collection] = NumpyStore(collection)
+    return store
+
+
+def close_numpy_stores() -> None:
+  with _stores_lock:
+    stores = list(_stores.values())
+    _stores.clear()
+  for store in stores:
+    store.close()
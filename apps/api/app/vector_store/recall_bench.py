@@ -0,0 +1,107 @@
+"""Recall@k of int8-quantized NumPy stores against the exact index.
+
+    python -m app.vector_store.recall_bench --rows 50000 --dim 768
+    python -m app.vector_store.recall_bench --collection repo:<repo_id>
+
+Synthetic runs use random vectors; `--collection` copies the embeddings of an existing
+NumPy collection and queries it with a sample of its own vectors.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from .numpy_store import NumpyStore
+
+
+def _collection_vectors(collection: str) -> np.ndarray:
+  source = NumpyStore(collection)
+  try:
+    return source.live_vectors()
+  finally:
+    source.close()
+
+
+def recall_at_k(
+  vectors: np.ndarray,
+  queries: np.ndarray,
+  k: int = 10,
+  rerank_factors: tuple[int, ...] = (1, 4),
+  root: Path | None = None,
+) -> dict[str, Any]:
+  """Load `vectors` into an exact and an int8 store and compare their top-k per query.
+
+  Recall is the share of the exact top-k ids that the quantized store also returns; each
+  entry in `rerank_factors` is one quantized run with that many candidates per result.
+  """
+  with tempfile.TemporaryDirectory(dir=root) as tmp:
+    ids = [str(idx) for idx in range(len(vectors))]
+    exact = NumpyStore("bench", root=Path(tmp) / "exact", quantization="none")
+    quantized = NumpyStore("bench", root=Path(tmp) / "int8", quantization="int8")
+    for store in (exact, quantized):
+      for start in range(0, len(ids), 10_000):
+        stop = start + 10_000
+        store.add_documents(ids[start:stop], vectors[start:stop], [{} for _ in ids[start:stop]], ["" for _ in ids[start:stop]])
+
+    began = time.perf_counter()
+    truth = exact.query(queries, n_results=k)["ids"]
+    report: dict[str, Any] = {
+      "rows": len(vectors),
+      "dim": int(vectors.shape[1]),
+      "queries": len(queries),
+      "k": k,
+      "exact": {"bytes_per_row": exact.scan_bytes_per_row(), "query_ms": (time.perf_counter() - began) * 1000 / len(queries)},
+      "int8": [],
+    }
+    try:
+      for rerank in rerank_factors:
+        began = time.perf_counter()
+        found = quantized.query(queries, n_results=k, rerank_factor=rerank)["ids"]
+        elapsed = (time.perf_counter() - began) * 1000 / len(queries)
+        hits = sum(len(set(want) & set(got)) for want, got in zip(truth, found))
+        report["int8"].append(
+          {
+            "rerank_factor": rerank,
+            "recall": hits / max(1, sum(len(want) for want in truth)),
+            "bytes_per_row": quantized.scan_bytes_per_row(),
+            "query_ms": elapsed,
+          }
+        )
+    finally:
+      exact.close()
+      quantized.close()
+  return report
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--collection", help="logical collection name, e.g. repo:<repo_id>")
+  parser.add_argument("--rows", type=int, default=20_000)
+  parser.add_argument("--dim", type=int, default=768)
+  parser.add_argument("--queries", type=int, default=100)
+  parser.add_argument("-k", type=int, default=10)
+  parser.add_argument("--rerank", type=int, nargs="+", default=[1, 2, 4, 8])
+  parser.add_argument("--seed", type=int, default=0)
+  args = parser.parse_args()
+
+  rng = np.random.default_rng(args.seed)
+  if args.collection:
+    vectors = _collection_vectors(args.collection)
+    if not len(vectors):
+      parser.error(f"collection {args.collection!r} has no vectors in the NumPy store")
+    queries = vectors[rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False)]
+  else:
+    vectors = rng.standard_normal((args.rows, args.dim)).astype(np.float32)
+    queries = rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+  print(json.dumps(recall_at_k(vectors, queries, k=args.k, rerank_factors=tuple(args.rerank)), indent=2))
+
+
+if __name__ == "__main__":
+  main()
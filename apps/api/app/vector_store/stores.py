@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from ..config import VECTOR_STORE
+from .chroma_store import ChromaStore, close_clients, warm_up
+from .numpy_store import NumpyStore, VectorStoreError, close_numpy_stores, get_numpy_store
+
+VECTOR_STORES = ("chroma", "numpy")
+
+
+def get_store(collection: str) -> ChromaStore | NumpyStore:
+  """The vector store selected by `VECTOR_STORE` for one collection."""
+  if VECTOR_STORE == "numpy":
+    return get_numpy_store(collection)
+  if VECTOR_STORE == "chroma":
+    return ChromaStore(collection=collection)
+  raise VectorStoreError(f"unknown VECTOR_STORE {VECTOR_STORE!r}; expected one of {', '.join(VECTOR_STORES)}")
+
+
+def warm_up_stores() -> None:
+  # Memory-mapped stores open lazily in constant time; only Chroma has indexes to load.
+  if VECTOR_STORE == "chroma":
+    warm_up()
+
+
+def close_stores() -> None:
+  close_clients()
+  close_numpy_stores()
@@ -1,17 +1,55 @@
 from __future__ import annotations
 
+from collections import OrderedDict
 from collections.abc import Generator
+import os
 from pathlib import Path
 import sys
+import tempfile
 
 import pytest
 from fastapi.testclient import TestClient
 
 # Ensure tests can import `app` package both locally and in CI.
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+# app.config creates its directories on import; keep them (and anything not redirected below) out of the real .data/.
+os.environ.setdefault("CODEBASE_AGENT_DATA_DIR", tempfile.mkdtemp(prefix="codebase-agent-tests-"))
 
+from app import analysis_cache, churn, symbol_index
+from app.indexer import code_search, graph_index, import_graph, index_state, lexical_index
+from app.llm import ollama_client
 from app.main import app
+from app.memory import sqlite_memory
 from app.store import store
+from app.vector_store import numpy_store
+
+
+@pytest.fixture(autouse=True)
+def isolated_data(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Generator[None, None, None]:
+    monkeypatch.setattr(index_state, "INDEX_DB_PATH", tmp_path / "index.sqlite3")
+    monkeypatch.setattr(lexical_index, "LEXICAL_INDEX_DIR", tmp_path / "lexical")
+    monkeypatch.setattr(code_search, "CODE_SEARCH_DIR", tmp_path / "code_search")
+    monkeypatch.setattr(code_search, "_indexes", OrderedDict())
+    monkeypatch.setattr(symbol_index, "SYMBOL_DB_PATH", tmp_path / "symbols.sqlite3")
+    monkeypatch.setattr(churn, "CHURN_DB_PATH", tmp_path / "churn.sqlite3")
+    monkeypatch.setattr(sqlite_memory, "DB_PATH", tmp_path / "agent.sqlite3")
+    monkeypatch.setattr(graph_index, "ARTIFACTS_DIR", tmp_path / "artifacts")
+    monkeypatch.setattr(import_graph, "ARTIFACTS_DIR", tmp_path / "artifacts")
+    monkeypatch.setattr(import_graph, "_graphs", OrderedDict())
+    monkeypatch.setattr(numpy_store, "VECTOR_STORE_DIR", tmp_path / "vectorstore")
+    monkeypatch.setattr(numpy_store, "_stores", {})
+    monkeypatch.setattr(ollama_client, "EMBED_CACHE_PATH", tmp_path / "embed_cache.sqlite3")
+    monkeypatch.setattr(ollama_client, "_embed_cache", None)
+    monkeypatch.setattr(analysis_cache, "ANALYSIS_CACHE_PATH", tmp_path / "analysis_cache.sqlite3")
+    monkeypatch.setattr(analysis_cache, "_analysis_cache", None)
+    yield
+    # Release handles opened during the test before monkeypatch swaps the originals back.
+    for index in code_search._indexes.values():
+        index.close()
+    numpy_store.close_numpy_stores()
+    for cache in (ollama_client._embed_cache, analysis_cache._analysis_cache):
+        if cache is not None:
+            cache.close()
 
 
 @pytest.fixture(autouse=True)
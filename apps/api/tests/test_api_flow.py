@@ -49,7 +49,7 @@ def test_end_to_end_flow_with_local_pr_draft(client: TestClient, monkeypatch, tm
     repo_path = tmp_path / "repo"
     commit_sha = _init_repo(repo_path)
 
-    def fake_ingest(repo_url: str, branch: str) -> dict[str, str]:
+    def fake_ingest(repo_url: str, branch: str, depth: int | None = None) -> dict[str, str]:
         assert repo_url.startswith("https://")
         assert branch == "main"
         return {"path": str(repo_path), "commit_sha": commit_sha}
@@ -67,6 +67,8 @@ def test_end_to_end_flow_with_local_pr_draft(client: TestClient, monkeypatch, tm
     detail_res = client.get(f"/analysis/{analysis_id}")
     assert detail_res.status_code == 200
     assert detail_res.json()["status"] == "completed"
+    assert detail_res.json()["function_count"] == 1
+    assert detail_res.json()["function_hotspots"][0]["name"] == "run"
 
     proposal_res = client.post(
         "/refactors/propose",
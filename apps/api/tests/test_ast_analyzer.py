@@ -1,13 +1,21 @@
 from __future__ import annotations
 
 import json
+import subprocess
+from collections import Counter
 from pathlib import Path
 
+import pytest
+
+from app import ast_analyzer
 from app.ast_analyzer import analyze_repository
+from app.analysis_cache import AnalysisCache
 from app.config import ARTIFACTS_DIR
+from app.graph_artifacts import EdgeArtifact
 
 
-def test_analyze_repository_creates_graph_and_hotspots(tmp_path: Path) -> None:
+def test_analyze_repository_creates_graph_and_hotspots(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(ast_analyzer, "GRAPH_ARTIFACT_FORMAT", "json")
     repo = tmp_path / "repo"
     repo.mkdir(parents=True)
     (repo / "mod.py").write_text(
@@ -26,4 +34,110 @@ def test_analyze_repository_creates_graph_and_hotspots(tmp_path: Path) -> None:
     assert graph_path.exists()
     payload = json.loads(graph_path.read_text(encoding="utf-8"))
     assert isinstance(payload["nodes"], list)
-    assert isinstance(payload["edges"], list)
+    assert payload["edges"] == list(EdgeArtifact(ARTIFACTS_DIR / analysis_id / "edges.npz").edges())
+
+
+def test_parallel_analysis_matches_serial(tmp_path: Path, monkeypatch) -> None:
+    repo = tmp_path / "repo"
+    repo.mkdir(parents=True)
+    for idx in range(12):
+        branches = "\n".join(f"    if x == {n}:\n        return helper_{n % 3}(x)" for n in range(idx))
+        (repo / f"mod_{idx:02d}.py").write_text(
+            f"import os\nimport pkg_{idx % 4}\n\n\ndef run(x):\n{branches or '    pass'}\n    return x\n",
+            encoding="utf-8",
+        )
+    monkeypatch.setattr(ast_analyzer, "ANALYSIS_PARALLEL_MIN_FILES", 0)
+    monkeypatch.setattr(ast_analyzer, "get_analysis_cache", lambda: None)
+
+    serial = ast_analyzer.analyze_repository(str(repo), "a_test_serial", workers=1)
+    parallel = ast_analyzer.analyze_repository(str(repo), "a_test_parallel", workers=2)
+
+    assert parallel["summary"] == serial["summary"]
+    assert parallel["hotspots"] == serial["hotspots"]
+    assert serial["module_graph_url"] == "/analysis/a_test_serial/edges"
+    serial_graph = EdgeArtifact(ARTIFACTS_DIR / "a_test_serial" / "edges.npz")
+    parallel_graph = EdgeArtifact(ARTIFACTS_DIR / "a_test_parallel" / "edges.npz")
+    assert list(parallel_graph.edges()) == list(serial_graph.edges())
+
+
+def test_reanalysis_serves_unchanged_blobs_from_cache(tmp_path: Path, monkeypatch) -> None:
+    cache = AnalysisCache(tmp_path / "analysis.sqlite3", max_entries=100)
+    monkeypatch.setattr(ast_analyzer, "get_analysis_cache", lambda: cache)
+    repo = tmp_path / "repo"
+    repo.mkdir(parents=True)
+    (repo / "a.py").write_text("import os\n\n\ndef f(x):\n    if x:\n        return os.sep\n", encoding="utf-8")
+    (repo / "b.py").write_text("def g():\n    return 1\n", encoding="utf-8")
+
+    first = ast_analyzer.analyze_repository(str(repo), "a_test_cache_1", workers=1)
+    assert "Served 0 of 2 files" in first["summary"]
+
+    (repo / "b.py").write_text("def g():\n    return 2\n", encoding="utf-8")
+    parsed: list[str] = []
+    analyze_source = ast_analyzer._analyze_source
+    monkeypatch.setattr(
+        ast_analyzer,
+        "_analyze_source",
+        lambda rel, source, repo_path=None: parsed.append(rel) or analyze_source(rel, source, repo_path),
+    )
+    second = ast_analyzer.analyze_repository(str(repo), "a_test_cache_2", workers=1)
+
+    assert parsed == ["b.py"]
+    assert "Served 1 of 2 files" in second["summary"]
+    assert second["hotspots"] == first["hotspots"]
+    cache.close()
+
+
+def test_analyze_commit_reads_object_database_not_worktree(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(ast_analyzer, "get_analysis_cache", lambda: None)
+    repo = tmp_path / "repo"
+    repo.mkdir(parents=True)
+
+    def git(*args: str) -> str:
+        proc = subprocess.run(
+            ["git", "-c", "user.name=tests", "-c", "user.email=tests@example.local", *args],
+            cwd=str(repo),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return proc.stdout.strip()
+
+    (repo / "old.py").write_text("import json\n\n\ndef f(x):\n    if x:\n        return 1\n    return 2\n", encoding="utf-8")
+    git("init")
+    git("add", ".")
+    git("commit", "-m", "first")
+    first_sha = git("rev-parse", "HEAD")
+    (repo / "old.py").unlink()
+    (repo / "new.py").write_text("def g():\n    return 1\n", encoding="utf-8")
+    git("add", "-A")
+    git("commit", "-m", "second")
+
+    result = ast_analyzer.analyze_repository(str(repo), "a_test_commit", workers=1, commit_sha=first_sha)
+    assert [hotspot["file"] for hotspot in result["hotspots"]] == ["old.py"]
+    graph = EdgeArtifact(ARTIFACTS_DIR / "a_test_commit" / "edges.npz")
+    assert list(graph.edges()) == [{"from": "old.py", "to": "json"}]
+    assert (repo / "new.py").exists()
+
+
+def test_pinned_tree_sitter_grammars_load() -> None:
+    # The JS/TS tests skip without grammars; with the pinned requirements they must load, so a
+    # broken tree-sitter / tree-sitter-languages pair fails here instead of going unnoticed.
+    for suffix in (".js", ".jsx", ".ts", ".tsx"):
+        assert ast_analyzer._parser_for(suffix) is not None, suffix
+        assert ast_analyzer._query_for(suffix) is not None, suffix
+
+
+def test_ts_query_and_cursor_walk_agree() -> None:
+    if ast_analyzer._parser_for(".ts") is None:
+        pytest.skip("tree-sitter parsers unavailable")
+    source = b"import a from 'b'\nexport { x } from './y'\nexport const z = 1\nif (a) { f(new X()) }\n"
+    tree = ast_analyzer.parse_source("a.ts", source)
+    query_calls: Counter[str] = Counter()
+    cursor_calls: Counter[str] = Counter()
+
+    by_query = ast_analyzer._analyze_ts_js(tree, source, query_calls, ast_analyzer._query_for(".ts"))
+    ast_analyzer._ts_memo.clear()
+    by_cursor = ast_analyzer._analyze_ts_js(tree, source, cursor_calls)
+
+    assert by_query == by_cursor == (["import a from 'b'", "export { x } from './y'"], 2)
+    assert query_calls == cursor_calls == Counter({"call_expression": 1, "new_expression": 1})
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from app.vector_store import chroma_store
+from app.vector_store.chroma_store import ChromaStore, collection_name
+
+
+def test_collection_name_fits_chroma_rules() -> None:
+  assert collection_name("repo:r_1234") == "repo-r_1234"
+  assert collection_name("a") == "a00"
+  assert len(collection_name("repo:" + "x" * 100)) == 63
+
+
+def test_chroma_where_wraps_several_conditions() -> None:
+  assert chroma_store.chroma_where(None) is None
+  assert chroma_store.chroma_where({"language": "go"}) == {"language": "go"}
+  assert chroma_store.chroma_where({"language": "go", "kind": "class"}) == {"$and": [{"language": "go"}, {"kind": "class"}]}
+
+
+def test_store_reuses_client_and_collection_handles(tmp_path: Path, monkeypatch) -> None:
+  monkeypatch.setattr(chroma_store, "VECTOR_STORE_DIR", tmp_path / "vectors")
+  try:
+    with ThreadPoolExecutor(max_workers=8) as pool:
+      handles = list(pool.map(lambda _: chroma_store.get_collection("repo:r_warm"), range(16)))
+    assert all(handle is handles[0] for handle in handles)
+    assert chroma_store.get_client() is chroma_store.get_client()
+
+    store = ChromaStore(collection="repo:r_warm")
+    store.add_documents(["a.py:0"], [[0.1, 0.2]], [{"path": "a.py"}], ["x = 1"])
+    assert store.query([[0.1, 0.2]], n_results=1)["ids"] == [["a.py:0"]]
+    store.add_documents(["b.py:0"], [[0.1, 0.21]], [{"path": "b.py", "language": "go", "tag_test": True}], ["y = 2"])
+    assert store.query([[0.1, 0.2]], n_results=1, where={"language": "go", "tag_test": True})["ids"] == [["b.py:0"]]
+    assert store.query([[0.1, 0.2]], n_results=2, where={"path": "a.py"})["ids"] == [["a.py:0"]]
+    assert chroma_store.warm_up(limit=4) == ["repo-r_warm"]
+    assert chroma_store.warm_up(limit=0) == []
+  finally:
+    chroma_store.close_clients()
+  assert not chroma_store._clients and not chroma_store._collections
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from app.indexer.chunk_filters import ChunkFilter, chunk_metadata
+
+
+def test_chunk_metadata_flattens_tags_and_directories() -> None:
+  assert chunk_metadata("services/billing/tests/test_api.py", "function") == {
+    "language": "python",
+    "kind": "function",
+    "tag_test": True,
+    "tag_api": True,
+    "tag_service": True,
+    "dir_1": "services",
+    "dir_2": "services/billing",
+    "dir_3": "services/billing/tests",
+  }
+  assert chunk_metadata("README.md", None) == {"language": "", "kind": ""}
+
+
+def test_filter_conditions_match_chunk_metadata() -> None:
+  scoped = ChunkFilter(language="python", tags=("test",), path_prefix="./services/billing/", symbol_kind="function")
+  assert scoped.conditions() == {"language": "python", "kind": "function", "tag_test": True, "dir_2": "services/billing"}
+  assert scoped.matches(chunk_metadata("services/billing/tests/test_api.py", "function"))
+  assert not scoped.matches(chunk_metadata("services/billing_v2/tests/test_api.py", "function"))
+  assert not scoped.matches(chunk_metadata("services/billing/tests/test_api.py", "class"))
+  assert ChunkFilter().conditions() == {}
+  assert ChunkFilter().matches({})
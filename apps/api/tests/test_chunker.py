@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from app.indexer.chunker import chunk_file
+
+
+def test_python_chunks_follow_function_and_class_boundaries() -> None:
+  method_body = "\n".join(f"        value += {i}" for i in range(30))
+  source = (
+    "import os\n"
+    "\n"
+    "\n"
+    "def small():\n"
+    "    return 1\n"
+    "\n"
+    "\n"
+    "class Service:\n"
+    "    def first(self, value):\n"
+    f"{method_body}\n"
+    "        return value\n"
+    "\n"
+    "    def second(self, value):\n"
+    f"{method_body}\n"
+    "        return value\n"
+  )
+  chunks = chunk_file("svc.py", source, max_tokens=180, overlap_lines=0)
+
+  assert [chunk.symbol for chunk in chunks] == ["small", "Service.first", "Service.second"]
+  assert [chunk.kind for chunk in chunks] == ["function", "method", "method"]
+  assert chunks[0].start_line == 1
+  assert chunks[0].text.startswith("import os")
+  assert chunks[1].text.lstrip().startswith("class Service:")
+  assert chunks[2].text.lstrip().startswith("def second")
+  assert chunks[-1].end_line == len(source.splitlines())
+  for previous, current in zip(chunks, chunks[1:]):
+    assert current.start_line == previous.end_line + 1
+
+
+def test_small_file_is_one_chunk_and_fallback_windows_overlap() -> None:
+  chunks = chunk_file("tiny.py", "def a():\n    pass\n\n\ndef b():\n    pass\n", max_tokens=512)
+  assert len(chunks) == 1
+  assert chunks[0].symbol == "a, b"
+  assert chunks[0].kind == "function"
+
+  constants = chunk_file("consts.py", "import os\n\nLIMIT = 10\nfirst, *rest = os.sep, 1\nos.environ['X'] = '1'\n")
+  assert (constants[0].symbol, constants[0].kind) == ("LIMIT, first, rest", "variable")
+  mixed = chunk_file("mixed.py", "LIMIT = 10\n\n\ndef a():\n    return LIMIT\n")
+  assert (mixed[0].symbol, mixed[0].kind) == ("LIMIT, a", None)
+
+  text = "".join(f"line {i:03d}\n" for i in range(100))
+  windows = chunk_file("notes.go", text, max_tokens=50, overlap_lines=3)
+  assert len(windows) > 1
+  assert all(len(chunk.text) // 4 <= 50 for chunk in windows)
+  for previous, current in zip(windows, windows[1:]):
+    assert current.start_line == previous.end_line - 2
+  assert windows[-1].end_line == 100
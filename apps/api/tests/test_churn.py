@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import subprocess
+from pathlib import Path
+
+from app import ast_analyzer, churn, repo_ingest
+
+
+def _git(repo: Path, *args: str, email: str = "tests@example.local") -> str:
+    proc = subprocess.run(
+        ["git", "-c", "user.name=tests", "-c", f"user.email={email}", *args],
+        cwd=str(repo),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return proc.stdout.strip()
+
+
+def _commit(repo: Path, files: dict[str, str], email: str = "tests@example.local") -> str:
+    for rel, text in files.items():
+        (repo / rel).write_text(text, encoding="utf-8")
+    _git(repo, "add", ".")
+    _git(repo, "commit", "-m", "change", email=email)
+    return _git(repo, "rev-parse", "HEAD")
+
+
+def test_churn_table_extends_from_last_commit(tmp_path: Path) -> None:
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _git(repo, "init")
+    _commit(repo, {"hot.py": "x = 1\n", "cold.py": "y = 1\n"})
+    first = _commit(repo, {"hot.py": "x = 2\nz = 3\n"}, email="other@example.local")
+
+    table = churn.ChurnTable(repo)
+    assert table.update(first) == 2
+    stats = table.stats()
+    assert stats["hot.py"] == churn.FileChurn(commits=2, added=3, removed=1, authors=2)
+    assert stats["cold.py"].commits == 1
+
+    second = _commit(repo, {"hot.py": "x = 4\nz = 3\n"})
+    assert table.update(second) == 1
+    assert table.update(second) == 0
+    assert table.stats()["hot.py"].commits == 3
+    table.close()
+
+
+def test_churn_scoring_ranks_frequently_changed_files(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(ast_analyzer, "get_analysis_cache", lambda: None)
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _git(repo, "init")
+    complex_once = "def f(a, b):\n    if a:\n        if b:\n            return 1\n    return 0\n"
+    _commit(repo, {"complex.py": complex_once, "busy.py": "def g():\n    return 0\n"})
+    for value in range(1, 5):
+        _commit(repo, {"busy.py": f"def g():\n    return {value}\n"})
+
+    by_complexity = ast_analyzer.analyze_repository(str(repo), "a_test_churn_1", workers=1)
+    by_churn = ast_analyzer.analyze_repository(
+        str(repo), "a_test_churn_2", workers=1, scoring="churn", churn_window_days=0
+    )
+
+    assert by_complexity["hotspots"][0]["file"] == "complex.py"
+    assert by_churn["hotspots"][0]["file"] == "busy.py"
+    assert "5 commits" in by_churn["hotspots"][0]["reason"]
+    assert "weighted by churn over all history" in by_churn["summary"]
+
+
+def test_ingest_unshallows_on_request(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setattr(repo_ingest, "REPOS_DIR", tmp_path / "repos")
+    origin = tmp_path / "origin"
+    origin.mkdir()
+    _git(origin, "init", "-b", "main")
+    for value in range(3):
+        _commit(origin, {"a.py": f"x = {value}\n"})
+
+    url = origin.resolve().as_uri()
+    shallow = repo_ingest.ingest_repository(url, "main", depth=1)
+    assert _git(Path(shallow["path"]), "rev-parse", "--is-shallow-repository") == "true"
+
+    full = repo_ingest.ingest_repository(url, "main", depth=0)
+    assert _git(Path(full["path"]), "rev-parse", "--is-shallow-repository") == "false"
+    assert _git(Path(full["path"]), "rev-list", "--count", "HEAD") == "3"
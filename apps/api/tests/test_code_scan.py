@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from app import ast_analyzer, code_scan
+from app.analysis_cache import AnalysisCache
+from app.indexer.chunker import chunk_file
+
+
+def test_scan_reads_once_and_warms_analysis_cache(tmp_path: Path, monkeypatch) -> None:
+    cache = AnalysisCache(tmp_path / "analysis.sqlite3", max_entries=100)
+    monkeypatch.setattr(code_scan, "get_analysis_cache", lambda: cache)
+    monkeypatch.setattr(ast_analyzer, "get_analysis_cache", lambda: cache)
+    repo = tmp_path / "repo"
+    repo.mkdir(parents=True)
+    (repo / "a.py").write_text("import os\n\n\ndef f(x):\n    if x:\n        return os.sep\n", encoding="utf-8")
+    (repo / "b.py").write_text("class B:\n    def g(self):\n        return 1\n", encoding="utf-8")
+    (repo / "main.go").write_text('package main\n\nimport "fmt"\n', encoding="utf-8")
+
+    scanned = list(code_scan.scan_repository(repo))
+    assert [item.rel for item in scanned] == ["a.py", "b.py", "main.go"]
+    by_rel = {item.rel: item for item in scanned}
+    assert by_rel["a.py"].analysis.imports == ["os"]
+    assert by_rel["main.go"].analysis is None
+    chunks = chunk_file("b.py", by_rel["b.py"].text, tree=by_rel["b.py"].syntax_tree)
+    assert [chunk.symbol for chunk in chunks] == ["B"]
+
+    parsed: list[str] = []
+    monkeypatch.setattr(ast_analyzer, "_analyze_source", lambda rel, source, repo_path=None: parsed.append(rel))
+    result = ast_analyzer.analyze_repository(str(repo), "a_test_scan", workers=1)
+    assert parsed == []
+    assert "Served 2 of 2 files" in result["summary"]
+    cache.close()
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from app.indexer import code_search
+from app.indexer.code_search import CodeSearchBuilder, CodeSearchError, query_plan, search_code
+
+
+def _build(repo_id: str, files: dict[str, str], commit_sha: str | None = None, base: str | None = None) -> dict[str, int]:
+  builder = CodeSearchBuilder.load(repo_id, base) if base else CodeSearchBuilder(repo_id)
+  assert builder is not None
+  for rel, text in files.items():
+    builder.add(rel, text)
+  return builder.write(commit_sha)
+
+
+def test_regex_plans_narrow_by_required_literals() -> None:
+  assert [len(keys) for keys in query_plan(r"def get_store\(", True, True)] == [12]
+  assert [len(keys) for keys in query_plan("foo|barbaz", True, True)] == [1, 4]
+  assert query_plan("a.b", True, True) is None
+  assert query_plan("x(?i:HELLO)y", True, True) is None
+  assert query_plan("ab", False, True) is None
+  with pytest.raises(CodeSearchError):
+    query_plan("(unclosed", True, True)
+
+
+def test_regex_planner_relies_on_cpython_parser(tmp_path: Path, monkeypatch) -> None:
+  # The planner reads re's private parser, whose layout is only stable from 3.11 on; this
+  # fails loudly if a new interpreter drops it instead of silently scanning every file.
+  if sys.version_info >= (3, 11) and sys.implementation.name == "cpython":
+    assert code_search.sre_parser is not None
+
+  monkeypatch.setattr(code_search, "CODE_SEARCH_DIR", tmp_path)
+  _build("r_plain", {"a.py": "def get_store():\n", "b.py": "x = 1\n"})
+  monkeypatch.setattr(code_search, "sre_parser", None)
+  assert query_plan(r"def get_store\(", True, True) is None
+  found = search_code("r_plain", r"def get_store\(", regex=True)
+  assert [m["path"] for m in found["matches"]] == ["a.py"] and found["candidate_files"] == 2
+
+  class BrokenParser:
+    @staticmethod
+    def parse(pattern, flags):
+      raise TypeError("changed layout")
+
+  monkeypatch.setattr(code_search, "sre_parser", BrokenParser)
+  assert query_plan(r"def get_store\(", True, True) is None
+
+
+def test_regex_length_and_scan_budget_are_capped(tmp_path: Path, monkeypatch) -> None:
+  monkeypatch.setattr(code_search, "CODE_SEARCH_DIR", tmp_path)
+  monkeypatch.setattr(code_search, "CODE_SEARCH_MAX_REGEX_CHARS", 8)
+  monkeypatch.setattr(code_search, "CODE_SEARCH_MAX_SCAN_BYTES", 25)
+  _build("r_cap", {f"f{idx}.py": f"value_{idx} = 1\n" for idx in range(4)})
+
+  with pytest.raises(CodeSearchError):
+    search_code("r_cap", "value_[0-9]+", regex=True)
+  found = search_code("r_cap", "= 1")
+  assert found["truncated"] and found["next_offset"] is None
+  assert [m["path"] for m in found["matches"]] == ["f0.py", "f1.py"]
+  assert not search_code("r_cap", "value_3")["truncated"]
+
+
+def test_literal_regex_and_paging(tmp_path: Path, monkeypatch) -> None:
+  monkeypatch.setattr(code_search, "CODE_SEARCH_DIR", tmp_path)
+  _build(
+    "r_cs",
+    {
+      "app/store.py": "def get_store(name):\n  return STORES[name]\n\ndef get_stores():\n  return STORES\n",
+      "app/main.py": "from .store import get_store\n\nstore = get_store('x')  # get_store twice\n",
+      "README.py": "GET_STORE = 1\n",
+    },
+    "1" * 40,
+  )
+  found = search_code("r_cs", "get_store(")
+  assert [(m["path"], m["line"], m["column"]) for m in found["matches"]] == [("app/main.py", 3, 9), ("app/store.py", 1, 5)]
+  assert found["matches"][1]["text"] == "def get_store(name):"
+  assert found["candidate_files"] == 2 and found["commit_sha"] == "1" * 40
+
+  assert [m["path"] for m in search_code("r_cs", "get_store", case_sensitive=False)["matches"]][0] == "README.py"
+  regex = search_code("r_cs", r"^def get_stores?\(", regex=True)
+  assert [(m["path"], m["line"]) for m in regex["matches"]] == [("app/store.py", 1), ("app/store.py", 4)]
+
+  first = search_code("r_cs", "STORE", limit=2)
+  assert len(first["matches"]) == 2 and first["next_offset"] == 2
+  rest = search_code("r_cs", "STORE", offset=first["next_offset"], limit=2)
+  assert [(m["path"], m["line"]) for m in first["matches"] + rest["matches"]] == [
+    ("README.py", 1),
+    ("app/store.py", 2),
+    ("app/store.py", 5),
+  ]
+  assert rest["next_offset"] is None
+  assert search_code("r_missing", "x") is None
+  assert code_search.read_indexed_file("r_cs", "README.py") == "GET_STORE = 1\n"
+  assert code_search.read_indexed_file("r_cs", "app/missing.py") is None
+
+
+def test_patched_generation_matches_full_build(tmp_path: Path, monkeypatch) -> None:
+  monkeypatch.setattr(code_search, "CODE_SEARCH_DIR", tmp_path)
+  _build("r_patch", {"a.py": "alpha = 1\n", "b.py": "beta = 2\n", "c.py": "gamma = 3\n"}, "1" * 40)
+  assert CodeSearchBuilder.load("r_patch", "2" * 40) is None
+
+  builder = CodeSearchBuilder.load("r_patch", "1" * 40)
+  builder.remove("c.py")
+  builder.add("b.py", "beta = 20\n")
+  builder.add("d.py", "delta = alpha\n")
+  stats = builder.write("2" * 40)
+  _build("r_full", {"a.py": "alpha = 1\n", "b.py": "beta = 20\n", "d.py": "delta = alpha\n"})
+
+  patched = code_search.load_code_search("r_patch")
+  full = code_search.load_code_search("r_full")
+  assert patched.paths == full.paths == ["a.py", "b.py", "d.py"]
+  assert (patched.keys == full.keys).all() and (patched.postings == full.postings).all()
+  assert stats["files"] == 3
+  assert [m["path"] for m in search_code("r_patch", "alpha")["matches"]] == ["a.py", "d.py"]
+  assert search_code("r_patch", "gamma")["matches"] == []
+  # Only the published generation is left on disk.
+  assert sorted(path.name for path in (tmp_path / "r_patch").iterdir() if path.is_dir()) == [
+    (tmp_path / "r_patch" / "CURRENT").read_text()
+  ]
+
+
+def test_write_keeps_builds_of_overlapping_runs(tmp_path: Path, monkeypatch) -> None:
+  monkeypatch.setattr(code_search, "CODE_SEARCH_DIR", tmp_path)
+  running = CodeSearchBuilder("r_overlap")
+  running.add("a.py", "alpha = 1\n")
+  abandoned = CodeSearchBuilder("r_overlap")
+  abandoned._content.close()
+  old = time.time() - code_search._STALE_BUILD_SECONDS - 60
+  for path in (abandoned._dir / "content.bin", abandoned._dir):
+    os.utime(path, (old, old))
+
+  _build("r_overlap", {"b.py": "beta = 2\n"}, "1" * 40)
+  assert running._dir.exists() and not abandoned._dir.exists()
+
+  running.write("2" * 40)
+  assert [m["path"] for m in search_code("r_overlap", "alpha")["matches"]] == ["a.py"]
+  assert len([path for path in (tmp_path / "r_overlap").iterdir() if path.is_dir()]) == 1
+
+
+def test_search_endpoint(tmp_path: Path, monkeypatch, client) -> None:
+  monkeypatch.setattr(code_search, "CODE_SEARCH_DIR", tmp_path)
+  _build("r_api", {"a.py": "import os\n"})
+  response = client.get("/search/code", params={"repo_id": "r_api", "q": "imp[o]rt", "regex": "true"})
+  assert response.status_code == 200
+  assert response.json()["matches"] == [{"path": "a.py", "line": 1, "column": 1, "text": "import os"}]
+  assert client.get("/search/code", params={"repo_id": "r_api", "q": "(", "regex": "true"}).status_code == 400
+  assert client.get("/search/code", params={"repo_id": "r_none", "q": "x"}).status_code == 404
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from app.llm import ollama_client
+from app.llm.embed_cache import EmbeddingCache
+
+
+def test_cache_evicts_least_recently_used_and_drops_other_models(tmp_path: Path) -> None:
+  path = tmp_path / "cache.sqlite3"
+  cache = EmbeddingCache(path, "model-a", max_entries=2)
+  cache.put_many(["a", "b"], [[1.0], [2.0]])
+  assert cache.get_many(["a"]) == {0: [1.0]}
+  cache.put_many(["c"], [[3.0]])
+
+  assert cache.get_many(["a", "b", "c"]) == {0: [1.0], 2: [3.0]}
+  assert cache.stats()["evictions"] == 1
+  assert (cache.hits, cache.misses) == (3, 1)
+  cache.close()
+
+  reopened = EmbeddingCache(path, "model-b", max_entries=2)
+  assert reopened.get_many(["a", "c"]) == {}
+  assert reopened.stats()["entries"] == 0
+  reopened.close()
+
+
+def test_embed_skips_cached_and_duplicate_texts(monkeypatch, tmp_path: Path) -> None:
+  sent: list[str] = []
+
+  def fake_post(path, payload):
+    sent.extend(payload["input"])
+    return {"embeddings": [[float(len(text))] for text in payload["input"]]}
+
+  cache = EmbeddingCache(tmp_path / "cache.sqlite3", "model-a", max_entries=100)
+  monkeypatch.setattr(ollama_client, "_post", fake_post)
+  monkeypatch.setattr(ollama_client, "get_embed_cache", lambda: cache)
+
+  first, stats = ollama_client.embed_with_stats(["x", "yy", "x"])
+  assert first == [[1.0], [2.0], [1.0]]
+  assert sent == ["x", "yy"]
+  assert stats.cache_hits == 0
+
+  sent.clear()
+  second, stats = ollama_client.embed_with_stats(["yy", "zzz", "x"])
+  assert second == [[2.0], [3.0], [1.0]]
+  assert sent == ["zzz"]
+  assert stats.cache_hits == 2
+  cache.close()
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from app.ast_analyzer import _analyze_source
+from app.function_metrics import FunctionTable
+
+
+def test_python_functions_get_their_own_metrics() -> None:
+    source = b"""class Worker:
+    def run(self, items, *args, flag=False, **kwargs):
+        for item in items:
+            if item and flag:
+                with open(item) as handle:
+                    handle.read()
+
+        def inner(x):
+            if x:
+                return 1
+            return 0
+
+        return inner
+"""
+    result = _analyze_source("worker.py", source)
+
+    rows = {row[0]: row[1:] for row in result.functions}
+    # (line, complexity, loc, nesting, params)
+    assert rows["Worker.run.inner"] == (8, 2, 4, 1, 1)
+    assert rows["Worker.run"] == (2, 4, 12, 3, 5)
+
+
+def test_top_pages_through_ranking() -> None:
+    table = FunctionTable.build(
+        [
+            ("a.py", [("a1", 1, 3, 10, 1, 0), ("a2", 9, 7, 5, 2, 1)]),
+            ("b.py", []),
+            ("c.py", [("c1", 4, 7, 20, 0, 2), ("c2", 30, 1, 2, 0, 0)]),
+        ]
+    )
+
+    assert len(table) == 4
+    assert table.files == ["a.py", "c.py"]
+    assert [row["name"] for row in table.top(2)] == ["c1", "a2"]
+    assert [row["name"] for row in table.top(2, offset=2)] == ["a1", "c2"]
+    assert [row["name"] for row in table.top(1, metric="loc")] == ["c1"]
+    assert table.top(5, offset=4) == []
+    assert table.top(1, metric="nesting")[0] == {
+        "file": "a.py",
+        "name": "a2",
+        "line": 9,
+        "complexity": 7,
+        "loc": 5,
+        "nesting": 2,
+        "params": 1,
+    }
+
+
+def test_empty_table() -> None:
+    table = FunctionTable.build([])
+    assert len(table) == 0
+    assert table.top(10) == []
@@ -1,8 +1,18 @@
 from __future__ import annotations
 
+import json
 from pathlib import Path
 
-from app.indexer.graph_index import _extract_imports, build_graph
+from app.graph_artifacts import EdgeArtifact
+from app.indexer import graph_index, import_graph
+from app.indexer.graph_index import GraphBuilder, _extract_imports
+
+
+def _write_graph(repo: Path, repo_id: str, commit_sha: str | None = None) -> dict[str, object]:
+  builder = GraphBuilder(repo)
+  for path in sorted(repo.rglob("*")):
+    builder.add(path.relative_to(repo).as_posix(), path.read_text(encoding="utf-8"))
+  return builder.write(repo_id, commit_sha)
 
 
 def test_extract_imports_python_and_js() -> None:
@@ -14,14 +24,68 @@ def test_extract_imports_python_and_js() -> None:
   assert "baz" in _extract_imports(".js", js)
 
 
-def test_build_graph_writes_artifact(tmp_path: Path) -> None:
+def test_builder_writes_artifact(tmp_path: Path) -> None:
   repo = tmp_path / "repo"
   repo.mkdir(parents=True)
   (repo / "main.py").write_text("import os\n", encoding="utf-8")
   (repo / "util.ts").write_text("import x from 'y'\n", encoding="utf-8")
 
-  result = build_graph(str(repo), "r_test")
-  assert result["graph_url"].endswith("/artifacts/index/r_test/graph.json")
+  result = _write_graph(repo, "r_test")
+  assert result["graph_url"] == "/graph/r_test/edges"
   stats = result["stats"]
   assert stats["node_count"] == 2
   assert stats["edge_count"] >= 2
+
+
+def test_loaded_builder_patches_previous_commit(tmp_path: Path, monkeypatch) -> None:
+  monkeypatch.setattr(graph_index, "GRAPH_HISTORY_LIMIT", 2)
+  repo = tmp_path / "repo"
+  repo.mkdir()
+  (repo / "a.py").write_text("import b\nimport os\n", encoding="utf-8")
+  (repo / "b.py").write_text("import c\n", encoding="utf-8")
+  (repo / "c.py").write_text("x = 1\n", encoding="utf-8")
+  _write_graph(repo, "r_upd", "1" * 40)
+
+  (repo / "c.py").unlink()
+  (repo / "test_d.py").write_text("import a\n", encoding="utf-8")
+  (repo / "b.py").write_text("y = 2\n", encoding="utf-8")
+  builder = GraphBuilder.load("r_upd", repo, "1" * 40)
+  builder.remove("c.py")
+  for rel in ("b.py", "test_d.py"):
+    builder.add(rel, (repo / rel).read_text(encoding="utf-8"))
+  patched = builder.write("r_upd", "2" * 40)
+  rebuilt = _write_graph(repo, "r_full")
+
+  assert patched["stats"] == rebuilt["stats"]
+  assert patched["stats"]["tags"] == {"test": 1}
+  graph_dir = tmp_path / "artifacts" / "index" / "r_upd"
+  latest = EdgeArtifact(graph_dir / "edges.npz")
+  assert latest.meta["commit_sha"] == "2" * 40
+  assert {edge["to"] for edge in latest.edges()} == {"b.py", "os", "a.py"}
+  assert import_graph.load_graph("r_upd", "1" * 40).node_id("c.py") is not None
+  assert import_graph.load_graph("r_upd").node_id("c.py") is None
+
+  # A graph written for another commit is not loaded, so it is never patched.
+  assert GraphBuilder.load("r_upd", repo, "9" * 40) is None
+  _write_graph(repo, "r_upd", "3" * 40)
+  assert sorted(path.name for path in (graph_dir / "graphs").iterdir()) == ["2" * 40, "3" * 40]
+
+
+def test_json_graph_is_opt_in_and_streamed(tmp_path: Path, monkeypatch) -> None:
+  monkeypatch.setattr(graph_index, "GRAPH_ARTIFACT_FORMAT", "json")
+  repo = tmp_path / "repo"
+  repo.mkdir()
+  (repo / "a.py").write_text("import b\nimport os\n", encoding="utf-8")
+  (repo / "b.py").write_text("x = 1\n", encoding="utf-8")
+
+  result = _write_graph(repo, "r_json")
+  assert result["graph_url"] == "/artifacts/index/r_json/graph.json"
+  graph_dir = tmp_path / "artifacts" / "index" / "r_json"
+  payload = json.loads((graph_dir / "graph.json").read_text(encoding="utf-8"))
+  assert payload["nodes"] == ["a.py", "b.py"]
+  assert payload["edges"] == list(EdgeArtifact(graph_dir / "edges.npz").edges())
+  assert payload["stats"] == result["stats"]
+
+  monkeypatch.setattr(graph_index, "GRAPH_ARTIFACT_FORMAT", "npz")
+  _write_graph(repo, "r_json")
+  assert not (graph_dir / "graph.json").exists()
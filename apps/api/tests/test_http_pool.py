@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app import http_pool
+from app.http_pool import AsyncPooledClient, PooledClient
+from app.llm import ollama_client
+
+
+class _EchoHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; with Nagle on, each reused request waits out a delayed ACK.
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        status = 503 if payload.get("fail") else 200
+        body = json.dumps({"message": {"content": f"echo {payload.get('model')}"}}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _EchoHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_sync_client_reuses_one_connection(server_url):
+    client = PooledClient("test", timeout=5)
+    try:
+        for _ in range(5):
+            assert client.post(f"{server_url}/api/chat", json={"model": "m"}).status_code == 200
+        client.post(f"{server_url}/api/chat", json={"fail": True})
+    finally:
+        client.close()
+
+    host = client.metrics.snapshot()[http_pool._origin(server_url)]
+    assert host["requests"] == 6
+    assert host["connections_opened"] == 1
+    assert host["reused"] == 5
+    assert host["errors"] == 1
+
+
+def test_async_client_reuses_one_connection(server_url):
+    async def run() -> dict:
+        client = AsyncPooledClient("test", timeout=5)
+        try:
+            for _ in range(5):
+                resp = await client.post(f"{server_url}/api/chat", json={"model": "m"})
+                assert resp.json()["message"]["content"] == "echo m"
+        finally:
+            await client.aclose()
+        return client.metrics.snapshot()
+
+    host = asyncio.run(run())[http_pool._origin(server_url)]
+    assert host["connections_opened"] == 1
+    assert host["reused"] == 4
+
+
+def test_ollama_chat_uses_shared_pools(monkeypatch, server_url):
+    monkeypatch.setattr(ollama_client, "OLLAMA_BASE_URL", server_url)
+    monkeypatch.setattr(http_pool, "_clients", {})
+
+    messages = [{"role": "user", "content": "hi"}]
+    assert ollama_client.chat(messages, model="a") == "echo a"
+    assert ollama_client.chat(messages, model="b") == "echo b"
+
+    async def run() -> tuple[str, dict]:
+        answer = await ollama_client.achat(messages, model="c")
+        stats = http_pool.http_connection_stats()
+        await http_pool.close_http_clients()
+        return answer, stats
+
+    answer, stats = asyncio.run(run())
+    assert answer == "echo c"
+    origin = http_pool._origin(server_url)
+    assert stats["ollama"][origin]["requests"] == 2
+    assert stats["ollama"][origin]["connections_opened"] == 1
+    assert stats["ollama:async"][origin]["requests"] == 1
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app.indexer import graph_index
+from app.indexer.import_graph import CsrGraph, ImportResolver
+from app.main import app
+
+
+def test_resolver_maps_imports_to_repo_files() -> None:
+  resolver = ImportResolver(
+    [
+      "apps/api/app/__init__.py",
+      "apps/api/app/main.py",
+      "apps/api/app/indexer/graph_index.py",
+      "apps/api/app/indexer/chunker.py",
+      "web/src/util.ts",
+      "web/src/components/index.tsx",
+      "web/src/app.tsx",
+      "cmd/server/main.go",
+      "internal/store/db.go",
+      "internal/store/db_test.go",
+      "src/main/java/com/acme/Service.java",
+      "crates/core/src/lib.rs",
+      "crates/core/src/parser/mod.rs",
+    ],
+    go_module="example.com/acme",
+  )
+  assert resolver.resolve("apps/api/app/main.py", "app.indexer.graph_index") == ["apps/api/app/indexer/graph_index.py"]
+  assert resolver.resolve("apps/api/app/indexer/graph_index.py", ".chunker") == ["apps/api/app/indexer/chunker.py"]
+  assert resolver.resolve("apps/api/app/indexer/graph_index.py", "..main") == ["apps/api/app/main.py"]
+  assert resolver.resolve("apps/api/app/main.py", "os") == []
+  assert resolver.resolve("web/src/app.tsx", "./util.js") == ["web/src/util.ts"]
+  assert resolver.resolve("web/src/app.tsx", "./components") == ["web/src/components/index.tsx"]
+  assert resolver.resolve("web/src/app.tsx", "react") == []
+  assert resolver.resolve("cmd/server/main.go", "example.com/acme/internal/store") == ["internal/store/db.go"]
+  assert resolver.resolve("cmd/server/main.go", "fmt") == []
+  assert resolver.resolve("src/main/java/com/acme/Service.java", "com.acme.Service") == [
+    "src/main/java/com/acme/Service.java"
+  ]
+  assert resolver.resolve("crates/core/src/lib.rs", "crate::parser::Token") == ["crates/core/src/parser/mod.rs"]
+
+
+def test_csr_graph_queries_and_cycles(tmp_path: Path) -> None:
+  nodes = ["a", "b", "c", "d", "e"]
+  graph = CsrGraph.from_edges(nodes, [(0, 1), (1, 2), (2, 1), (2, 3), (0, 1), (4, 0)])
+
+  assert graph.edge_count == 5
+  assert graph.neighbors(0) == ["b"]
+  assert graph.neighbors(1, "dependents") == ["a", "c"]
+  assert graph.closure(0) == [("b", 1), ("c", 2), ("d", 3)]
+  assert graph.closure(0, max_depth=2) == [("b", 1), ("c", 2)]
+  assert graph.closure(3, "dependents") == [("c", 1), ("b", 2), ("a", 3), ("e", 4)]
+  assert graph.cycles() == [["b", "c"]]
+
+  path = tmp_path / "graph.npz"
+  graph.save(path)
+  loaded = CsrGraph.load(path)
+  assert loaded.nodes == nodes
+  assert loaded.node_id("d") == 3
+  assert loaded.closure(0) == graph.closure(0)
+  assert loaded.cycles() == graph.cycles()
+
+
+def test_graph_endpoints_answer_from_artifact(tmp_path: Path) -> None:
+  repo = tmp_path / "repo"
+  (repo / "pkg").mkdir(parents=True)
+  (repo / "pkg" / "__init__.py").write_text("", encoding="utf-8")
+  (repo / "pkg" / "a.py").write_text("from .b import thing\nimport os\n", encoding="utf-8")
+  (repo / "pkg" / "b.py").write_text("from pkg.c import helper\n", encoding="utf-8")
+  (repo / "pkg" / "c.py").write_text("from .b import thing\n", encoding="utf-8")
+
+  builder = graph_index.GraphBuilder(repo)
+  for path in sorted((repo / "pkg").iterdir()):
+    builder.add(path.relative_to(repo).as_posix(), path.read_text(encoding="utf-8"))
+  result = builder.write("r_graph")
+  assert result["stats"]["resolved_edge_count"] == 3
+  assert result["stats"]["cycle_count"] == 1
+
+  client = TestClient(app)
+  deps = client.get("/graph/r_graph/dependencies", params={"path": "pkg/a.py"}).json()
+  assert deps["paths"] == ["pkg/b.py"]
+  closure = client.get("/graph/r_graph/closure", params={"path": "pkg/c.py", "direction": "dependents"}).json()
+  assert [(item["path"], item["depth"]) for item in closure["items"]] == [("pkg/b.py", 1), ("pkg/a.py", 2)]
+  assert client.get("/graph/r_graph/cycles").json()["cycles"] == [["pkg/b.py", "pkg/c.py"]]
+  assert client.get("/graph/r_graph/dependents", params={"path": "missing.py"}).status_code == 404
+  assert client.get("/graph/r_unknown/cycles").status_code == 404
+
+  page = client.get("/graph/r_graph/edges", params={"offset": 1, "limit": 2})
+  assert page.headers["content-type"].startswith("application/x-ndjson")
+  assert page.headers["x-total-count"] == "4"
+  edges = [json.loads(line) for line in page.text.splitlines()]
+  assert edges == [
+    {"from": "pkg/a.py", "to": "pkg/b.py", "type": "import", "spec": ".b"},
+    {"from": "pkg/b.py", "to": "pkg/c.py", "type": "import", "spec": "pkg.c"},
+  ]
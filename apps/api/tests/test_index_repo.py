@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from app import code_scan, symbol_index
+from app.indexer import code_search, index_repo, index_state, lexical_index
+from app.llm.ollama_client import EmbedStats
+
+
+class FakeStore:
+  docs: dict[str, str] = {}
+
+  def __init__(self, collection: str) -> None:
+    self.collection = collection
+
+  def add_documents(self, ids, embeddings, metadatas, documents) -> None:
+    FakeStore.docs.update(zip(ids, documents))
+
+  def delete(self, ids) -> None:
+    for doc_id in ids:
+      FakeStore.docs.pop(doc_id, None)
+
+
+def _git(args: list[str], cwd: Path) -> None:
+  subprocess.run(
+    ["git", "-c", "user.name=tests", "-c", "user.email=tests@example.local", *args],
+    cwd=str(cwd),
+    capture_output=True,
+    check=True,
+  )
+
+
+def test_incremental_index_reembeds_only_changed_chunks(monkeypatch, tmp_path: Path) -> None:
+  embedded: list[str] = []
+  FakeStore.docs = {}
+  monkeypatch.setattr(index_repo, "get_store", FakeStore)
+
+  def fake_embed(texts):
+    embedded.extend(texts)
+    return [[0.0] for _ in texts], EmbedStats(texts=len(texts), seconds=1.0)
+
+  monkeypatch.setattr(index_repo, "embed_with_stats", fake_embed)
+  monkeypatch.setattr(code_scan, "get_analysis_cache", lambda: None)
+  monkeypatch.setattr(index_repo, "CHUNK_STRATEGY", "lines")
+  monkeypatch.setattr(index_repo, "CHUNK_MAX_TOKENS", 300)
+  monkeypatch.setattr(index_repo, "CHUNK_OVERLAP_LINES", 0)
+
+  repo = tmp_path / "repo"
+  repo.mkdir()
+  (repo / "a.py").write_text("x = 1\n" * 250, encoding="utf-8")
+  (repo / "b.py").write_text("import os\n", encoding="utf-8")
+  (repo / "c.py").write_text("print('c')\n", encoding="utf-8")
+  _git(["init"], repo)
+  _git(["add", "."], repo)
+  _git(["commit", "-m", "init"], repo)
+
+  first = index_repo.index_repository("r_inc", str(repo))
+  assert first["added"] == 4
+  assert first["chunks"] == 4
+  assert sorted(FakeStore.docs) == ["a.py:0", "a.py:1", "b.py:0", "c.py:0"]
+  assert symbol_index.find_references("r_inc", "print")[1] == 1
+
+  embedded.clear()
+  (repo / "a.py").write_text("x = 1\n" * 200, encoding="utf-8")
+  (repo / "b.py").write_text("import sys\n", encoding="utf-8")
+  (repo / "c.py").unlink()
+  _git(["add", "-A"], repo)
+  _git(["commit", "-m", "change"], repo)
+
+  second = index_repo.index_repository("r_inc", str(repo))
+  assert embedded == ["import sys"]
+  assert (second["added"], second["updated"], second["deleted"], second["skipped"]) == (0, 1, 2, 1)
+  assert sorted(FakeStore.docs) == ["a.py:0", "b.py:0"]
+
+  assert [hit["id"] for hit in lexical_index.search_lexical("r_inc", "where is sys imported?")] == ["b.py:0"]
+  # The code-search index was patched from the first commit's generation.
+  assert second["code_search"]["files"] == 2
+  found = code_search.search_code("r_inc", "import sys")
+  assert [(match["path"], match["line"]) for match in found["matches"]] == [("b.py", 1)]
+  assert lexical_index.search_lexical("r_inc", "print") == []
+  # The deleted file's call sites left the symbol table with it.
+  assert symbol_index.find_references("r_inc", "print") == ([], 0)
+  assert {row["path"] for row in symbol_index.lookup_symbols("r_inc", "x")} == {"a.py"}
+
+  embedded.clear()
+  third = index_repo.index_repository("r_inc", str(repo))
+  assert embedded == []
+  assert third["skipped"] == 2
+
+  # A missing lexical index makes the next run re-read every file and re-upsert both chunks.
+  lexical_index.index_path("r_inc").unlink()
+  index_repo.index_repository("r_inc", str(repo))
+  assert len(embedded) == 2
+  assert [hit["id"] for hit in lexical_index.search_lexical("r_inc", "sys")] == ["b.py:0"]
+  assert [hit["id"] for hit in lexical_index.search_lexical("r_inc", "sys", where={"language": "python"})] == ["b.py:0"]
+  assert lexical_index.search_lexical("r_inc", "sys", where={"tag_test": True}) == []
+
+
+def test_interrupted_index_resumes_after_last_persisted_file(monkeypatch, tmp_path: Path) -> None:
+  embedded: list[str] = []
+  failures = {"b"}
+  FakeStore.docs = {}
+  monkeypatch.setattr(index_repo, "get_store", FakeStore)
+  monkeypatch.setattr(index_repo, "INDEX_BATCH_SIZE", 1)
+  monkeypatch.setattr(code_scan, "get_analysis_cache", lambda: None)
+
+  def flaky_embed(texts):
+    if failures.intersection(texts):
+      failures.clear()
+      raise RuntimeError("ollama down")
+    embedded.extend(texts)
+    return [[0.0] for _ in texts], EmbedStats(texts=len(texts), seconds=1.0)
+
+  monkeypatch.setattr(index_repo, "embed_with_stats", flaky_embed)
+
+  repo = tmp_path / "repo"
+  repo.mkdir()
+  for name in ("a", "b", "c"):
+    (repo / f"{name}.py").write_text(f"{name}\n", encoding="utf-8")
+  _git(["init"], repo)
+  _git(["add", "."], repo)
+  _git(["commit", "-m", "init"], repo)
+
+  try:
+    index_repo.index_repository("r_resume", str(repo))
+  except RuntimeError:
+    pass
+  assert embedded == ["a"]
+  assert sorted(FakeStore.docs) == ["a.py:0"]
+  state = index_state.IndexState("r_resume")
+  head = subprocess.run(["git", "rev-parse", "HEAD"], cwd=str(repo), capture_output=True, text=True).stdout.strip()
+  assert state.resume_point(head) == "a.py"
+  state.close()
+
+  result = index_repo.index_repository("r_resume", str(repo))
+  assert embedded == ["a", "b", "c"]
+  assert result["chunks"] == 3
+  assert result["added"] == 2
+  assert sorted(FakeStore.docs) == ["a.py:0", "b.py:0", "c.py:0"]
+
+
+def test_failed_index_publishes_and_leaks_nothing(monkeypatch, tmp_path: Path) -> None:
+  FakeStore.docs = {}
+  monkeypatch.setattr(index_repo, "get_store", FakeStore)
+  monkeypatch.setattr(code_scan, "get_analysis_cache", lambda: None)
+
+  def failing_embed(texts):
+    raise RuntimeError("ollama down")
+
+  monkeypatch.setattr(index_repo, "embed_with_stats", failing_embed)
+
+  repo = tmp_path / "repo"
+  repo.mkdir()
+  (repo / "a.py").write_text("a = 1\n", encoding="utf-8")
+  _git(["init"], repo)
+  _git(["add", "."], repo)
+  _git(["commit", "-m", "init"], repo)
+
+  with pytest.raises(RuntimeError):
+    index_repo.index_repository("r_fail", str(repo))
+  assert list(code_search.CODE_SEARCH_DIR.glob("r_fail/tmp-*")) == []
+  assert code_search.load_code_search("r_fail") is None
+  assert not (tmp_path / "artifacts" / "index" / "r_fail").exists()
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from app.indexer.lexical_index import LexicalIndex, match_query, subwords
+
+
+def test_query_keeps_identifiers_and_drops_stopwords() -> None:
+  assert subwords("getStoreHandle VECTOR_STORE_DTYPE x") == "get Store Handle VECTOR STORE DTYPE"
+  query = match_query('Where is `connection refused` raised by get_store?')
+  assert query == '"connection refused" OR "connection" OR "refused" OR "raised" OR "get_store" OR "get" OR "store"'
+  assert match_query("what is it?") == ""
+
+
+def test_exact_identifiers_rank_first_and_deletes_apply(tmp_path: Path) -> None:
+  index = LexicalIndex("r_lex", tmp_path / "lex.sqlite3")
+  index.add_documents(
+    ["a.py:0", "b.py:0", "c.py:0"],
+    [{"path": "a.py", "symbol": "get_store"}, {"path": "b.py", "symbol": ""}, {"path": "c.py", "symbol": "Store"}],
+    [
+      "def get_store(collection):\n  return stores[collection]",
+      "# the store keeps documents; see get_store\nstore = None",
+      "class Store:\n  pass",
+    ],
+  )
+  index.commit()
+  assert [hit["id"] for hit in index.search("get_store")] == ["a.py:0", "b.py:0"]
+  assert [hit["id"] for hit in index.search("class Store")] == ["c.py:0", "b.py:0", "a.py:0"]
+  assert index.search("get_store")[0]["metadata"] == {"path": "a.py", "symbol": "get_store"}
+  assert [hit["id"] for hit in index.search("class Store", where={"symbol": "Store"})] == ["c.py:0"]
+  # No exact hit inside the filter falls back to subwords, still inside the filter.
+  assert [hit["id"] for hit in index.search("get_store", where={"path": "c.py"})] == ["c.py:0"]
+  assert index.search("get_store", where={"path": "d.py"}) == []
+
+  index.add_documents(["a.py:0"], [{"path": "a.py"}], ["x = 1"])
+  index.delete(["b.py:0", "missing"])
+  index.commit()
+  # With no exact match left, the identifier's subwords are searched instead.
+  assert [hit["id"] for hit in index.search("get_store")] == ["c.py:0"]
+  assert index.count() == 2
+  index.close()
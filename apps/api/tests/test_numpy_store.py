@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.vector_store import numpy_store
+from app.vector_store.numpy_store import NumpyStore, VectorStoreError
+from app.vector_store.recall_bench import recall_at_k
+
+
+def _random_vectors(count: int, dim: int, seed: int = 0) -> np.ndarray:
+  return np.random.default_rng(seed).standard_normal((count, dim)).astype(np.float32)
+
+
+def test_upsert_delete_and_reuse_rows(tmp_path: Path) -> None:
+  store = NumpyStore("repo:r_np", root=tmp_path)
+  store.add_documents(
+    ["a:0", "b:0", "c:0"],
+    [[1.0, 0.0], [0.0, 1.0], [0.6, 0.8]],
+    [{"path": "a.py"}, {"path": "b.py"}, {"path": "c.py"}],
+    ["alpha", "beta", "gamma"],
+  )
+  result = store.query([[1.0, 0.1], [0.0, 2.0]], n_results=2)
+  assert result["ids"] == [["a:0", "c:0"], ["b:0", "c:0"]]
+  assert result["metadatas"][0][0] == {"path": "a.py"}
+  assert result["distances"][1][0] == pytest.approx(0.0, abs=1e-3)
+
+  store.delete(["a:0", "missing"])
+  store.add_documents(["b:0", "d:0"], [[1.0, 0.0], [-1.0, 0.0]], [{}, {}], ["beta2", "delta"])
+  assert store.count() == 3
+  assert store.query([[1.0, 0.0]], n_results=5)["ids"] == [["b:0", "c:0", "d:0"]]
+  assert store.query([[1.0, 0.0]], n_results=5)["documents"][0][0] == "beta2"
+
+  # The freed row was reused, and a fresh handle sees the same data through the files.
+  reopened = NumpyStore("repo:r_np", root=tmp_path)
+  assert reopened.query([[-1.0, 0.0]], n_results=1)["ids"] == [["d:0"]]
+  assert reopened._info()[2] == 3
+  with pytest.raises(VectorStoreError):
+    reopened.add_documents(["e:0"], [[1.0, 0.0, 0.0]], [{}], ["e"])
+  store.close()
+  reopened.close()
+
+
+def test_blocked_top_k_matches_brute_force(tmp_path: Path, monkeypatch) -> None:
+  monkeypatch.setattr(numpy_store, "QUERY_BLOCK_ROWS", 256)
+  monkeypatch.setattr(numpy_store, "VECTOR_STORE_DTYPE", "float16")
+  vectors = _random_vectors(3000, 16)
+  queries = _random_vectors(7, 16, seed=1)
+  store = NumpyStore("repo:r_topk", root=tmp_path)
+  ids = [f"doc:{idx}" for idx in range(len(vectors))]
+  store.add_documents(ids, vectors.tolist(), [{} for _ in ids], ["" for _ in ids])
+
+  result = store.query(queries.tolist(), n_results=10)
+  stored = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+  similarity = (queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ stored.astype(np.float16).astype(np.float32).T
+  expected = np.argsort(-similarity, axis=1)[:, :10]
+  assert result["ids"] == [[f"doc:{idx}" for idx in row] for row in expected.tolist()]
+  store.close()
+
+
+def test_int8_first_pass_with_exact_rerank(tmp_path: Path, monkeypatch) -> None:
+  monkeypatch.setattr(numpy_store, "QUERY_BLOCK_ROWS", 512)
+  vectors = _random_vectors(2000, 32)
+  queries = _random_vectors(20, 32, seed=1)
+  ids = [f"doc:{idx}" for idx in range(len(vectors))]
+  exact = NumpyStore("repo:r_q", root=tmp_path)
+  exact.add_documents(ids, vectors.tolist(), [{} for _ in ids], ["" for _ in ids])
+  truth = exact.query(queries.tolist(), n_results=10)
+  exact.close()
+
+  # Switching an existing store to int8 backfills the codes from the stored vectors.
+  quantized = NumpyStore("repo:r_q", root=tmp_path, quantization="int8")
+  result = quantized.query(queries.tolist(), n_results=10)
+  assert (tmp_path / "repo-r_q" / "codes.bin").exists()
+  hits = sum(len(set(want) & set(got)) for want, got in zip(truth["ids"], result["ids"]))
+  assert hits / 200 >= 0.95
+  # Reranked distances are exact, not quantized.
+  assert result["distances"][0][0] == pytest.approx(truth["distances"][0][0], abs=1e-5)
+  assert quantized.scan_bytes_per_row() < exact.scan_bytes_per_row() / 3
+
+  assert quantized.query(queries.tolist(), n_results=10, rerank_factor=8)["ids"] == truth["ids"]
+
+  quantized.delete(["doc:0"])
+  live = quantized.live_vectors()
+  assert live.shape == (len(vectors) - 1, 32)
+  assert np.allclose(live[0], vectors[1] / np.linalg.norm(vectors[1]), atol=1e-6)
+  quantized.add_documents(["doc:new"], [queries[0].tolist()], [{}], [""])
+  assert quantized.query([queries[0].tolist()], n_results=1)["ids"] == [["doc:new"]]
+  quantized.close()
+  back = NumpyStore("repo:r_q", root=tmp_path)
+  assert back.query([queries[0].tolist()], n_results=1)["ids"] == [["doc:new"]]
+  assert not (tmp_path / "repo-r_q" / "codes.bin").exists()
+  back.close()
+  with pytest.raises(VectorStoreError):
+    NumpyStore("repo:r_q", root=tmp_path, quantization="pq")
+
+
+def test_recall_benchmark_reports_tradeoff(tmp_path: Path) -> None:
+  report = recall_at_k(_random_vectors(1500, 24), _random_vectors(10, 24, seed=2), k=5, rerank_factors=(1, 8), root=tmp_path)
+  assert [run["rerank_factor"] for run in report["int8"]] == [1, 8]
+  assert report["int8"][1]["recall"] >= report["int8"][0]["recall"]
+  assert report["int8"][1]["recall"] >= 0.95
+  assert report["int8"][0]["bytes_per_row"] < report["exact"]["bytes_per_row"]
+
+
+def test_where_scans_only_matching_rows(tmp_path: Path, monkeypatch) -> None:
+  monkeypatch.setattr(numpy_store, "QUERY_BLOCK_ROWS", 64)
+  vectors = _random_vectors(600, 8)
+  ids = [f"doc:{idx}" for idx in range(len(vectors))]
+  metadatas = [{"language": "python" if idx % 3 else "go", "tag_test": idx % 2 == 0} for idx in range(len(vectors))]
+  store = NumpyStore("repo:r_where", root=tmp_path)
+  store.add_documents(ids, vectors.tolist(), metadatas, ["" for _ in ids])
+
+  where = {"language": "go", "tag_test": True}
+  result = store.query([vectors[6].tolist(), vectors[7].tolist()], n_results=5, where=where)
+  matching = [idx for idx in range(len(vectors)) if idx % 6 == 0]
+  stored = vectors[matching] / np.linalg.norm(vectors[matching], axis=1, keepdims=True)
+  expected = np.argsort(-(stored @ (vectors[7] / np.linalg.norm(vectors[7]))))[:5]
+  assert result["ids"][0][0] == "doc:6"
+  assert result["ids"][1] == [f"doc:{matching[idx]}" for idx in expected]
+  assert all(meta == {"language": "go", "tag_test": True} for meta in result["metadatas"][1])
+
+  # Re-upserted and deleted rows leave the filter entries of their old metadata behind.
+  store.add_documents(["doc:6"], [vectors[6].tolist()], [{"language": "python"}], [""])
+  store.delete(["doc:12"])
+  assert {"doc:6", "doc:12"}.isdisjoint(store.query([vectors[6].tolist()], n_results=200, where=where)["ids"][0])
+  assert store.query([vectors[0].tolist()], n_results=5, where={"language": "rust"})["ids"] == [[]]
+  store.close()
+
+  # A store written before filters existed has its entries built on open.
+  conn = NumpyStore("repo:r_where", root=tmp_path)._db()
+  conn.execute("DELETE FROM doc_filters")
+  conn.execute("DELETE FROM info WHERE key='filters'")
+  conn.commit()
+  conn.close()
+  reopened = NumpyStore("repo:r_where", root=tmp_path)
+  assert reopened.query([vectors[18].tolist()], n_results=1, where=where)["ids"] == [["doc:18"]]
+  reopened.close()
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import threading
+
 from app.llm import ollama_client
 
 
@@ -10,13 +12,46 @@ def test_ollama_chat_and_embed(monkeypatch) -> None:
     calls.append((path, payload))
     if path == "/api/chat":
       return {"message": {"content": "ok"}}
-    if path == "/api/embeddings":
-      return {"embedding": [0.1, 0.2]}
+    if path == "/api/embed":
+      return {"embeddings": [[0.1, 0.2] for _ in payload["input"]]}
     return {}
 
   monkeypatch.setattr(ollama_client, "_post", fake_post)
+  monkeypatch.setattr(ollama_client, "get_embed_cache", lambda: None)
   out = ollama_client.chat([{"role": "user", "content": "hi"}], model="test")
   assert out == "ok"
   vecs = ollama_client.embed(["hello"])
   assert vecs == [[0.1, 0.2]]
   assert calls
+
+
+def test_embed_batches_keep_order_and_bound_in_flight(monkeypatch) -> None:
+  lock = threading.Lock()
+  in_flight = 0
+  peak = 0
+  batch_sizes = []
+
+  def fake_post(path, payload):
+    nonlocal in_flight, peak
+    with lock:
+      in_flight += 1
+      peak = max(peak, in_flight)
+      batch_sizes.append(len(payload["input"]))
+    try:
+      return {"embeddings": [[float(text)] for text in payload["input"]]}
+    finally:
+      with lock:
+        in_flight -= 1
+
+  monkeypatch.setattr(ollama_client, "_post", fake_post)
+  monkeypatch.setattr(ollama_client, "get_embed_cache", lambda: None)
+  texts = [str(i) for i in range(25)]
+  texts[3] = "  "
+  vecs, stats = ollama_client.embed_with_stats(texts, batch_size=4, max_in_flight=2)
+
+  assert vecs[3] == []
+  assert [vec[0] for idx, vec in enumerate(vecs) if idx != 3] == [float(i) for i in range(25) if i != 3]
+  assert sorted(batch_sizes) == [4, 4, 4, 4, 4, 4]
+  assert peak <= 2
+  assert stats.texts == 24
+  assert stats.batches == 6
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import subprocess
+from pathlib import Path
+
+from app.repo_files import list_repo_files
+
+
+def _make_tree(root: Path) -> None:
+    (root / "src").mkdir(parents=True)
+    (root / "node_modules" / "dep").mkdir(parents=True)
+    (root / "src" / "app.py").write_text("print('ok')\n", encoding="utf-8")
+    (root / "src" / "ui.ts").write_text("export const x = 1;\n", encoding="utf-8")
+    (root / "src" / "notes.md").write_text("# notes\n", encoding="utf-8")
+    (root / "node_modules" / "dep" / "index.js").write_text("module.exports = 1;\n", encoding="utf-8")
+    (root / "src" / "blob.py").write_bytes(b"\x00\x01binary")
+    (root / "src" / "bundle.js").write_text("var a=1;" * 1000, encoding="utf-8")
+    (root / "src" / "api_pb2.py").write_text("x = 1\n", encoding="utf-8")
+    (root / "src" / "gen.go").write_text("// Code generated by tool. DO NOT EDIT.\npackage gen\n", encoding="utf-8")
+    (root / "src" / "huge.py").write_text("x = 1\n" * 100, encoding="utf-8")
+
+
+def test_scandir_walk_prunes_and_skips_unwanted_files(tmp_path: Path) -> None:
+    _make_tree(tmp_path)
+    files = list_repo_files(tmp_path, mode="scandir", max_bytes=500)
+    assert [item.rel for item in files] == ["src/app.py", "src/ui.ts"]
+    assert files[0].size == len("print('ok')\n")
+    assert [item.rel for item in list_repo_files(tmp_path, {".ts"}, mode="scandir")] == ["src/ui.ts"]
+
+
+def test_git_mode_honours_gitignore_and_sees_worktree_changes(tmp_path: Path) -> None:
+    _make_tree(tmp_path)
+    (tmp_path / ".gitignore").write_text("src/ui.ts\n", encoding="utf-8")
+    subprocess.run(["git", "init"], cwd=str(tmp_path), capture_output=True, check=True)
+    subprocess.run(["git", "add", "."], cwd=str(tmp_path), capture_output=True, check=True)
+    subprocess.run(
+        ["git", "-c", "user.name=tests", "-c", "user.email=tests@example.local", "commit", "-m", "init"],
+        cwd=str(tmp_path),
+        capture_output=True,
+        check=True,
+    )
+
+    files = list_repo_files(tmp_path, mode="git", max_bytes=500)
+    assert [item.rel for item in files] == ["src/app.py"]
+
+    (tmp_path / "src" / "late.py").write_text("x = 2\n", encoding="utf-8")
+    assert [item.rel for item in list_repo_files(tmp_path, mode="git", max_bytes=500)] == ["src/app.py", "src/late.py"]
+
+    (tmp_path / "src" / "huge.py").write_text("x = 1\n", encoding="utf-8")
+    (tmp_path / "src" / "app.py").write_text("print('ok')\n" * 100, encoding="utf-8")
+    files = list_repo_files(tmp_path, mode="git", max_bytes=500)
+    assert [item.rel for item in files] == ["src/huge.py", "src/late.py"]
+    assert files[0].size == len("x = 1\n")
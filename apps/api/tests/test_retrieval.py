@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import threading
+
+from app import retrieval
+from app.indexer.chunk_filters import ChunkFilter
+from app.retrieval import code_identifiers, reciprocal_rank_fusion, retrieve
+from app.symbol_index import SymbolIndex
+
+
+def test_reciprocal_rank_fusion_rewards_agreement() -> None:
+    fused = reciprocal_rank_fusion(
+        {
+            "vector": [{"id": "a", "distance": 0.1}, {"id": "b", "distance": 0.2}, {"id": "c", "distance": 0.3}],
+            "lexical": [{"id": "c", "score": 9.0}, {"id": "d", "score": 5.0}],
+        },
+        k=60,
+    )
+    assert [hit["id"] for hit in fused] == ["c", "a", "b", "d"]
+    assert fused[0]["retrievers"] == ["vector", "lexical"]
+    assert (fused[0]["distance"], fused[0]["lexical_score"]) == (0.3, 9.0)
+    assert fused[0]["rrf_score"] == 1 / 63 + 1 / 61
+
+
+def test_hybrid_runs_searches_concurrently(monkeypatch) -> None:
+    barrier = threading.Barrier(2, timeout=5)
+
+    class FakeStore:
+        def __init__(self, collection: str) -> None:
+            assert collection == "repo:r_hy"
+
+        def query(self, query_embeddings, n_results, where=None):
+            barrier.wait()
+            return {
+                "ids": [["a.py:0", "b.py:0"]],
+                "documents": [["alpha", "beta"]],
+                "metadatas": [[{"path": "a.py"}, {"path": "b.py"}]],
+                "distances": [[0.2, 0.4]],
+            }
+
+    def fake_lexical(repo_id, question, limit, where=None):
+        # Both searches have to be in flight at once to pass the barrier.
+        barrier.wait()
+        return [{"id": "b.py:0", "document": "beta", "metadata": {"path": "b.py"}, "score": 3.0}]
+
+    monkeypatch.setattr(retrieval, "embed", lambda texts: [[1.0, 0.0]])
+    monkeypatch.setattr(retrieval, "get_store", FakeStore)
+    monkeypatch.setattr(retrieval, "search_lexical", fake_lexical)
+
+    result = retrieve("r_hy", "where is beta?", "hybrid", n_results=1)
+    assert [hit["id"] for hit in result.hits] == ["b.py:0"]
+    assert set(result.timings) == {"embed_ms", "vector_ms", "lexical_ms", "fusion_ms", "retrieval_ms"}
+
+    barrier.reset()
+    monkeypatch.setattr(retrieval, "search_lexical", lambda *args: [])
+    monkeypatch.setattr(FakeStore, "query", lambda self, query_embeddings, n_results, where=None: {"ids": [[]], "documents": [[]]})
+    assert retrieve("r_hy", "beta", "vector").hits == []
+
+
+def test_code_names_pull_exact_definitions_ahead_of_fused_hits(monkeypatch) -> None:
+    index = SymbolIndex("r_sym")
+    index.replace_file("store.py", "blob", [("load", "load", "function", 2, 3, "")], [])
+    index.commit()
+    index.close()
+    source = "import os\ndef load(key):\n    return os.environ[key]\n"
+    monkeypatch.setattr(retrieval, "read_indexed_file", lambda repo_id, path: source if path == "store.py" else None)
+    monkeypatch.setattr(
+        retrieval,
+        "search_lexical",
+        lambda repo_id, question, limit, where=None: [
+            {"id": "store.py:0", "document": source, "metadata": {"path": "store.py", "start_line": 2}, "score": 1.0},
+            {"id": "util.py:0", "document": "x", "metadata": {"path": "util.py", "start_line": 1}, "score": 0.5},
+        ],
+    )
+
+    assert code_identifiers("what does `load` return, vs parse_config() or Store.get?") == ["load", "parse_config", "Store.get"]
+    assert code_identifiers("where is beta?") == []
+    result = retrieve("r_sym", "what does load() return?", "lexical", n_results=4)
+    assert [hit["id"] for hit in result.hits] == ["symbol:store.py:2", "util.py:0"]
+    assert result.hits[0]["document"] == "def load(key):\n    return os.environ[key]"
+    assert result.hits[0]["metadata"]["symbol"] == "load"
+    assert "symbols_ms" in result.timings
+
+
+def test_filters_reach_every_retriever(monkeypatch) -> None:
+    index = SymbolIndex("r_flt")
+    index.replace_file("app/store.py", "blob", [("load", "load", "function", 1, 1, "")], [])
+    index.commit()
+    index.close()
+    monkeypatch.setattr(retrieval, "read_indexed_file", lambda repo_id, path: "def load(): pass\n")
+    seen: dict[str, object] = {}
+
+    class FakeStore:
+        def __init__(self, collection: str) -> None:
+            pass
+
+        def query(self, query_embeddings, n_results, where=None):
+            seen["vector"] = where
+            return {"ids": [[]], "documents": [[]]}
+
+    def fake_lexical(repo_id, question, limit, where=None):
+        seen["lexical"] = where
+        return []
+
+    monkeypatch.setattr(retrieval, "embed", lambda texts: [[1.0]])
+    monkeypatch.setattr(retrieval, "get_store", FakeStore)
+    monkeypatch.setattr(retrieval, "search_lexical", fake_lexical)
+
+    scoped = ChunkFilter(path_prefix="tests", symbol_kind="function")
+    assert retrieve("r_flt", "what does load() do?", "hybrid", filters=scoped).hits == []
+    assert seen == {"vector": {"kind": "function", "dir_1": "tests"}, "lexical": {"kind": "function", "dir_1": "tests"}}
+    inside = retrieve("r_flt", "what does load() do?", "hybrid", filters=ChunkFilter(path_prefix="app"))
+    assert [hit["id"] for hit in inside.hits] == ["symbol:app/store.py:1"]
+    retrieve("r_flt", "what does load() do?", "hybrid")
+    assert seen == {"vector": None, "lexical": None}
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import ast_analyzer, symbol_index
+from app.ast_analyzer import _analyze_source, analyze_repository
+from app.symbol_index import SymbolIndex
+
+SOURCE = b'''LIMIT = 10
+
+
+class Store:
+    cache: dict = {}
+
+    def get(self, key):
+        return load(key)
+
+    class Meta:
+        def get(self):
+            pass
+
+
+def load(key):
+    local = 1
+    return Store().get(key)
+'''
+
+
+def test_visitor_collects_definitions_and_call_sites() -> None:
+    result = _analyze_source("store.py", SOURCE)
+    assert [(name, qualname, kind, line, scope) for name, qualname, kind, line, _, scope in result.symbols] == [
+        ("LIMIT", "LIMIT", "variable", 1, ""),
+        ("Store", "Store", "class", 4, ""),
+        ("cache", "Store.cache", "variable", 5, "Store"),
+        ("get", "Store.get", "method", 7, "Store"),
+        ("Meta", "Store.Meta", "class", 10, "Store"),
+        ("get", "Store.Meta.get", "method", 11, "Store.Meta"),
+        ("load", "load", "function", 15, ""),
+    ]
+    assert result.symbols[1][4] == 12
+    assert result.references == [("load", 8, 16, "Store.get"), ("get", 17, 12, "load"), ("Store", 17, 12, "load")]
+
+
+def test_only_bound_names_of_assignments_are_definitions() -> None:
+    source = b"""import os, sys
+CONFIG = {}
+os.environ["X"] = "1"
+sys.path[0] = key
+CONFIG[name] = 2
+obj.attr = 3
+first, (second, *rest) = [third] = values
+
+
+class Box:
+    size: int = 0
+    self_like.width = 1
+"""
+    result = _analyze_source("config.py", source)
+    assert [(qualname, line) for _, qualname, kind, line, _, _ in result.symbols if kind == "variable"] == [
+        ("CONFIG", 2),
+        ("first", 7),
+        ("second", 7),
+        ("rest", 7),
+        ("third", 7),
+        ("Box.size", 11),
+    ]
+
+
+def test_symbol_index_replaces_by_blob_and_pages_references() -> None:
+    result = _analyze_source("store.py", SOURCE)
+    index = SymbolIndex("r_sym")
+    index.replace_file("store.py", "blob1", result.symbols, result.references)
+    index.replace_file("other.py", "blob2", [], [("get", 3, 1, ""), ("get", 9, 5, "")])
+    index.commit()
+
+    assert [row["qualname"] for row in index.lookup("get")] == ["Store.get", "Store.Meta.get"]
+    assert [row["line"] for row in index.lookup("Store.get")] == [7]
+    assert [row["qualname"] for row in index.lookup("Store", kind="class")] == ["Store"]
+    assert index.lookup("Store", kind="function") == []
+
+    rows, total = index.references("Store.get", offset=1, limit=2)
+    assert total == 3
+    assert [(row["path"], row["line"], row["column"]) for row in rows] == [("other.py", 9, 5), ("store.py", 17, 12)]
+
+    # An unchanged blob is skipped even when the rows passed in differ.
+    index.replace_file("store.py", "blob1", [], [])
+    assert index.lookup("load")
+    index.replace_file("store.py", "blob3", [], [])
+    assert index.lookup("load") == []
+    index.retain({"store.py"})
+    index.commit()
+    index.close()
+    assert symbol_index.find_references("r_sym", "get") == ([], 0)
+
+
+def test_symbol_endpoints_after_analysis(client: TestClient, monkeypatch, tmp_path: Path) -> None:
+    monkeypatch.setattr(ast_analyzer, "ARTIFACTS_DIR", tmp_path / "artifacts")
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "store.py").write_bytes(SOURCE)
+    (repo / "main.py").write_text("from store import load\n\nload('a')\nload('b')\n", encoding="utf-8")
+    analyze_repository(str(repo), "a_sym", repo_id="r_api")
+
+    found = client.get("/symbols/lookup", params={"repo_id": "r_api", "name": "load"}).json()
+    assert [(item["path"], item["kind"], item["line"], item["end_line"]) for item in found["definitions"]] == [
+        ("store.py", "function", 15, 17)
+    ]
+
+    page = client.get("/symbols/references", params={"repo_id": "r_api", "name": "load", "limit": 2}).json()
+    assert [(item["path"], item["line"]) for item in page["references"]] == [("main.py", 3), ("main.py", 4)]
+    assert (page["total"], page["next_offset"]) == (3, 2)
+    last = client.get("/symbols/references", params={"repo_id": "r_api", "name": "load", "offset": 2}).json()
+    assert [(item["path"], item["scope"]) for item in last["references"]] == [("store.py", "Store.get")]
+    assert last["next_offset"] is None
+
+    # Removed files drop out on the next analysis of the tree.
+    (repo / "main.py").unlink()
+    analyze_repository(str(repo), "a_sym2", repo_id="r_api")
+    assert client.get("/symbols/references", params={"repo_id": "r_api", "name": "load"}).json()["total"] == 1
+
+
+def test_analysis_closes_symbol_index_on_failure(monkeypatch, tmp_path: Path) -> None:
+    monkeypatch.setattr(ast_analyzer, "ARTIFACTS_DIR", tmp_path / "artifacts")
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "store.py").write_bytes(SOURCE)
+    closed = []
+
+    def fail(*args) -> None:
+        raise OSError("disk full")
+
+    monkeypatch.setattr(SymbolIndex, "replace_file", fail)
+    monkeypatch.setattr(SymbolIndex, "close", lambda index: closed.append(index.repo_id))
+    with pytest.raises(OSError):
+        analyze_repository(str(repo), "a_fail", repo_id="r_fail")
+    assert closed == ["r_fail"]
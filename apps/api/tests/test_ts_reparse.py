@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from app import ast_analyzer
+from app.analysis_cache import git_blob_sha
+from app.ts_reparse import ParseCache, apply_hunks, git_hunks, span_hunk
+
+
+class RecordingTree:
+    def __init__(self) -> None:
+        self.edits: list[dict] = []
+
+    def edit(self, **kwargs) -> None:
+        self.edits.append(kwargs)
+
+
+def _git(repo: Path, *args: str) -> str:
+    proc = subprocess.run(
+        ["git", "-c", "user.name=tests", "-c", "user.email=tests@example.local", *args],
+        cwd=str(repo),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return proc.stdout.strip()
+
+
+def _sexp(node) -> str:
+    # Node.sexp() up to py-tree-sitter 0.21; str(node) gives the same from 0.22 on.
+    return node.sexp() if hasattr(node, "sexp") else str(node)
+
+
+def test_git_hunks_become_bottom_up_edits(tmp_path: Path) -> None:
+    old = b"a\nb\nc\nd\ne\n"
+    new = b"a\nB\nc\nd\nx\ny\ne\n"
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _git(repo, "init")
+    for data in (old, new):
+        (repo / "f.js").write_bytes(data)
+        _git(repo, "add", ".")
+        _git(repo, "commit", "-m", "rev")
+
+    hunks = git_hunks(repo, git_blob_sha(old), git_blob_sha(new))
+    assert hunks == [(1, 1, 1, 1), (4, 0, 4, 2)]
+    assert span_hunk(old, new) == [(1, 3, 1, 5)]
+
+    tree = RecordingTree()
+    apply_hunks(tree, old, new, hunks)
+    assert [(edit["start_byte"], edit["old_end_byte"], edit["new_end_byte"]) for edit in tree.edits] == [
+        (8, 8, 12),
+        (2, 4, 4),
+    ]
+    assert tree.edits[0]["new_end_point"] == (6, 0)
+    assert git_hunks(repo, git_blob_sha(old), "0" * 40) is None
+
+
+def test_incremental_reparse_matches_full_parse(tmp_path: Path) -> None:
+    parser = ast_analyzer._parser_for(".js")
+    if parser is None:
+        pytest.skip("tree-sitter parsers unavailable")
+    lines = [b"function f%d(x) { if (x) { return g(x); } }" % i for i in range(2000)]
+    old = b"\n".join(lines) + b"\n"
+    lines[10] = b"function changed() { while (true) {} }"
+    del lines[500]
+    new = b"\n".join(lines) + b"\n"
+
+    cache = ParseCache(max_files=4)
+    cache.parse(parser, old, tmp_path, "big.js")
+    tree = cache.parse(parser, new, tmp_path, "big.js")
+
+    assert cache.incremental_parses == 1
+    assert _sexp(tree.root_node) == _sexp(parser.parse(new).root_node)
+
+
+def test_returned_trees_are_not_edited_by_later_parses(tmp_path: Path) -> None:
+    parser = ast_analyzer._parser_for(".js")
+    if parser is None:
+        pytest.skip("tree-sitter parsers unavailable")
+    lines = [b"function f%d(x) { return x; }" % i for i in range(2000)]
+    old = b"\n".join(lines) + b"\n"
+    new = b"// header\n" + old
+
+    cache = ParseCache(max_files=4)
+    first = cache.parse(parser, old, tmp_path, "big.js")
+    again = cache.parse(parser, old, tmp_path, "big.js")
+    before = [(node.start_byte, node.start_point) for node in first.root_node.children[:3]]
+    cache.parse(parser, new, tmp_path, "big.js")
+
+    assert cache.incremental_parses == 1
+    assert [(node.start_byte, node.start_point) for node in first.root_node.children[:3]] == before
+    assert [(node.start_byte, node.start_point) for node in again.root_node.children[:3]] == before